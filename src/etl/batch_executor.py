@@ -0,0 +1,152 @@
+"""
+Ejecución tolerante a fallos de los lotes de las ETL.
+
+Los errores transitorios (bloqueos, conexión perdida) se reintentan con espera exponencial.
+Ante un error de datos el lote se deshace y se parte en dos, recursivamente, hasta aislar
+las filas que fallan: esas se guardan en un fichero de cuarentena (JSONL) y el resto se
+confirma, de forma que una fila mala no tumba ni el lote ni la carga.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+from src.etl.batching import is_packet_too_large
+
+MAX_RETRIES = 5
+# Espera antes del primer reintento; se duplica en cada intento
+RETRY_BASE_SECONDS = 0.5
+# Lock wait timeout y deadlock: basta con repetir la transacción
+RETRY_ERRNOS = {1205, 1213}
+# Conexión perdida: hay que reconectar antes de repetir
+CONNECTION_ERRNOS = {2006, 2013, 2055}
+# Errores de datos con SQLSTATE genérico (HY000): valor de cadena o carácter no válido
+DATA_ERRNOS = {1300, 1366}
+
+def is_transient(error):
+    return getattr(error, "errno", None) in RETRY_ERRNOS | CONNECTION_ERRNOS
+
+def is_data_error(error):
+    """Errores atribuibles a las filas (SQLSTATE 22 = datos, 23 = restricciones de integridad)."""
+    sqlstate = getattr(error, "sqlstate", None) or ""
+    return sqlstate[:2] in ("22", "23") or getattr(error, "errno", None) in DATA_ERRNOS
+
+class Quarantine:
+    """Fichero JSONL con las filas que el servidor ha rechazado, una por línea."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, table, row, error):
+        line = json.dumps({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "table": table,
+            "errno": getattr(error, "errno", None),
+            "error": str(error),
+            "row": list(row),
+        }, default=str, ensure_ascii=False)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Una única escritura por línea: varios procesos pueden añadir al mismo fichero
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.count += 1
+
+    def offset(self):
+        """Tamaño actual del fichero: marca desde la que rejected_since lee las filas nuevas."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def rejected_since(self, offset):
+        """
+        (tabla, fila) de las líneas añadidas desde offset, también por otros procesos (p. ej. los
+        workers de un Pool con su propia Quarantine sobre el mismo fichero).
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                return [(entry["table"], entry["row"]) for entry in map(json.loads, f)]
+        except FileNotFoundError:
+            return []
+
+    def report(self):
+        if self.count:
+            print(f"⚠️ {self.count} filas rechazadas guardadas en cuarentena en {self.path}.")
+
+# Configuración de sesión de cada conexión (SET SESSION, USE...) que hay que repetir al reconectar
+_session_inits = weakref.WeakKeyDictionary()
+
+def register_session_init(conn, init):
+    """
+    Ejecuta init(conn) y lo registra para repetirlo en cada reconnect: la sesión nueva pierde los
+    SET SESSION (p. ej. foreign_key_checks = 0 de una carga diferida) y la BBDD elegida con USE.
+    """
+    init(conn)
+    _session_inits[conn] = init
+
+def reconnect(conn, cursors=()):
+    """
+    Reabre la conexión, repite su configuración de sesión y descarta las sentencias preparadas
+    de sus cursores. Las tablas temporales se pierden: quien las use debe crearlas con IF NOT EXISTS.
+    """
+    conn.ping(reconnect=True, attempts=3, delay=RETRY_BASE_SECONDS)
+    init = _session_inits.get(conn)
+    if init is not None:
+        init(conn)
+    for cursor in cursors:
+        if cursor is not None:
+            cursor.reset(free=False)
+
+def _rollback(conn):
+    try:
+        conn.rollback()
+    except Exception:
+        pass  # la conexión puede estar caída; se reabre al reintentar
+
+def run_with_retries(conn, batch, load_rows, cursors=()):
+    """Ejecuta load_rows(batch) reintentando los errores transitorios con espera exponencial."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return load_rows(batch)
+        except Exception as e:
+            if not is_transient(e) or attempt == MAX_RETRIES:
+                raise
+            _rollback(conn)
+            delay = RETRY_BASE_SECONDS * 2 ** attempt
+            print(f"🔁 Error transitorio ({e}). Reintento {attempt + 1}/{MAX_RETRIES} en {delay:.1f}s...")
+            time.sleep(delay)
+            if e.errno in CONNECTION_ERRNOS:
+                reconnect(conn, cursors)
+
+def execute_batch(conn, batch, load_rows, table, quarantine=None, cursors=()):
+    """
+    Carga batch con load_rows (que debe confirmar la transacción) y devuelve cuántas filas se cargaron.
+    Sin quarantine, los errores de datos se propagan como antes. Los de paquete demasiado grande
+    se propagan siempre para que AdaptiveBatcher reduzca el lote.
+    """
+    loaded = 0
+    pending = [batch]
+    while pending:
+        rows = pending.pop()
+        try:
+            run_with_retries(conn, rows, load_rows, cursors)
+            loaded += len(rows)
+        except Exception as e:
+            if quarantine is None or is_packet_too_large(e) or not is_data_error(e):
+                raise
+            _rollback(conn)
+            if len(rows) == 1:
+                quarantine.add(table, rows[0], e)
+            else:
+                # Primero la mitad inicial: se conserva el orden de las filas
+                middle = len(rows) // 2
+                pending.append(rows[middle:])
+                pending.append(rows[:middle])
+    return loaded
@@ -0,0 +1,123 @@
+"""
+Tamaño de lote adaptativo para las cargas de las ETL.
+
+Cada tabla tiene su AdaptiveBatcher: limita el lote a lo que cabe en una fracción de
+max_allowed_packet según el tamaño medio estimado de sus filas, y lo agranda o reduce
+según lo que tarda cada lote (ejecución + commit) respecto a una duración objetivo.
+Si aun así el servidor rechaza un paquete, el lote se parte por la mitad y se reintenta.
+"""
+import time
+
+# Fracción de max_allowed_packet que puede ocupar un lote
+PACKET_FILL = 0.5
+# Duración objetivo de cada lote (ejecución + commit), en segundos
+TARGET_BATCH_SECONDS = 1.0
+INITIAL_BATCH_SIZE = 1000
+MIN_BATCH_SIZE = 1
+MAX_BATCH_SIZE = 100000
+# Filas que se codifican para estimar el tamaño medio de fila de un lote
+SIZE_SAMPLE_ROWS = 64
+# Bytes extra por valor en la sentencia (comillas, comas, escapes)
+VALUE_OVERHEAD = 4
+# Paquete demasiado grande: ER_NET_PACKET_TOO_LARGE (servidor) y CR_NET_PACKET_TOO_LARGE (cliente)
+PACKET_TOO_LARGE_ERRNOS = {1153, 2020}
+
+def max_allowed_packet(conn):
+    """Lee max_allowed_packet del servidor de la conexión."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT @@max_allowed_packet")
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+def is_packet_too_large(error):
+    return getattr(error, "errno", None) in PACKET_TOO_LARGE_ERRNOS
+
+def encoded_size(value):
+    """Tamaño aproximado en bytes de un valor dentro de la sentencia SQL."""
+    if value is None:
+        return 4
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return 2 * len(value)
+    return len(str(value))
+
+def estimate_row_size(rows):
+    """Tamaño medio por fila de rows, a partir de una muestra repartida por todo el lote."""
+    if not rows:
+        return 1
+    sample = rows[::max(1, len(rows) // SIZE_SAMPLE_ROWS)][:SIZE_SAMPLE_ROWS]
+    total = sum(encoded_size(value) + VALUE_OVERHEAD for row in sample for value in row)
+    return max(1, total // len(sample))
+
+class AdaptiveBatcher:
+    """Tamaño de lote de una tabla, ajustado con cada lote que se carga."""
+
+    def __init__(self, packet_limit=None, initial_size=INITIAL_BATCH_SIZE, target_seconds=TARGET_BATCH_SECONDS,
+                 min_size=MIN_BATCH_SIZE, max_size=MAX_BATCH_SIZE):
+        # packet_limit=None: sin límite de paquete (p. ej. LOAD DATA, que envía el fichero por partes)
+        self.packet_limit = packet_limit
+        self.size = initial_size
+        self.target_seconds = target_seconds
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def _clamp(self, size):
+        return max(self.min_size, min(self.max_size, size))
+
+    def next_size(self, rows, start):
+        """Filas del siguiente lote a partir de rows[start]."""
+        size = self.size
+        if self.packet_limit:
+            row_size = estimate_row_size(rows[start:start + size])
+            size = min(size, int(self.packet_limit * PACKET_FILL) // row_size)
+        return self._clamp(size)
+
+    def record(self, rows, seconds, planned=None):
+        """
+        Ajusta el tamaño según lo que ha tardado un lote completo. planned es el tamaño que dio
+        next_size para ese lote (por defecto self.size): un lote recortado por packet_limit está
+        completo y también cuenta.
+        """
+        planned = self.size if planned is None else planned
+        if rows < planned or seconds <= 0:
+            return  # el último lote, más corto, no es representativo
+        factor = min(2.0, max(0.5, self.target_seconds / seconds))
+        # Un lote lento se reduce desde lo que se envió de verdad, no desde el tamaño sin recortar
+        base = planned if factor < 1 else self.size
+        self.size = self._clamp(int(base * factor))
+
+    def overflow(self, batch):
+        """
+        El servidor rechazó batch por tamaño: se toma su tamaño estimado como límite de paquete,
+        de modo que los lotes siguientes no pasen de la mitad.
+        """
+        failed_bytes = estimate_row_size(batch) * len(batch)
+        self.packet_limit = min(self.packet_limit or failed_bytes, failed_bytes)
+        self.size = self._clamp(len(batch) // 2)
+
+    def run(self, rows, load_batch):
+        """
+        Llama a load_batch(lote) sobre todas las filas en lotes adaptativos y devuelve cuántas se cargaron.
+        load_batch puede devolver las filas cargadas (si descarta alguna) o None (todas).
+        """
+        loaded = 0
+        start = 0
+        while start < len(rows):
+            size = self.next_size(rows, start)
+            batch = rows[start:start + size]
+            began = time.perf_counter()
+            try:
+                result = load_batch(batch)
+            except Exception as e:
+                if not is_packet_too_large(e) or len(batch) <= self.min_size:
+                    raise
+                print(f"⚠️ Lote de {len(batch)} filas demasiado grande para el servidor. Se reduce a la mitad.")
+                self.overflow(batch)
+                continue
+            self.record(len(batch), time.perf_counter() - began, size)
+            loaded += len(batch) if result is None else result
+            start += len(batch)
+        return loaded
@@ -0,0 +1,110 @@
+"""
+Benchmark de la carga de las tablas de CVE: executemany frente a LOAD DATA LOCAL INFILE.
+
+Crea una base de datos desechable (<DB_CVE>_bench) en el MySQL local configurado en
+src/config/db_config.py, la carga con un corpus sintético por ambos caminos y muestra filas/s.
+
+Uso:
+    python -m src.etl.benchmarks.bench_bulk_load --records 20000
+"""
+import argparse
+import time
+from src.config.db_config import connect_db_cve, create_db, DB_CVE
+from src.etl.bulk_load import enable_local_infile, parse_upsert
+from src.etl.cve_ETL import CVE_TABLES, cve_batchers, insert_table_rows, transform_cve_record
+from src.etl.benchmarks.synthetic import synthetic_cve_records
+
+BENCH_DB = f"{DB_CVE}_bench"
+
+def create_bench_db():
+    """(Re)crea la base de datos del benchmark con BBDD/BBDD_CVE.sql y devuelve sus tablas."""
+    conn = create_db()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB}`")
+    cursor.execute(f"CREATE DATABASE `{BENCH_DB}`")
+    conn.database = BENCH_DB
+    with open('BBDD/BBDD_CVE.sql', 'r') as sql_file:
+        sql_script = sql_file.read()
+    for statement in sql_script.split(';'):
+        if statement.strip():
+            cursor.execute(statement)
+    conn.commit()
+    cursor.execute("SHOW TABLES")
+    tables = {t[0].lower() for t in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return tables
+
+def build_corpus(records):
+    """Transforma el corpus sintético en las filas de cada tabla de CVE_TABLES."""
+    rows = [[] for _ in CVE_TABLES]
+    for data in synthetic_cve_records(records):
+        for idx, table_rows in transform_cve_record(data).items():
+            rows[idx].extend(table_rows)
+    return rows
+
+def truncate_tables(conn, tables):
+    cursor = conn.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in tables:
+        cursor.execute(f"TRUNCATE TABLE `{table}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+    cursor.close()
+
+def run(conn, corpus, bulk):
+    """Carga el corpus en orden de CVE_TABLES y devuelve (filas, segundos)."""
+    cursor = conn.cursor(prepared=True)
+    bulk_cursor = conn.cursor() if bulk else None
+    batchers = cve_batchers(conn, bulk=bulk)
+    total = 0
+    start = time.perf_counter()
+    for spec, rows in zip(CVE_TABLES, corpus):
+        if rows:
+            total += insert_table_rows(conn, cursor, spec, rows, batchers[spec["name"]], bulk_cursor)
+    elapsed = time.perf_counter() - start
+    cursor.close()
+    if bulk_cursor is not None:
+        bulk_cursor.close()
+    return total, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="executemany vs LOAD DATA LOCAL INFILE en las tablas de CVE")
+    parser.add_argument("--records", type=int, default=20000, help="CVEs sintéticos a generar")
+    args = parser.parse_args()
+
+    print(f"🔄 Creando la base de datos {BENCH_DB}...")
+    existing = create_bench_db()
+
+    print(f"🔄 Generando {args.records} CVEs sintéticos...")
+    corpus = build_corpus(args.records)
+    # Se omiten las tablas de CVE_TABLES que no existen en el esquema
+    tables = []
+    for idx, spec in enumerate(CVE_TABLES):
+        table = parse_upsert(spec["sql"])[1]
+        if table.lower() in existing:
+            tables.append(table)
+        else:
+            print(f"⚠️ La tabla {table} no existe en BBDD_CVE.sql. Se omite ({len(corpus[idx])} filas).")
+            corpus[idx] = []
+    print(f"📊 {sum(len(rows) for rows in corpus)} filas en {len(tables)} tablas.")
+
+    conn = connect_db_cve()
+    conn.database = BENCH_DB
+    if not enable_local_infile(conn):
+        print("❌ El servidor no tiene local_infile=ON (SET GLOBAL local_infile = 1).")
+        return
+    conn.database = BENCH_DB
+
+    results = {}
+    for name, bulk in (("executemany", False), ("load_data", True)):
+        truncate_tables(conn, tables)
+        rows, elapsed = run(conn, corpus, bulk)
+        results[name] = rows / elapsed
+        print(f"⏱️ {name}: {rows} filas en {elapsed:.2f}s ({rows / elapsed:.0f} filas/s)")
+
+    print(f"🚀 LOAD DATA es {results['load_data'] / results['executemany']:.2f}x más rápido que executemany.")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
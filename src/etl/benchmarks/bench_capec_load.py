@@ -0,0 +1,119 @@
+"""
+Benchmark de la carga de CAPEC: una conexión nueva por trozo y un pool.map bloqueante por tabla
+(implementación anterior) frente a una conexión por proceso del Pool (init_capec_worker) y todas
+las tablas encoladas en el mismo Pool según el orden de sus FK. Informa de las filas/s.
+
+Usa una base de datos desechable (<DB_CAPEC>_bench) creada con BBDD/BBDD_Capec.sql.
+
+Uso:
+    python -m src.etl.benchmarks.bench_capec_load --xml capec_latest.xml
+"""
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from multiprocessing import Pool, cpu_count
+from src.config.db_config import connect_db_capec, create_db, DB_CAPEC
+from src.etl.batch_executor import execute_batch
+from src.etl.batching import AdaptiveBatcher, max_allowed_packet
+from src.etl.capec_ETL import CAPEC_SCHEMA, CAPEC_TABLES, load_capec_data, transform_capec_data
+from src.etl.integrity import set_session_checks
+
+BENCH_DB = f"{DB_CAPEC}_bench"
+
+def create_bench_db():
+    """(Re)crea la base de datos del benchmark con el esquema de CAPEC."""
+    conn = create_db()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB}`")
+    cursor.execute(f"CREATE DATABASE `{BENCH_DB}`")
+    conn.database = BENCH_DB
+    with open(CAPEC_SCHEMA, 'r') as sql_file:
+        sql_script = sql_file.read()
+    for statement in sql_script.split(';'):
+        if statement.strip():
+            cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def bench_connection():
+    conn = connect_db_capec()
+    conn.database = BENCH_DB
+    return conn
+
+def truncate_tables():
+    conn = bench_connection()
+    cursor = conn.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for spec in CAPEC_TABLES:
+        cursor.execute(f"TRUNCATE TABLE `{spec['name']}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+_legacy_batchers = {}
+
+def legacy_insert_chunk(args):
+    """Implementación anterior de _insert_chunk: abre y cierra una conexión por trozo."""
+    name, query, chunk = args
+    if not chunk:
+        return 0
+    conn = bench_connection()
+    set_session_checks(conn, False)
+    cursor = conn.cursor()
+    if query not in _legacy_batchers:
+        _legacy_batchers[query] = AdaptiveBatcher(max_allowed_packet(conn))
+
+    def upsert(batch):
+        cursor.executemany(query, batch)
+        conn.commit()
+
+    inserted = _legacy_batchers[query].run(chunk, lambda batch: execute_batch(conn, batch, upsert, name, cursors=(cursor,)))
+    cursor.close()
+    conn.close()
+    return inserted
+
+def legacy_load_capec_data(data, batch_size=1000):
+    """Implementación anterior de load_capec_data: un pool.map bloqueante por tabla."""
+    workers = cpu_count()
+    pool = Pool(processes=workers)
+    total = 0
+    start = time.perf_counter()
+    for spec in CAPEC_TABLES:
+        dataset = data[spec["key"]]
+        if not dataset:
+            continue
+        chunk_size = max(batch_size, -(-len(dataset) // workers))
+        tasks = [(spec["name"], spec["sql"], dataset[i:i + chunk_size]) for i in range(0, len(dataset), chunk_size)]
+        total += sum(pool.map(legacy_insert_chunk, tasks))
+    pool.close()
+    pool.join()
+    return total, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de CAPEC con conexión por trozo frente a conexión por proceso")
+    parser.add_argument("--xml", default="capec_latest.xml", help="Catálogo CAPEC (capec_latest.xml)")
+    args = parser.parse_args()
+
+    data = transform_capec_data(ET.parse(args.xml).getroot())
+    print(f"📊 {sum(len(data[spec['key']]) for spec in CAPEC_TABLES)} filas en {len(CAPEC_TABLES)} tablas.")
+
+    print(f"🔄 Creando la base de datos {BENCH_DB}...")
+    create_bench_db()
+
+    results = {}
+    runs = (
+        ("conexión por trozo", legacy_load_capec_data),
+        ("conexión por proceso", lambda data: load_capec_data(data, defer_checks=True, database=BENCH_DB)),
+    )
+    for name, load in runs:
+        truncate_tables()
+        rows, elapsed = load(data)
+        results[name] = rows / elapsed
+        print(f"⏱️ {name}: {rows} filas en {elapsed:.2f}s ({rows / elapsed:.0f} filas/s)")
+
+    print(f"🚀 La conexión por proceso es {results['conexión por proceso'] / results['conexión por trozo']:.2f}x más rápida.")
+
+if __name__ == "__main__":
+    main()
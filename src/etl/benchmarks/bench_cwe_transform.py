@@ -0,0 +1,434 @@
+"""
+Benchmark de transform_cwe_data (cwe_ETL): recorrido único de cada Weakness con despacho por
+etiqueta frente a la implementación anterior, que lanzaba ~25 búsquedas findall('.//X/Y') por
+Weakness. Comprueba que las 24 listas de filas son idénticas.
+
+Uso:
+    python -m src.etl.benchmarks.bench_cwe_transform --zip cwec_latest.xml.zip
+    python -m src.etl.benchmarks.bench_cwe_transform --weaknesses 1000
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import timeit
+import xml.etree.ElementTree as ET
+from src.etl.cwe_ETL import CWE_TABLES, generate_hash, namespaces, transform_cwe_data
+from src.etl.download import open_zip_member
+from src.etl.text_utils import extract_all_text_from_element
+from src.etl.benchmarks.synthetic import write_cwe_catalog
+
+def legacy_transform_cwe_data(root):
+    """Implementación anterior de transform_cwe_data (una búsqueda .// por sección y Weakness)."""
+    # Extract CWE items
+    cwe_items = []
+    references = []
+    external_references = []
+    capec_references = []
+    references_externals_table = []
+
+    # Extract Aplicable_Platforms
+    languages = []
+    architectures = []
+    technologies = []
+    operating_systems = []
+
+    # Extract Potential_Mitigations
+    mitigations = []
+
+    # Extract Alternate_Terms
+    alternate_terms = []
+
+    # Extract Modes_Of_Introduction
+    modes_of_introduction = []
+
+    # RElated_WEAKNESSES
+    related_weaknesses = []
+
+    # Extract Detection_Methods
+    detection_methods = []
+
+    # Extract observed examples
+    observed_examples = []
+
+    # Extract Common Consequences
+    consequences = []
+
+    # Extract Background_Details
+    backgroun_details = []
+
+    # Extract Notes
+    notes = []
+
+    # Extract Usage Details
+    mapping_notes = []
+
+    # Extract mapping_suggestions
+    mapping_suggestions = []
+
+    # Extract Functional_Areas
+    functional_areas = []
+
+    # Extract Affected Resources
+    affected_resources = []
+
+    weakness_ordinalities = []
+    taxonomy_mapping = []
+    demostrative_examples = []
+
+    # Extract WEAKNESS nodes
+    weakness_nodes = root.findall('.//Weakness', namespaces)
+    for weakness in weakness_nodes:
+        weakness_id = weakness.get('ID')
+        weakness_name = weakness.get('Name')
+        weakness_abstraction = weakness.get('Abstraction')
+        weakness_structure = weakness.get('Structure')
+        weakness_status = weakness.get('Status')
+        
+        weakness_description = weakness.find('Description', namespaces).text if weakness.find('Description', namespaces) is not None else None
+
+        # Extract extended description
+        extended_description_elem = weakness.find('Extended_Description', namespaces)
+        extended_description = extract_all_text_from_element(extended_description_elem)
+
+        likelihood_of_exploit = weakness.find('Likelihood_Of_Exploit', namespaces).text if weakness.find('Likelihood_Of_Exploit', namespaces) is not None else None
+        # Ensure likelihood_of_exploit value is valid
+        valid_likelihoods = {'Low', 'Medium', 'High', 'Unknown'}
+        if likelihood_of_exploit not in valid_likelihoods:
+            likelihood_of_exploit = 'Unknown'
+        
+        diagram = weakness.get('Diagram')
+        
+        # Extract references within weaknesses
+        references = weakness.findall('References/Reference', namespaces)
+        for reference in references:
+            external_reference_id = reference.get('External_Reference_ID')
+            section = reference.get('Section')
+            references_externals_table.append((weakness_id, external_reference_id, section))
+
+        # Extract related attack patterns within weaknesses
+        related_attack_patterns = weakness.findall('Related_Attack_Patterns/Related_Attack_Pattern', namespaces)
+        for attack_pattern in related_attack_patterns:
+            capec_id = attack_pattern.get('CAPEC_ID')
+            capec_references.append((weakness_id, capec_id))
+
+        # Extract Applicable_Platforms
+        platforms = weakness.findall('.//Applicable_Platforms', namespaces)
+        valid_prevalences = {'Often', 'Sometimes', 'Rarely', 'Undetermined'}
+        for idx_platform, platform in enumerate(platforms):
+            for idx_language, language in enumerate(platform.findall('Language', namespaces)):
+                language_name = language.get('Name')
+                language_class = language.get('Class')
+                language_prevalence = language.get('Prevalence')
+                if language_prevalence not in valid_prevalences:
+                    language_prevalence = 'Undetermined'
+        
+                #hashear el objeto y guardarlo como ID para evitar duplicados
+                
+                language_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_language}")
+
+                languages.append((language_hash_id, weakness_id, language_name, language_class, language_prevalence))
+            for idx_architecture, architecture in enumerate(platform.findall('Architecture', namespaces)):
+                architecture_name = architecture.get('Name')
+                architecture_class = architecture.get('Class')
+                architecture_prevalence = architecture.get('Prevalence')
+                if architecture_prevalence not in valid_prevalences:
+                    architecture_prevalence = 'Undetermined'
+                
+                #hashear el objeto y guardarlo como ID para evitar duplicados
+                architecture_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_architecture}")
+                architectures.append((architecture_hash_id, weakness_id, architecture_name, architecture_class, architecture_prevalence))            
+            for idx_technology, technology in enumerate(platform.findall('Technology', namespaces)):
+                technology_name = technology.get('Name')
+                technology_class = technology.get('Class')
+                technology_prevalence = technology.get('Prevalence')
+                if technology_prevalence not in valid_prevalences:
+                    technology_prevalence = 'Undetermined'
+                
+                technology_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_technology}")
+                technologies.append((technology_hash_id, weakness_id, technology_name, technology_class, technology_prevalence))
+            for idx_operating_system, operating_system in enumerate(platform.findall('Operating_System', namespaces)):
+                operating_system_name = operating_system.get('Name')
+                operating_system_class = operating_system.get('Class')
+                operating_system_prevalence = operating_system.get('Prevalence')
+                if operating_system_prevalence not in valid_prevalences:
+                    operating_system_prevalence = 'Undetermined'
+                operating_system_cpeID = operating_system.get('CPE_ID')
+                operating_system_version = operating_system.get('Version')
+                
+                operating_system_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_operating_system}")
+                operating_systems.append((operating_system_hash_id, weakness_id, operating_system_name, operating_system_class, operating_system_cpeID, operating_system_version, operating_system_prevalence))
+ 
+        # Extract Potential_Mitigations
+        mitigations_container = weakness.findall('.//Potential_Mitigations/Mitigation', namespaces)
+        for idx_mitigation, mitigation in enumerate(mitigations_container):
+            mitigation_id = mitigation.get('Mitigation_ID')
+
+            # Extract mitigation_description
+            mitigation_description_elem = mitigation.find('Description', namespaces)
+            mitigation_description = extract_all_text_from_element(mitigation_description_elem)
+
+            phase = mitigation.find('Phase', namespaces).text if mitigation.find('Phase', namespaces) is not None else None
+            strategy = mitigation.find('Strategy', namespaces).text if mitigation.find('Strategy', namespaces) is not None else None
+            # Extract effectiveness
+            effectiveness = mitigation.find('Effectiveness', namespaces).text if mitigation.find('Effectiveness', namespaces) is not None else None
+            valid_effectiveness = {'High', 'Moderate', 'Limited', 'Incidental', 'Discouraged Common Practice', 'Defense in Depth', 'None'}
+            if effectiveness not in valid_effectiveness:
+                effectiveness = None 
+            
+            # Extract effectiveness_notes
+            effectiveness_notes_el = mitigation.find('Effectiveness_Notes', namespaces)
+            effectiveness_notes = extract_all_text_from_element(effectiveness_notes_el)
+
+            # Hashear el objeto y guardarlo como ID para evitar duplicados
+            mitigation_hash_id = generate_hash(f"{weakness_id}_{idx_mitigation}")
+            
+            mitigations.append((mitigation_hash_id, weakness_id, mitigation_id, mitigation_description, phase, strategy, effectiveness, effectiveness_notes))
+
+        # Extract Alternate terms
+        alternate_terms_container = weakness.findall('.//Alternate_Terms/Alternate_Term', namespaces)
+        for idx_term, term in enumerate(alternate_terms_container):
+            term_name = term.find('Term', namespaces).text if term.find('Term', namespaces) is not None else None
+            term_description_elem = term.find('Description', namespaces)
+            term_description = extract_all_text_from_element(term_description_elem)
+            term_id = generate_hash(f"{weakness_id}_{idx_term}")
+            alternate_terms.append((term_id, weakness_id, term_name, term_description))
+
+        # Extract Modes_Of_Introduction
+        modes_of_introduction_container = weakness.findall('.//Modes_Of_Introduction/Introduction', namespaces)
+        for idx, introduction in enumerate(modes_of_introduction_container):
+            introduction_phase = introduction.find('Phase', namespaces).text if introduction.find('Phase', namespaces) is not None else None
+            introduction_description_elem = introduction.find('Note', namespaces)
+            introduction_note = extract_all_text_from_element(introduction_description_elem)
+            introduction_id = generate_hash(f"{weakness_id}_{idx}")
+            modes_of_introduction.append((introduction_id, weakness_id, introduction_phase, introduction_note))
+
+        # Extract Related_Weaknesses
+        related_weaknesses_container = weakness.findall('.//Related_Weaknesses/Related_Weakness', namespaces)
+        for related_weakness in related_weaknesses_container:
+            related_nature = related_weakness.get('Nature')
+            related_weakness_id = related_weakness.get('CWE_ID')
+            related_view = related_weakness.get('View_ID')
+            related_chain = related_weakness.get('Chain_ID')
+            related_ordinal = related_weakness.get('Ordinal')
+            related_weaknesses.append((weakness_id, related_nature, related_weakness_id, related_view, related_chain, related_ordinal))
+
+        # Extract Detection_Methods
+        detection_methods_container = weakness.findall('.//Detection_Methods/Detection_Method', namespaces)
+        for idx_detection, detection_method in enumerate(detection_methods_container):
+            detection_method_id = detection_method.get('Detection_Method_ID')
+            detection_method_name = detection_method.find('Method', namespaces).text if detection_method.find('Method', namespaces) is not None else None
+            detection_method_description_elem = detection_method.find('Description', namespaces) if detection_method.find('Description', namespaces) is not None else None
+            detection_method_description = extract_all_text_from_element(detection_method_description_elem)
+            
+            detection_effectiveness = detection_method.find('Effectiveness', namespaces).text if detection_method.find('Effectiveness', namespaces) is not None else None
+            valid_effectiveness = {'High', 'Moderate', 'SOAR Partial', 'Opportunistic', 'Limited', 'None'}
+            if detection_effectiveness not in valid_effectiveness:
+                detection_effectiveness = None
+            detection_effectiveness_notes_el = detection_method.find('Effectiveness_Notes', namespaces) if detection_method.find('Effectiveness_Notes', namespaces) is not None else None
+            detection_effectiveness_notes = extract_all_text_from_element(detection_effectiveness_notes_el)
+
+            detection_method_hash_id = generate_hash(f"{weakness_id}_{idx_detection}")
+
+            detection_methods.append((detection_method_hash_id, weakness_id, detection_method_id, detection_method_name, detection_method_description, detection_effectiveness, detection_effectiveness_notes))
+
+        # Extract Observed_Examples
+        observed_examples_container = weakness.findall('.//Observed_Examples/Observed_Example', namespaces)
+        for example in observed_examples_container:
+            example_id = example.find('Reference', namespaces).text
+            example_description_elem = example.find('Description', namespaces)
+            example_description = extract_all_text_from_element(example_description_elem)
+            example_url = example.find('Link', namespaces).text if example.find('Link', namespaces) is not None else None
+            observed_examples.append((weakness_id, example_id, example_description, example_url))
+        
+        # Extract Common Consequences
+        consequences_container = weakness.findall('.//Common_Consequences/Consequence', namespaces)
+        for idx_consequence, consequence in enumerate(consequences_container):
+            consequence_id = consequence.get('Consequence_ID') if consequence.get('Consequence_ID') is not None else None
+            consequence_scope = consequence.find('Scope', namespaces).text if consequence.find('Scope', namespaces) is not None else None
+            valid_scopes = {'Confidentiality', 'Integrity', 'Availability', 'Access Control', 'Accountability', 'Authentication', 'Authorization', 'Non-Repudiation', 'Other'}
+            if consequence_scope not in valid_scopes:
+                consequence_scope = 'Other'  # or handle appropriately
+
+            consequence_impact = consequence.find('Impact', namespaces).text if consequence.find('Impact', namespaces) is not None else None
+            consequence_likelihood = consequence.find('Likelihood', namespaces).text if consequence.find('Likelihood', namespaces) is not None else None
+            valid_likelihoods = {'Low', 'Medium', 'High', 'Unknown'}
+            if consequence_likelihood not in valid_likelihoods:
+                consequence_likelihood = 'Unknown'
+            consequence_note_elem = consequence.find('Note', namespaces)
+            consequence_note = extract_all_text_from_element(consequence_note_elem)
+            consequence_hash_id = generate_hash(f"{weakness_id}_{idx_consequence}")
+            consequences.append((consequence_hash_id, weakness_id, consequence_id, consequence_scope, consequence_impact, consequence_likelihood, consequence_note))
+
+        # Extract Background_Details
+        background_details_container = weakness.findall('.//Background_Details/Background_Detail', namespaces)
+        for idx_back, background_detail in enumerate(background_details_container):
+            back_id = generate_hash(f"{weakness_id}_{idx_back}")
+            background_detail_text = extract_all_text_from_element(background_detail)
+            backgroun_details.append((back_id, weakness_id, background_detail_text))
+
+        # Extract Notes
+        notes_container = weakness.findall('.//Notes/Note', namespaces)
+        for idx_note, note in enumerate(notes_container):
+            note_type = note.get('Type')
+            note_text = extract_all_text_from_element(note)
+            note_id = generate_hash(f"{weakness_id}_{idx_note}")
+            notes.append((note_id, weakness_id, note_type, note_text))
+
+        # Extract Mapping_Notes
+        mapping_notes_container = weakness.findall('.//Mapping_Notes', namespaces)
+        for mapping_note in mapping_notes_container:
+            mapping_usage = mapping_note.find('Usage', namespaces).text if mapping_note.find('Usage', namespaces) is not None else None
+            valid_usages = {'Discouraged', 'Prohibited', 'Allowed', 'Allowed-with-Review'}
+            if mapping_usage not in valid_usages:
+                mapping_usage = None  # or handle appropriately
+
+            mapping_rationale_elem = mapping_note.find('Rationale', namespaces)
+            mapping_rationale_text = extract_all_text_from_element(mapping_rationale_elem)
+
+            mapping_comment_elem = mapping_note.find('Comments', namespaces)
+            mapping_comment_text = extract_all_text_from_element(mapping_comment_elem)
+
+            # Join all reasons by commas
+            mapping_reasons_container = mapping_note.findall('.//Reasons/Reason', namespaces)
+            mapping_reasons_text = ', '.join(str(reason.get('Type') or '') for reason in mapping_reasons_container)
+            
+            # Create a hash of the object
+            hash_object = f"{weakness_id}{mapping_usage}{mapping_rationale_text}{mapping_comment_text}{mapping_reasons_text}"
+            mapping_note_id = hashlib.md5(hash_object.encode()).hexdigest()
+            
+            # Extract Suggestions
+            suggestions_container = mapping_note.findall('.//Suggestions/Suggestion', namespaces)
+            for suggestion in suggestions_container:
+                suggestion_cwe_id = suggestion.get('CWE_ID')
+                suggestion_comment = suggestion.get('Comment')
+                mapping_suggestions.append((mapping_note_id, suggestion_cwe_id, suggestion_comment))
+           
+            # Append the mapping_note_id to the mapping_notes tuple
+            mapping_notes.append((mapping_note_id, weakness_id, mapping_usage, mapping_rationale_text, mapping_comment_text, mapping_reasons_text))
+
+        # Extract Functional_Areas
+        functional_areas_container = weakness.findall('.//Functional_Areas/Functional_Area', namespaces)
+        for functional_area in functional_areas_container:
+            functional_areas.append((weakness_id, functional_area.text))
+
+        # Extract Affected_Resources
+        affected_resources_container = weakness.findall('.//Affected_Resources/Affected_Resource', namespaces)
+        for affected_resource in affected_resources_container:
+            affected_resource_resource = affected_resource.text
+            valid_affected_resource = {'CPU', 'File or Directory', 'Memory', 'System Process', 'Other'}
+            if affected_resource_resource not in valid_affected_resource:
+                affected_resource_resource = 'Other'
+            affected_resources.append((weakness_id, affected_resource_resource))
+
+        # Extract Weakness_Ordinalities
+        weakness_ordinalities_container = weakness.findall('.//Weakness_Ordinalities/Weakness_Ordinality', namespaces)
+        for ordinality in weakness_ordinalities_container:
+            ordinality_name = ordinality.find('Ordinality', namespaces).text
+            valid_ordinalities = {'Indirect', 'Primary', 'Resultant'}
+            if ordinality_name not in valid_ordinalities:
+                ordinality_name = None  # or handle appropriately
+            ordinality_description = ordinality.find('Description', namespaces).text if ordinality.find('Description', namespaces) is not None else None
+            weakness_ordinalities.append((weakness_id, ordinality_name, ordinality_description))
+        
+        # Extract Taxonomy_Mappings
+        taxonomy_mappings_container = weakness.findall('.//Taxonomy_Mappings/Taxonomy_Mapping', namespaces)
+        for mapping in taxonomy_mappings_container:
+            mapping_name = mapping.get('Taxonomy_Name')
+            mapping_entry_id = mapping.find('Entry_ID', namespaces).text if mapping.find('Entry_ID', namespaces) is not None else None
+            mapping_entry_name_elem = mapping.find('Entry_Name', namespaces)
+            mapping_entry_name = extract_all_text_from_element(mapping_entry_name_elem)
+            
+            mapping_fit_elem = mapping.find('Mapping_Fit', namespaces)
+            mapping_fit = mapping_fit_elem.text if mapping_fit_elem is not None else None
+            valid_mapping_fits = {'Exact', 'CWE More Abstract', 'CWE More Specific', 'Imprecise', 'Perspective'}
+            if mapping_fit not in valid_mapping_fits:
+                mapping_fit = None  # Evita errores por valores inválidos
+
+
+            taxonomy_mapping.append((weakness_id, mapping_name, mapping_entry_id, mapping_entry_name, mapping_fit))
+
+        # Extract Demonstrative_Examples
+        demostrative_examples_container = weakness.findall('.//Demonstrative_Examples/Demonstrative_Example', namespaces)
+        for idx_demostrative_example, demostrative_example in enumerate(demostrative_examples_container):
+            demostrative_example_hash = generate_hash(f"{weakness_id}_{idx_demostrative_example}")
+            demostrative_example_id = demostrative_example.get('Demonstrative_Example_ID')
+            demostrative_example_tittle = demostrative_example.find('Title_Text', namespaces).text if demostrative_example.find('Title_Text', namespaces) is not None else ''
+            demostrative_example_intro_elem = demostrative_example.find('Intro_Text', namespaces)
+            demostrative_example_intro = extract_all_text_from_element(demostrative_example_intro_elem)
+
+            demostrative_example_body_elem = demostrative_example.findall('Body_Text', namespaces)
+            demostrative_example_body = extract_all_text_from_element(demostrative_example_body_elem)
+
+            demostrative_example_code_elem = demostrative_example.findall('Example_Code', namespaces)
+            demostrative_example_code = extract_all_text_from_element(demostrative_example_code_elem)
+
+            demostrative_examples_references_elem = demostrative_example.findall('References', namespaces)
+            demostrative_examples_references = extract_all_text_from_element(demostrative_examples_references_elem)
+
+            demostrative_examples.append((demostrative_example_hash, weakness_id, demostrative_example_id, demostrative_example_tittle, demostrative_example_intro, demostrative_example_body, demostrative_example_code, demostrative_examples_references))
+
+        cwe_items.append((weakness_id, weakness_name, weakness_description, extended_description, weakness_structure, weakness_abstraction, weakness_status, likelihood_of_exploit, diagram))
+
+    # Extract CWE External references
+    external_references_xml = root.findall('.//External_Reference', namespaces)
+    for ref in external_references_xml:
+        reference_id = ref.get('Reference_ID')
+        authors = [author.text if author.text is not None else '' for author in ref.findall('Author', namespaces)] if ref.findall('Author', namespaces) else []
+        authors_text = ', '.join(authors)
+        title = ref.find('Title', namespaces).text if ref.find('Title', namespaces) is not None else None
+        edition = ref.find('Edition', namespaces).text if ref.find('Edition', namespaces) is not None else None
+        publication = ref.find('Publication', namespaces).text if ref.find('Publication', namespaces) is not None else None
+        publisher = ref.find('Publisher', namespaces).text if ref.find('Publisher', namespaces) is not None else None
+        publication_year = ref.find('Publication_Year', namespaces).text if ref.find('Publication_Year', namespaces) is not None else None
+        publication_month = ref.find('Publication_Month', namespaces).text if ref.find('Publication_Month', namespaces) is not None else None
+        if publication_month and publication_month.startswith('--'):
+            publication_month = publication_month[2:]
+        publication_day = ref.find('Publication_Day', namespaces).text if ref.find('Publication_Day', namespaces) is not None else None
+        if publication_day and publication_day.startswith('---'):
+            publication_day = publication_day[3:]
+        
+        url = ref.find('URL', namespaces).text if ref.find('URL', namespaces) is not None else None
+        url_date = ref.find('URL_Date', namespaces).text if ref.find('URL_Date', namespaces) is not None else None
+        external_references.append((reference_id, authors_text, title, edition, publication, publisher, publication_year, publication_month, publication_day, url, url_date))
+
+    return cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples
+
+def load_root(args):
+    if args.zip:
+        with open_zip_member(args.zip) as xml_file:
+            return ET.parse(xml_file).getroot()
+    if args.xml:
+        return ET.parse(args.xml).getroot()
+    xml_path = os.path.join(tempfile.mkdtemp(), "cwe.xml")
+    print(f"🔄 Generando un catálogo sintético con {args.weaknesses} Weakness...")
+    write_cwe_catalog(xml_path, args.weaknesses)
+    try:
+        return ET.parse(xml_path).getroot()
+    finally:
+        os.remove(xml_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="transform_cwe_data frente a la versión anterior")
+    parser.add_argument("--zip", help="cwec_latest.xml.zip descargado de cwe.mitre.org")
+    parser.add_argument("--xml", help="Catálogo CWE ya descomprimido")
+    parser.add_argument("--weaknesses", type=int, default=1000, help="Weakness del catálogo sintético (sin --zip ni --xml)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = load_root(args)
+    print(f"📊 {len(root.findall('.//Weakness', namespaces))} Weakness.")
+
+    legacy = legacy_transform_cwe_data(root)
+    current = transform_cwe_data(root)
+    for spec, before_rows, rows in zip(CWE_TABLES, legacy, current):
+        assert before_rows == rows, f"las filas de {spec['name']} no coinciden con las de la versión anterior"
+    counts = ', '.join(f"{spec['name']}={len(rows)}" for spec, rows in zip(CWE_TABLES, current))
+    print(f"✅ Filas idénticas: {counts}")
+
+    before = min(timeit.repeat(lambda: legacy_transform_cwe_data(root), number=1, repeat=args.repeat))
+    after = min(timeit.repeat(lambda: transform_cwe_data(root), number=1, repeat=args.repeat))
+    print(f"⏱️ transform_cwe_data antes {before:6.2f}s | ahora {after:6.2f}s | {before / after:5.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de convert_iso_to_mysql_datetime: fromisoformat + strftime frente al recorte directo
+con caché, sobre los formatos de fecha que aparecen en cvelistV5. Comprueba que la salida es idéntica.
+
+Uso:
+    python -m src.etl.benchmarks.bench_dates --values 200000
+"""
+import argparse
+import random
+import timeit
+from datetime import datetime
+from src.etl.date_utils import convert_iso_to_mysql_datetime
+
+# Formatos presentes en cveMetadata, providerMetadata, timeline, datePublic y dateAssigned
+FORMATS = (
+    "{date}T{time}.{ms}Z",        # dateUpdated / datePublished
+    "{date}T{time}",              # dateReserved antiguos, timeline
+    "{date}T{time}Z",             # providerMetadata de algunas CNA
+    "{date}T{time}.{ms}+00:00",   # timeline
+    "{date}T{time}.{us}Z",        # ADP
+    "{date}T{time}-05:00",        # CNA con zona horaria local
+)
+
+def legacy_convert(iso_datetime):
+    """Implementación anterior de convert_iso_to_mysql_datetime."""
+    if not iso_datetime:
+        return None
+    try:
+        dt = datetime.fromisoformat(iso_datetime.replace("Z", "+00:00"))
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+def sample_values(count, distinct, seed):
+    """count fechas con distinct valores distintos, como en un volcado real (muchas se repiten)."""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        fmt = rng.choice(FORMATS)
+        pool.append(fmt.format(
+            date=f"{rng.randint(1999, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            time=f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            ms=f"{rng.randint(0, 999):03d}",
+            us=f"{rng.randint(0, 999999):06d}",
+        ))
+    return [rng.choice(pool) for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversión de fechas ISO-8601 a DATETIME de MySQL")
+    parser.add_argument("--values", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    values = sample_values(args.values, args.distinct, args.seed)
+    assert [convert_iso_to_mysql_datetime(v) for v in values] == [legacy_convert(v) for v in values], "salida distinta"
+    print(f"✅ {len(values)} fechas ({args.distinct} distintas) convertidas igual que antes.")
+
+    uncached = convert_iso_to_mysql_datetime.__wrapped__
+    for name, func in (
+        ("fromisoformat", lambda: [legacy_convert(v) for v in values]),
+        ("recorte sin caché", lambda: [uncached(v) for v in values]),
+        ("recorte con caché", lambda: [convert_iso_to_mysql_datetime(v) for v in values]),
+    ):
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"⏱️ {name:<18} {best * 1e9 / len(values):7.0f} ns/fecha")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark del mantenimiento diferido de índices y FK (src/etl/integrity.py) en las tablas de CVE:
+carga con los índices del catálogo y las comprobaciones de FK/UNIQUE activas frente a quitarlos,
+cargar, reconstruir los índices y validar las FK con una sola consulta.
+
+Usa la misma base de datos desechable (<DB_CVE>_bench) que bench_bulk_load.
+
+Uso:
+    python -m src.etl.benchmarks.bench_deferred_checks --records 50000
+"""
+import argparse
+import time
+from src.config.db_config import connect_db_cve
+from src.etl.bulk_load import parse_upsert
+from src.etl.cve_ETL import CVE_SCHEMA, CVE_TABLES
+from src.etl.index import create_indexes
+from src.etl.integrity import deferred_checks, set_session_checks
+from src.etl.benchmarks.bench_bulk_load import BENCH_DB, build_corpus, create_bench_db, run, truncate_tables
+
+def bench_connection():
+    conn = connect_db_cve()
+    conn.database = BENCH_DB
+    return conn
+
+def main():
+    parser = argparse.ArgumentParser(description="Índices y FK activos frente a diferidos en las tablas de CVE")
+    parser.add_argument("--records", type=int, default=50000, help="CVEs sintéticos a generar")
+    args = parser.parse_args()
+
+    print(f"🔄 Creando la base de datos {BENCH_DB}...")
+    existing = create_bench_db()
+
+    print(f"🔄 Generando {args.records} CVEs sintéticos...")
+    corpus = build_corpus(args.records)
+    tables = []
+    for idx, spec in enumerate(CVE_TABLES):
+        table = parse_upsert(spec["sql"])[1]
+        if table.lower() in existing:
+            tables.append(table)
+        else:
+            corpus[idx] = []
+    print(f"📊 {sum(len(rows) for rows in corpus)} filas en {len(tables)} tablas.")
+
+    conn = bench_connection()
+    results = {}
+    for name, defer in (("comprobaciones activas", False), ("diferidas", True)):
+        truncate_tables(conn, tables)
+        create_indexes(conn, "cve")
+        start = time.perf_counter()
+        with deferred_checks(bench_connection, "cve", CVE_SCHEMA, enabled=defer):
+            set_session_checks(conn, not defer)
+            rows, load_elapsed = run(conn, corpus, bulk=False)
+            set_session_checks(conn, True)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"⏱️ {name}: {rows} filas, carga {load_elapsed:.2f}s, total con índices y validación {elapsed:.2f}s")
+
+    print(f"🚀 La carga diferida es {results['comprobaciones activas'] / results['diferidas']:.2f}x más rápida.")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
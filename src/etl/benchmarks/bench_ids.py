@@ -0,0 +1,65 @@
+"""
+Micro-benchmark de la generación de IDs de cve_ETL: json.dumps + MD5 frente al hash directo de
+la clave. Comprueba además que ambos caminos producen exactamente los mismos IDs. Para los
+hashes de contenedor compara el JSON ordenado + MD5 anterior con BLAKE2b del JSON ordenado y
+compacto, y comprueba que los hashes antiguos guardados se siguen reconociendo.
+
+Uso:
+    python -m src.etl.benchmarks.bench_ids --records 5000
+"""
+import argparse
+import hashlib
+import json
+import timeit
+from src.etl.cve_ETL import container_changed, generate_content_hash, generate_md5_hash
+from src.etl.benchmarks.synthetic import synthetic_cve_records
+
+def legacy_md5_hash(data):
+    """Implementación anterior de generate_md5_hash."""
+    json_data = json.dumps(data, sort_keys=True)
+    return hashlib.md5(json_data.encode('utf-8')).hexdigest()
+
+def sample_keys(records):
+    """Claves con la misma forma que las que genera transform_cve_tables."""
+    keys = []
+    for data in synthetic_cve_records(records):
+        container_id = data['cveMetadata']['cveId'] + "_cna"
+        keys.append(container_id)
+        for kind in ("timeline", "desc", "ref", "affected", "metric", "credit", "problem_type"):
+            parent = legacy_md5_hash(f"{container_id}_{kind}_0")
+            keys.extend(f"{container_id}_{kind}_{idx}" for idx in range(3))
+            keys.extend(f"{parent}_version_{idx}" for idx in range(3))
+        keys.append(f"{parent}_cvssv3_1")
+    return keys
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de generate_md5_hash antes y después")
+    parser.add_argument("--records", type=int, default=5000, help="CVEs sintéticos de los que sacar claves")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keys = sample_keys(args.records)
+    containers = [data['containers']['cna'] for data in synthetic_cve_records(min(args.records, 2000))]
+
+    assert [generate_md5_hash(k) for k in keys] == [legacy_md5_hash(k) for k in keys], "IDs distintos"
+    # El hash de contenedor cambia de esquema: no depende del orden de las claves ni distingue menos contenidos
+    reordered = [json.loads(json.dumps(dict(reversed(list(c.items()))))) for c in containers]
+    assert [generate_content_hash(c) for c in containers] == [generate_content_hash(c) for c in reordered], "hashes inestables"
+    assert len({generate_content_hash(c) for c in containers}) == len({legacy_md5_hash(c) for c in containers}), "colisiones"
+    # Los contenedores ya cargados guardan el hash anterior: no cuentan como modificados
+    assert not any(container_changed(legacy_md5_hash(c), generate_content_hash(c), c) for c in containers), "recarga de los ya cargados"
+    modified = [dict(c, title="changed") for c in containers]
+    assert all(container_changed(legacy_md5_hash(c), generate_content_hash(m), m) for c, m in zip(containers, modified)), "cambios no detectados"
+    print(f"✅ {len(keys)} IDs idénticos a la versión anterior y {len(containers)} hashes de contenedor estables y compatibles.")
+
+    for name, func, items in (
+        ("IDs json+md5", legacy_md5_hash, keys),
+        ("IDs directo", generate_md5_hash, keys),
+        ("contenedor antes", legacy_md5_hash, containers),
+        ("contenedor ahora", generate_content_hash, containers),
+    ):
+        best = min(timeit.repeat(lambda: [func(item) for item in items], number=1, repeat=args.repeat))
+        print(f"⏱️ {name:<17} {best * 1e9 / len(items):8.0f} ns/llamada")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark de memoria y serialización de la salida de los workers de cve_ETL: la tupla
+posicional de 38 listas frente al registro compacto {índice: filas} con columnas internadas.
+
+Usa una muestra de ficheros reales del ZIP de cvelistV5 (por defecto el que descarga la ETL).
+
+Uso:
+    python -m src.etl.benchmarks.bench_record_memory --zip cvelistV5-main.zip --sample 20000
+"""
+import argparse
+import json
+import pickle
+import random
+import time
+import tracemalloc
+import zipfile
+from src.etl.cve_ETL import ZIP_PATH, ZIP_SHARD_SIZE, compact_record, list_cve_members, transform_cve_tables
+
+def load_sample(zip_path, sample, seed):
+    members = list_cve_members(zip_path)
+    if sample < len(members):
+        members = random.Random(seed).sample(members, sample)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        return [json.loads(zip_ref.read(member)) for member in members]
+
+def measure(name, records):
+    """Serializa los registros en lotes como el Pool y mide tamaño, tiempos y memoria retenida."""
+    shards = [records[i:i + ZIP_SHARD_SIZE] for i in range(0, len(records), ZIP_SHARD_SIZE)]
+
+    start = time.perf_counter()
+    blobs = [pickle.dumps(shard) for shard in shards]
+    dump_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = [pickle.loads(blob) for blob in blobs]
+    load_time = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+
+    size = sum(len(blob) for blob in blobs)
+    print(f"{name:<10} pickle {size / 2**20:8.1f} MiB | dumps {dump_time:6.2f}s | "
+          f"loads {load_time:6.2f}s | memoria en el padre {retained / 2**20:8.1f} MiB")
+    return size, retained
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria de la tupla de 38 listas frente al registro compacto")
+    parser.add_argument("--zip", default=ZIP_PATH, help="ZIP de cvelistV5")
+    parser.add_argument("--sample", type=int, default=20000, help="ficheros CVE de la muestra")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = load_sample(args.zip, args.sample, args.seed)
+    print(f"🔄 Transformando {len(data)} CVEs...")
+    tuples = [tables for tables in map(transform_cve_tables, data) if tables]
+    compact = [compact_record(tables) for tables in map(transform_cve_tables, data) if tables]
+    del data
+
+    tuple_size, tuple_mem = measure("tupla", tuples)
+    compact_size, compact_mem = measure("compacto", compact)
+    print(f"📊 Pickle {tuple_size / compact_size:.2f}x más pequeño, memoria {tuple_mem / compact_mem:.2f}x menor.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark de src/etl/text_utils.py frente a las implementaciones anteriores de clean_for_sql
+(cve_ETL) y escape_characters (cwe_ETL), sobre textos reales de cvelistV5 (descripciones,
+títulos, soluciones...). Comprueba también que la salida es idéntica.
+
+Uso:
+    python -m src.etl.benchmarks.bench_text_utils --zip cvelistV5-main.zip --sample 20000
+"""
+import argparse
+import html
+import json
+import random
+import re
+import timeit
+import zipfile
+from src.etl.cve_ETL import ZIP_PATH, list_cve_members
+from src.etl.text_utils import clean_for_sql, escape_characters
+
+def legacy_clean_for_sql(value, quitar_html=True, reemplazar_comillas=True, escapar_barra=True,
+                         normalizar_unicode=True, eliminar_control=True, eliminar_puntoycoma=True,
+                         eliminar_comodines=True):
+    """Implementación anterior de clean_for_sql."""
+    if not value or str(value).strip() == "":
+        return ""
+    if not isinstance(value, str):
+        value = str(value)
+    if normalizar_unicode:
+        import unicodedata
+        value = unicodedata.normalize("NFC", value)
+    if eliminar_control:
+        value = re.sub(r"[\x00-\x1F\x7F]", "", value)
+    if reemplazar_comillas:
+        value = value.replace("'", "`").replace('"', "``")
+    if escapar_barra:
+        value = value.replace("\\", "\\\\")
+    if eliminar_puntoycoma:
+        value = value.replace(";", "")
+    if eliminar_comodines:
+        value = value.replace("%", "").replace("_", "").replace("[", "").replace("]", "")
+    if quitar_html:
+        value = re.sub(r'<.*?>', '', value)
+    else:
+        value = html.escape(value)
+    value = re.sub(r'\s+', ' ', value).strip()
+    return value
+
+def legacy_escape_characters(value):
+    """Implementación anterior de escape_characters."""
+    if not value or str(value).strip() == "":
+        return None
+    if isinstance(value, str):
+        value = value.replace("'", "’").replace('"', "”")
+        value = re.sub(r"[\x00-\x1F\x7F]", "", value)
+        return value.strip()
+    return str(value)
+
+def collect_texts(node, texts):
+    """Recoge los valores de texto libre (value, title, name...) de un registro CVE."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, str) and key in ("value", "title", "name", "description", "product", "vendor"):
+                texts.append(value)
+            else:
+                collect_texts(value, texts)
+    elif isinstance(node, list):
+        for item in node:
+            collect_texts(item, texts)
+
+def load_texts(zip_path, sample, seed):
+    members = list_cve_members(zip_path)
+    if sample < len(members):
+        members = random.Random(seed).sample(members, sample)
+    texts = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in members:
+            collect_texts(json.loads(zip_ref.read(member)).get('containers', {}), texts)
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser(description="text_utils frente a las versiones anteriores")
+    parser.add_argument("--zip", default=ZIP_PATH, help="ZIP de cvelistV5")
+    parser.add_argument("--sample", type=int, default=20000, help="ficheros CVE de la muestra")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.zip, args.sample, args.seed)
+    print(f"📊 {len(texts)} textos ({sum(map(len, texts)) / 2**20:.1f} MiB).")
+
+    variants = (
+        ("clean_for_sql", legacy_clean_for_sql, clean_for_sql, {}),
+        ("clean_for_sql(quitar_html=False)", legacy_clean_for_sql, clean_for_sql, {"quitar_html": False}),
+        ("escape_characters", legacy_escape_characters, escape_characters, {}),
+    )
+    for name, legacy, current, kwargs in variants:
+        legacy_out = [legacy(text, **kwargs) for text in texts]
+        current_out = [current(text, **kwargs) for text in texts]
+        mismatches = sum(a != b for a, b in zip(legacy_out, current_out))
+        if mismatches:
+            print(f"❌ {name}: {mismatches} salidas distintas.")
+            continue
+        before = min(timeit.repeat(lambda: [legacy(text, **kwargs) for text in texts], number=1, repeat=args.repeat))
+        after = min(timeit.repeat(lambda: [current(text, **kwargs) for text in texts], number=1, repeat=args.repeat))
+        print(f"⏱️ {name:<34} antes {before:6.2f}s | ahora {after:6.2f}s | {before / after:5.2f}x (salida idéntica)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Generadores de datos sintéticos para los benchmarks de las ETL: registros CVE (formato
+cvelistV5) y catálogos CWE (formato cwec_v7).
+"""
+import random
+from xml.sax.saxutils import escape
+
+VENDORS = ["apache", "microsoft", "linux", "google", "oracle", "cisco", "mozilla", "adobe"]
+SEVERITIES = [("LOW", 3.1), ("MEDIUM", 5.4), ("HIGH", 7.5), ("CRITICAL", 9.8)]
+WORDS = (
+    "buffer overflow in the parser allows remote attackers to execute arbitrary code via "
+    "a crafted request that triggers improper input validation when handling <b>malformed</b> "
+    "headers; affected versions \"before 2.4\" are vulnerable to 100% cpu usage [denial of service]"
+).split()
+
+def _text(rng, min_words, max_words):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+def make_cve_record(i, seed=0):
+    """Devuelve un registro CVE sintético determinista para el índice i."""
+    rng = random.Random(seed * 1_000_003 + i)
+    year = 2015 + i % 10
+    cve_id = f"CVE-{year}-{10000 + i}"
+    vendor = rng.choice(VENDORS)
+    product = f"product{i % 997}"
+    severity, score = rng.choice(SEVERITIES)
+
+    cna = {
+        "providerMetadata": {"orgId": "8254265b-2729-46b6-b9e3-3dfca2d5bfca", "shortName": "mitre",
+                             "dateUpdated": f"{year}-05-01T12:34:56.789Z"},
+        "title": _text(rng, 4, 12),
+        "descriptions": [
+            {"lang": "en", "value": _text(rng, 20, 80),
+             "supportingMedia": [{"type": "text/html", "base64": False, "value": f"<p>{_text(rng, 10, 40)}</p>"}]},
+        ],
+        "affected": [
+            {"vendor": vendor, "product": product, "defaultStatus": "unaffected",
+             "versions": [{"version": f"{v}.0", "status": "affected", "lessThan": f"{v}.9", "versionType": "semver"}
+                          for v in range(rng.randint(1, 4))],
+             "platforms": ["linux", "windows"], "cpes": [f"cpe:2.3:a:{vendor}:{product}:*:*:*:*:*:*:*:*"]},
+        ],
+        "references": [{"url": f"https://example.org/{cve_id}/{n}", "tags": ["patch"]} for n in range(rng.randint(1, 6))],
+        "problemTypes": [{"descriptions": [{"lang": "en", "description": f"CWE-{rng.randint(20, 900)}",
+                                            "cweId": f"CWE-{rng.randint(20, 900)}", "type": "CWE"}]}],
+        "metrics": [{"format": "CVSS",
+                     "cvssV3_1": {"version": "3.1", "vectorString": "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+                                  "baseScore": score, "baseSeverity": severity, "attackVector": "NETWORK"},
+                     "scenarios": [{"lang": "en", "value": "GENERAL"}]}],
+        "timeline": [{"time": f"{year}-01-02T03:04:05.000+00:00", "lang": "en", "value": "reported"}],
+        "credits": [{"lang": "en", "value": _text(rng, 1, 3), "type": "finder"}],
+    }
+    adp = [{
+        "providerMetadata": {"orgId": "134c704f-9b21-4f2e-91b3-4a467353bcc0", "shortName": "CISA-ADP",
+                             "dateUpdated": f"{year}-06-01T00:00:00.000Z"},
+        "title": "CISA ADP Vulnrichment",
+        "metrics": [{"other": {"type": "ssvc", "content": {"id": cve_id, "options": [{"Exploitation": "none"}]}}}],
+    }]
+    return {
+        "dataType": "CVE_RECORD",
+        "dataVersion": "5.1",
+        "cveMetadata": {"cveId": cve_id, "state": "PUBLISHED", "assignerOrgId": "8254265b-2729-46b6-b9e3-3dfca2d5bfca",
+                        "assignerShortName": "mitre", "dateUpdated": f"{year}-05-01T12:34:56.789Z",
+                        "dateReserved": f"{year}-01-01T00:00:00", "datePublished": f"{year}-02-01T00:00:00.000Z"},
+        "containers": {"cna": cna, "adp": adp},
+    }
+
+def synthetic_cve_records(count, seed=0):
+    """Genera count registros CVE sintéticos."""
+    for i in range(count):
+        yield make_cve_record(i, seed)
+
+CWE_CATALOG_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Weakness_Catalog xmlns="http://cwe.mitre.org/cwe-7" xmlns:xhtml="http://www.w3.org/1999/xhtml" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" Name="CWE" Version="4.14" Date="2024-02-29">\n'
+)
+CWE_PHASES = ["Architecture and Design", "Implementation", "Operation", "Testing"]
+CWE_SCOPES = ["Confidentiality", "Integrity", "Availability", "Access Control", "Other"]
+
+def _attr(value):
+    return escape(value, {'"': "&quot;"})
+
+def _structured(rng, tag, min_words, max_words):
+    """Texto estructurado de CWE: texto directo o párrafos xhtml."""
+    if rng.random() < 0.5:
+        return f"<{tag}>{escape(_text(rng, min_words, max_words))}</{tag}>"
+    paragraphs = "".join(f"<xhtml:p>{escape(_text(rng, min_words, max_words))}</xhtml:p>" for _ in range(rng.randint(1, 3)))
+    return f"<{tag}>{paragraphs}</{tag}>"
+
+def make_cwe_weakness(i, seed=0):
+    """Devuelve el XML de un Weakness sintético determinista con todas las secciones que lee cwe_ETL."""
+    rng = random.Random(seed * 1_000_003 + i)
+    n = lambda low, high: range(rng.randint(low, high))
+    pick = rng.choice
+    lines = [f'<Weakness ID="{i}" Name="{_attr(_text(rng, 2, 6))}" Abstraction="{pick(["Base", "Variant", "Class"])}" '
+             f'Structure="Simple" Status="{pick(["Draft", "Incomplete", "Stable"])}">',
+             _structured(rng, "Description", 10, 30), _structured(rng, "Extended_Description", 20, 60)]
+    lines.append("<Related_Weaknesses>" + "".join(
+        f'<Related_Weakness Nature="{pick(["ChildOf", "PeerOf", "CanPrecede"])}" CWE_ID="{rng.randint(1, 1400)}" View_ID="1000" Ordinal="Primary"/>'
+        for _ in n(1, 4)) + "</Related_Weaknesses>")
+    lines.append("<Weakness_Ordinalities>" + "".join(
+        f'<Weakness_Ordinality><Ordinality>{pick(["Primary", "Resultant", "Indirect"])}</Ordinality>'
+        f'<Description>{escape(_text(rng, 3, 10))}</Description></Weakness_Ordinality>' for _ in n(0, 2)) + "</Weakness_Ordinalities>")
+    platforms = []
+    for tag in ("Language", "Architecture", "Technology", "Operating_System"):
+        for _ in n(0, 3):
+            platforms.append(f'<{tag} Class="Not {tag}-Specific" Prevalence="{pick(["Often", "Sometimes", "Rarely", "Undetermined"])}"/>'
+                             if rng.random() < 0.5 else f'<{tag} Name="{pick(VENDORS).title()}" Prevalence="Often"/>')
+    lines.append("<Applicable_Platforms>" + "".join(platforms) + "</Applicable_Platforms>")
+    lines.append("<Background_Details>" + "".join(_structured(rng, "Background_Detail", 10, 30) for _ in n(0, 2)) + "</Background_Details>")
+    lines.append("<Alternate_Terms>" + "".join(
+        f'<Alternate_Term><Term>{escape(_text(rng, 1, 3))}</Term>{_structured(rng, "Description", 5, 15)}</Alternate_Term>'
+        for _ in n(0, 2)) + "</Alternate_Terms>")
+    lines.append("<Modes_Of_Introduction>" + "".join(
+        f'<Introduction><Phase>{pick(CWE_PHASES)}</Phase>{_structured(rng, "Note", 5, 20)}</Introduction>'
+        for _ in n(1, 3)) + "</Modes_Of_Introduction>")
+    lines.append(f'<Likelihood_Of_Exploit>{pick(["High", "Medium", "Low"])}</Likelihood_Of_Exploit>')
+    lines.append("<Common_Consequences>" + "".join(
+        "<Consequence>" + "".join(f"<Scope>{pick(CWE_SCOPES)}</Scope>" for _ in n(1, 3))
+        + f'<Impact>{escape(_text(rng, 2, 5))}</Impact>{_structured(rng, "Note", 5, 20)}</Consequence>'
+        for _ in n(1, 4)) + "</Common_Consequences>")
+    lines.append("<Detection_Methods>" + "".join(
+        f'<Detection_Method Detection_Method_ID="DM-{rng.randint(1, 20)}"><Method>{pick(["Automated Static Analysis", "Manual Analysis", "Fuzzing"])}</Method>'
+        f'{_structured(rng, "Description", 10, 30)}<Effectiveness>{pick(["High", "Moderate", "SOAR Partial", "Limited"])}</Effectiveness></Detection_Method>'
+        for _ in n(0, 3)) + "</Detection_Methods>")
+    lines.append("<Potential_Mitigations>" + "".join(
+        "<Mitigation>" + "".join(f"<Phase>{pick(CWE_PHASES)}</Phase>" for _ in n(1, 2))
+        + f'<Strategy>Input Validation</Strategy>{_structured(rng, "Description", 10, 40)}'
+        f'<Effectiveness>{pick(["High", "Moderate", "Limited", "Defense in Depth"])}</Effectiveness>'
+        + _structured(rng, "Effectiveness_Notes", 5, 15) + "</Mitigation>"
+        for _ in n(1, 5)) + "</Potential_Mitigations>")
+    lines.append("<Demonstrative_Examples>" + "".join(
+        f'<Demonstrative_Example Demonstrative_Example_ID="DX-{rng.randint(1, 200)}"><Intro_Text>{escape(_text(rng, 5, 20))}</Intro_Text>'
+        f'<Example_Code Nature="Bad" Language="C"><xhtml:div>char buf[{rng.randint(8, 256)}];</xhtml:div></Example_Code>'
+        f'<Body_Text>{escape(_text(rng, 5, 20))}</Body_Text><Body_Text>{escape(_text(rng, 5, 20))}</Body_Text>'
+        f'<References><Reference External_Reference_ID="REF-{rng.randint(1, 100)}"/></References></Demonstrative_Example>'
+        for _ in n(0, 3)) + "</Demonstrative_Examples>")
+    lines.append("<Observed_Examples>" + "".join(
+        f'<Observed_Example><Reference>CVE-20{rng.randint(10, 24)}-{rng.randint(1000, 99999)}</Reference>'
+        f'<Description>{escape(_text(rng, 5, 20))}</Description><Link>https://www.cve.org/CVERecord</Link></Observed_Example>'
+        for _ in n(0, 6)) + "</Observed_Examples>")
+    lines.append("<Functional_Areas>" + "".join(f"<Functional_Area>{pick(['Memory Management', 'Networking'])}</Functional_Area>" for _ in n(0, 2)) + "</Functional_Areas>")
+    lines.append("<Affected_Resources>" + "".join(f"<Affected_Resource>{pick(['Memory', 'CPU', 'File or Directory'])}</Affected_Resource>" for _ in n(0, 2)) + "</Affected_Resources>")
+    lines.append("<Taxonomy_Mappings>" + "".join(
+        f'<Taxonomy_Mapping Taxonomy_Name="{pick(["CLASP", "OWASP Top Ten 2004", "CERT C Secure Coding"])}"><Entry_ID>{rng.randint(1, 50)}</Entry_ID>'
+        f'<Entry_Name>{escape(_text(rng, 2, 5))}</Entry_Name><Mapping_Fit>{pick(["Exact", "CWE More Specific", "Imprecise"])}</Mapping_Fit></Taxonomy_Mapping>'
+        for _ in n(0, 4)) + "</Taxonomy_Mappings>")
+    lines.append("<Related_Attack_Patterns>" + "".join(f'<Related_Attack_Pattern CAPEC_ID="{rng.randint(1, 700)}"/>' for _ in n(0, 4)) + "</Related_Attack_Patterns>")
+    lines.append("<References>" + "".join(f'<Reference External_Reference_ID="REF-{rng.randint(1, 100)}" Section="{rng.randint(1, 30)}"/>' for _ in n(0, 4)) + "</References>")
+    lines.append(f'<Mapping_Notes><Usage>{pick(["Allowed", "Discouraged", "Allowed-with-Review"])}</Usage>'
+                 f'<Rationale>{escape(_text(rng, 5, 15))}</Rationale><Comments>{escape(_text(rng, 5, 15))}</Comments>'
+                 '<Reasons><Reason Type="Acceptable-Use"/><Reason Type="Abstraction"/></Reasons>'
+                 + "<Suggestions>" + "".join(f'<Suggestion CWE_ID="{rng.randint(1, 1400)}" Comment="{_attr(_text(rng, 2, 6))}"/>' for _ in n(0, 2))
+                 + "</Suggestions></Mapping_Notes>")
+    lines.append("<Notes>" + "".join(f'<Note Type="{pick(["Relationship", "Maintenance", "Terminology"])}">{escape(_text(rng, 10, 30))}</Note>' for _ in n(0, 3)) + "</Notes>")
+    lines.append("<Content_History><Submission><Submission_Name>CWE</Submission_Name><Submission_Date>2006-07-19</Submission_Date></Submission></Content_History>")
+    lines.append("</Weakness>")
+    return "\n".join(lines) + "\n"
+
+def make_cwe_external_reference(i, seed=0):
+    rng = random.Random(seed * 1_000_003 + i)
+    authors = "".join(f"<Author>{escape(_text(rng, 2, 3))}</Author>" for _ in range(rng.randint(0, 3)))
+    return (f'<External_Reference Reference_ID="REF-{i}">{authors}<Title>{escape(_text(rng, 3, 8))}</Title>'
+            f'<Publication_Year>20{rng.randint(0, 24):02d}</Publication_Year><Publication_Month>--0{rng.randint(1, 9)}</Publication_Month>'
+            f'<Publication_Day>---1{rng.randint(0, 9)}</Publication_Day><URL>https://example.com/{i}</URL></External_Reference>\n')
+
+def write_cwe_catalog(path, count, seed=0):
+    """Escribe en path un catálogo CWE sintético con count Weakness y count // 4 referencias externas."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(CWE_CATALOG_HEADER)
+        f.write("<Weaknesses>\n")
+        for i in range(count):
+            f.write(make_cwe_weakness(i, seed))
+        f.write("</Weaknesses>\n<External_References>\n")
+        for i in range(count // 4):
+            f.write(make_cwe_external_reference(i, seed))
+        f.write("</External_References>\n</Weakness_Catalog>\n")
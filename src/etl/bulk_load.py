@@ -0,0 +1,130 @@
+"""
+Carga masiva para las ETL: las filas se vuelcan a un TSV y se ingieren con LOAD DATA LOCAL INFILE
+en una tabla temporal, desde la que se hace el upsert con INSERT ... SELECT ... ON DUPLICATE KEY UPDATE.
+"""
+import os
+import re
+import tempfile
+
+# Directorio para los TSV temporales (None = el temporal del sistema)
+BULK_TMP_DIR = None
+
+# Escapes de LOAD DATA con FIELDS ESCAPED BY '\\'
+_TSV_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\0": "\\0",
+})
+
+_UPSERT_RE = re.compile(
+    r"INSERT\s+(IGNORE\s+)?INTO\s+`?(\w+)`?\s*\((.*?)\)\s*VALUES\s*\(.*?\)"
+    r"\s*(?:ON\s+DUPLICATE\s+KEY\s+UPDATE\s+(.*))?$",
+    re.DOTALL | re.IGNORECASE,
+)
+
+_parsed_upserts = {}
+
+# Avisos de LOAD DATA que no indican datos malos: claves repetidas dentro del lote (IGNORE)
+IGNORED_WARNINGS = {1062}
+
+class BulkDataError(Exception):
+    """
+    Aviso del servidor al cargar el TSV (valor truncado, fecha o enum convertidos...). Con LOCAL,
+    LOAD DATA no falla ante datos malos: se lanza como error de datos (SQLSTATE 22) para que
+    execute_batch parta el lote y mande las filas a cuarentena, como con executemany.
+    """
+
+    def __init__(self, errno, message):
+        super().__init__(f"{errno} (22000): {message}")
+        self.errno = errno
+        self.sqlstate = "22000"
+
+def parse_upsert(sql):
+    """Extrae (ignore, tabla, columnas, cláusula ON DUPLICATE KEY UPDATE) de un INSERT ... VALUES."""
+    if sql not in _parsed_upserts:
+        match = _UPSERT_RE.match(sql.strip())
+        if not match:
+            raise ValueError(f"INSERT no soportado para la carga masiva: {sql.strip()[:80]}")
+        ignore, table, columns, update = match.groups()
+        columns = [column.strip().strip("`") for column in columns.split(",")]
+        _parsed_upserts[sql] = (bool(ignore), table, columns, update.strip() if update else None)
+    return _parsed_upserts[sql]
+
+def tsv_value(value):
+    """Convierte un valor de Python en un campo TSV escapado (NULL como \\N)."""
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "1"
+    if value is False:
+        return "0"
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    return str(value).translate(_TSV_ESCAPES)
+
+def write_tsv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for row in rows:
+            f.write("\t".join([tsv_value(value) for value in row]))
+            f.write("\n")
+
+def enable_local_infile(conn):
+    """
+    Reabre la conexión con allow_local_infile y comprueba que el servidor tiene local_infile=ON.
+    Devuelve False si no se puede usar LOAD DATA LOCAL INFILE.
+    """
+    try:
+        conn.config(allow_local_infile=True)
+        conn.reconnect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT @@GLOBAL.local_infile")
+        enabled = bool(cursor.fetchone()[0])
+        cursor.close()
+        return enabled
+    except Exception as e:
+        print(f"⚠️ No se pudo activar LOAD DATA LOCAL INFILE: {e}")
+        return False
+
+def raise_on_warnings(cursor):
+    """Lanza BulkDataError con el primer aviso de la última sentencia que no esté en IGNORED_WARNINGS."""
+    cursor.execute("SHOW WARNINGS")
+    for level, code, message in cursor.fetchall():
+        if level != "Note" and code not in IGNORED_WARNINGS:
+            raise BulkDataError(code, message)
+
+def bulk_upsert(conn, cursor, sql, rows):
+    """
+    Inserta rows con la misma semántica que cursor.executemany(sql, rows), donde sql es un
+    INSERT [IGNORE] ... VALUES (...) [ON DUPLICATE KEY UPDATE ...]. El cursor no debe ser preparado.
+    Los avisos de la carga del TSV se lanzan como BulkDataError, antes de tocar la tabla destino.
+    """
+    ignore, table, columns, update = parse_upsert(sql)
+    staging = f"{table}__stg"
+    column_list = ", ".join(f"`{column}`" for column in columns)
+
+    # La tabla temporal copia columnas e índices (no las FK) y dura lo que la sesión
+    cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS `{staging}` LIKE `{table}`")
+    cursor.execute(f"TRUNCATE TABLE `{staging}`")
+
+    fd, path = tempfile.mkstemp(prefix=f"{table}_", suffix=".tsv", dir=BULK_TMP_DIR)
+    os.close(fd)
+    try:
+        write_tsv(path, rows)
+        # Claves repetidas dentro del lote, como con executemany: con INSERT IGNORE se queda la
+        # primera fila (IGNORE) y con ON DUPLICATE KEY UPDATE gana la última (REPLACE)
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s {'IGNORE' if ignore else 'REPLACE'} INTO TABLE `{staging}` CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({column_list})",
+            (path,),
+        )
+        raise_on_warnings(cursor)
+        upsert = f"{'INSERT IGNORE' if ignore else 'INSERT'} INTO `{table}` ({column_list}) SELECT {column_list} FROM `{staging}`"
+        if update:
+            upsert += f" ON DUPLICATE KEY UPDATE {update}"
+        cursor.execute(upsert)
+        conn.commit()
+    finally:
+        os.remove(path)
+    return len(rows)
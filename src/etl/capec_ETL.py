@@ -1,11 +1,33 @@
-import os
+import sys
+import time
 import xml.etree.ElementTree as ET
-import requests
 from src.config.db_config import connect_db_capec, create_db, DB_CAPEC
+from src.etl.text_utils import extract_all_text_from_element
+from src.etl.integrity import deferred_checks, set_session_checks
+from src.etl.batching import AdaptiveBatcher, max_allowed_packet
+from src.etl.batch_executor import Quarantine, execute_batch, register_session_init
+from src.etl.download import FeedCache
+from src.etl.bulk_load import parse_upsert
+from src.etl.catalog_state import (delete_entries, diff_entries, ensure_catalog_tables, entry_hash, is_same_catalog,
+                                   load_catalog_state, load_entry_hashes, read_catalog_version, rejected_entries,
+                                   save_catalog_state, RETRY_HASH)
+from src.etl.parallel_loader import run_in_dependency_order
+from src.etl.pipeline import cpu_workers, db_connections, stage
+from src.etl.schema import load_schema_dependencies
 import hashlib
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
 
 URL = 'https://capec.mitre.org/data/xml/capec_latest.xml'
+CAPEC_SCHEMA = 'BBDD/BBDD_Capec.sql'
+# Desactivar las comprobaciones de FK/UNIQUE durante la carga y validar las FK al final
+DEFER_CHECKS = True
+# Filas que el servidor rechaza, para revisarlas sin abortar la carga
+QUARANTINE_PATH = 'quarantine/capec.jsonl'
+# No hacer nada si el XML, o su Version y Date, son los de la última carga correcta (ver src/etl/catalog_state.py)
+SKIP_UNCHANGED_FEED = True
+# Nombre del catálogo en Catalog_Metadata y Catalog_Entries
+CATALOG = 'capec'
 
 ns = {
     'capec': "http://capec.mitre.org/capec-3",
@@ -13,16 +35,6 @@ ns = {
     'xhtml': "http://www.w3.org/1999/xhtml"
 }
 
-def download_extract_capec_data(url, extract_to='.'):
-    # Descargar el archivo XML directamente
-    response = requests.get(url)
-    xml_path = os.path.join(extract_to, 'capec_latest.xml')
-    with open(xml_path, 'wb') as file:
-        file.write(response.content)
-
-    # Retornar la ruta al archivo XML descargado
-    return xml_path
-
 def check_or_create_capec_db():
     conn = create_db()
     cursor = conn.cursor()
@@ -77,23 +89,11 @@ def check_or_create_capec_db():
         else:
             print("✅ Todas las tablas existen en la base de datos {DB_CAPEC}. Continuando con el proceso de ETL...")
 
-def extract_all_text_from_element(elem):
-    if elem is not None:
-        if isinstance(elem, list):
-            text = ';'.join(e.text for e in elem if e.text is not None)
-        elif hasattr(elem, 'itertext'):
-            text = ';'.join(elem.itertext())
-        else:
-            text = elem
-    else:
-        text = ""
-    return text.strip()
-
 def generate_hash(object):
     return hashlib.md5(object.encode()).hexdigest()
 
-def transform_capec_data(root):
-    # Namespace handling
+def transform_capec_data(root, pattern_ids=None):
+    # Con pattern_ids, solo esos Attack_Pattern (las referencias externas se devuelven todas)
     
     # Initialize lists to store data
     patterns = []
@@ -118,6 +118,8 @@ def transform_capec_data(root):
 
     # Extract data from XML
     for ap in root.findall(".//capec:Attack_Pattern", ns):
+        if pattern_ids is not None and ap.attrib.get("ID") not in pattern_ids:
+            continue
         ap_id = int(ap.attrib.get("ID"))
         name = ap.attrib.get("Name")
         status = ap.attrib.get("Status")
@@ -291,86 +293,317 @@ def transform_capec_data(root):
         "notes": notes
     }
 
-def insert_batch(query, batch):
-    conn = connect_db_capec()
-    cursor = conn.cursor()
-    cursor.executemany(query, batch)
-    conn.commit()
+def attack_pattern_hashes(root):
+    """{ID: hash del XML} de cada Attack_Pattern del catálogo."""
+    return {ap.attrib.get("ID"): entry_hash(ap) for ap in root.iterfind(".//capec:Attack_Pattern", ns)}
+
+# Borrado de las filas hijas de los Attack_Pattern modificados o retirados (nietos antes que hijos).
+# Las FK de CAPEC no tienen ON DELETE CASCADE.
+ATTACK_PATTERN_CHILDREN_DELETES = [
+    "DELETE t FROM Attack_Techniques t JOIN Execution_Flow f ON t.ExecutionFlowID = f.ExecutionFlowID WHERE f.AttackPatternID IN ({ids})",
+    "DELETE FROM Execution_Flow WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Description WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Extended_Description WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Alternate_Terms WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Related_Weaknesses WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Related_Attack_Patterns WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Mitigations WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Consequences WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Prerequisites WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Skills_Required WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Resources_Required WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Indicators WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Example_Instances WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Taxonomy_Mappings WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM CAPEC_References WHERE AttackPatternID IN ({ids})",
+    "DELETE FROM Notes WHERE AttackPatternID IN ({ids})",
+]
+
+# Tablas destino en el orden de las FK (padres antes que hijos) y clave de sus filas en
+# el diccionario de transform_capec_data.
+CAPEC_TABLES = [
+    {
+        "name": "AttackPattern",
+        "key": "attack_patterns",
+        "sql": "INSERT INTO AttackPattern (AttackPatternID, Name, Status, Abstraction, Likelihood_Of_Attack, Typical_Severity) VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Name=VALUES(Name), Status=VALUES(Status), Abstraction=VALUES(Abstraction), Likelihood_Of_Attack=VALUES(Likelihood_Of_Attack), Typical_Severity=VALUES(Typical_Severity)",
+    },
+    {
+        "name": "Description",
+        "key": "descriptions",
+        "sql": "INSERT INTO Description (DescriptionID, AttackPatternID, DescriptionText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE DescriptionText=VALUES(DescriptionText)",
+    },
+    {
+        "name": "Extended_Description",
+        "key": "extended_descriptions",
+        "sql": "INSERT INTO Extended_Description (ExtendedDescriptionID, AttackPatternID, DescriptionText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE DescriptionText=VALUES(DescriptionText)",
+    },
+    {
+        "name": "Alternate_Terms",
+        "key": "alternate_terms",
+        "sql": "INSERT INTO Alternate_Terms (AlternateTermID, AttackPatternID, Term, Description) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE Term=VALUES(Term), Description=VALUES(Description)",
+    },
+    {
+        "name": "Related_Weaknesses",
+        "key": "related_weaknesses",
+        "sql": "INSERT INTO Related_Weaknesses (AttackPatternID, CWE_ID) VALUES (%s, %s) ON DUPLICATE KEY UPDATE CWE_ID=VALUES(CWE_ID)",
+    },
+    {
+        "name": "Related_Attack_Patterns",
+        "key": "related_attack_patterns",
+        "sql": "INSERT INTO Related_Attack_Patterns (AttackPatternID, CAPEC_ID, Nature) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Nature=VALUES(Nature)",
+    },
+    {
+        "name": "Mitigations",
+        "key": "mitigations",
+        "sql": "INSERT INTO Mitigations (MitigationID, AttackPatternID, MitigationText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE MitigationText=VALUES(MitigationText)",
+    },
+    {
+        "name": "Consequences",
+        "key": "consequences",
+        "sql": "INSERT INTO Consequences (ConsequenceID, AttackPatternID, Scope, Impact, Likelihood_Of_Attack, Note) VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Scope=VALUES(Scope), Impact=VALUES(Impact), Likelihood_Of_Attack=VALUES(Likelihood_Of_Attack), Note=VALUES(Note)",
+    },
+    {
+        "name": "Execution_Flow",
+        "key": "execution_flows",
+        "sql": "INSERT INTO Execution_Flow (ExecutionFlowID, AttackPatternID, Attack_StepNumber, Phase, Description) VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Attack_StepNumber=VALUES(Attack_StepNumber), Phase=VALUES(Phase), Description=VALUES(Description)",
+    },
+    {
+        "name": "Attack_Techniques",
+        "key": "techniques",
+        "sql": "INSERT INTO Attack_Techniques (TechniqueID, ExecutionFlowID, CAPEC_ID, TechniqueText) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE CAPEC_ID=VALUES(CAPEC_ID), TechniqueText=VALUES(TechniqueText)",
+    },
+    {
+        "name": "Prerequisites",
+        "key": "prerequisites",
+        "sql": "INSERT INTO Prerequisites (PrerequisiteID, AttackPatternID, PrerequisiteText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE PrerequisiteText=VALUES(PrerequisiteText)",
+    },
+    {
+        "name": "Skills_Required",
+        "key": "skills_required",
+        "sql": "INSERT INTO Skills_Required (SkillID, AttackPatternID, SkillLevel, Skill_Description) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE SkillLevel=VALUES(SkillLevel), Skill_Description=VALUES(Skill_Description)",
+    },
+    {
+        "name": "Resources_Required",
+        "key": "resources_required",
+        "sql": "INSERT INTO Resources_Required (ResourceID, AttackPatternID, ResourceText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE ResourceText=VALUES(ResourceText)",
+    },
+    {
+        "name": "Indicators",
+        "key": "indicators",
+        "sql": "INSERT INTO Indicators (IndicatorID, AttackPatternID, IndicatorText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE IndicatorText=VALUES(IndicatorText)",
+    },
+    {
+        "name": "Example_Instances",
+        "key": "example_instances",
+        "sql": "INSERT INTO Example_Instances (ExampleID, AttackPatternID, ExampleText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE ExampleText=VALUES(ExampleText)",
+    },
+    {
+        "name": "Taxonomy_Mappings",
+        "key": "taxonomy_mappings",
+        "sql": "INSERT INTO Taxonomy_Mappings (MappingID, AttackPatternID, Taxonomy_Name, Entry_ID, Entry_Name, Mapping_Fit) VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Taxonomy_Name=VALUES(Taxonomy_Name), Entry_ID=VALUES(Entry_ID), Entry_Name=VALUES(Entry_Name), Mapping_Fit=VALUES(Mapping_Fit)",
+    },
+    {
+        "name": "External_References",
+        "key": "external_references",
+        "sql": "INSERT INTO External_References (ReferenceID, Author, Title, Edition, Publication, Publication_Year, Publication_Month, Publication_Day, Publisher, URL, URL_Date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Author=VALUES(Author), Title=VALUES(Title), Edition=VALUES(Edition), Publication=VALUES(Publication), Publication_Year=VALUES(Publication_Year), Publication_Month=VALUES(Publication_Month), Publication_Day=VALUES(Publication_Day), Publisher=VALUES(Publisher), URL=VALUES(URL), URL_Date=VALUES(URL_Date)",
+    },
+    {
+        "name": "CAPEC_References",
+        "key": "capec_references",
+        "sql": "INSERT IGNORE INTO CAPEC_References (AttackPatternID, External_Reference_ID, Section) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Section=VALUES(Section)",
+    },
+    {
+        "name": "Notes",
+        "key": "notes",
+        "sql": "INSERT INTO Notes (NoteID, AttackPatternID, type, NoteText) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE type=VALUES(type), NoteText=VALUES(NoteText)",
+    },
+]
+
+def capec_table_parents():
+    """Devuelve {índice en CAPEC_TABLES: set(índices de sus tablas padre)} a partir de las FK de BBDD_Capec.sql."""
+    schema = load_schema_dependencies(CAPEC_SCHEMA)
+    index = {spec["name"].lower(): idx for idx, spec in enumerate(CAPEC_TABLES)}
+    return {idx: {index[parent] for parent in schema.get(table, ()) if parent in index} for table, idx in index.items()}
+
+# Conexión de cada proceso del Pool de carga: se abre en init_capec_worker y se reutiliza en todas sus tareas
+_conn = None
+_cursor = None
+# AdaptiveBatcher por consulta en cada proceso del Pool: se conserva entre tareas
+_batchers = {}
+# Todos los procesos añaden sus filas rechazadas al mismo fichero
+_quarantine = Quarantine(QUARANTINE_PATH)
+
+def close_capec_connection(conn, cursor):
+    cursor.close()
+    conn.close()
+
+def init_capec_worker(defer_checks=DEFER_CHECKS, database=None):
+    """Inicializador del Pool: una conexión por proceso. database cambia de BBDD (p. ej. la del benchmark)."""
+    global _conn, _cursor
+    _conn = connect_db_capec()
+
+    def init_session(conn):
+        if database:
+            conn.database = database
+        if defer_checks:
+            set_session_checks(conn, False)
+
+    # Se repite si execute_batch reconecta tras un error transitorio
+    register_session_init(_conn, init_session)
+    _cursor = _conn.cursor()
+    # Se cierra cuando el worker termina (Pool.close + join)
+    Finalize(None, close_capec_connection, args=(_conn, _cursor), exitpriority=10)
 
 def _insert_chunk(args):
-    query, chunk = args
+    name, query, chunk = args
     if not chunk:
         return 0
-    conn = connect_db_capec()
-    cursor = conn.cursor()
-    cursor.executemany(query, chunk)
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return len(chunk)
+    if query not in _batchers:
+        _batchers[query] = AdaptiveBatcher(max_allowed_packet(_conn))
 
-def load_capec_data(data, batch_size=1000):
-    print("🚀 Insertando datos en paralelo...")
-    pool = Pool(processes=cpu_count())
-    total_inserted = 0
+    def upsert(batch):
+        _cursor.executemany(query, batch)
+        _conn.commit()
 
-    def dispatch(name, query, dataset):
-        nonlocal total_inserted
+    def load_batch(batch):
+        return execute_batch(_conn, batch, upsert, name, _quarantine, cursors=(_cursor,))
+
+    return _batchers[query].run(chunk, load_batch)
+
+def count_capec_rows(data):
+    return sum(len(data[spec["key"]]) for spec in CAPEC_TABLES)
+
+def load_capec_data(data, batch_size=1000, defer_checks=DEFER_CHECKS, database=None):
+    print("🚀 Insertando datos en paralelo...")
+    # Una conexión por proceso: no más procesos que conexiones asignadas a la ETL
+    workers = min(cpu_workers(), db_connections(cpu_workers()))
+    pool = Pool(processes=workers, initializer=init_capec_worker, initargs=(defer_checks, database))
+    totals = [0] * len(CAPEC_TABLES)
+
+    def load_table(idx):
+        spec = CAPEC_TABLES[idx]
+        dataset = data[spec["key"]]
         if not dataset:
             return
-        chunks = [dataset[i:i + batch_size] for i in range(0, len(dataset), batch_size)]
-        tasks = [(query, chunk) for chunk in chunks]
-        results = pool.map(_insert_chunk, tasks)
-        inserted = sum(results)
-        total_inserted += inserted
-        print(f"✅ {inserted} registros insertados en '{name}'")
-
-    dispatch("AttackPattern", "INSERT INTO AttackPattern (AttackPatternID, Name, Status, Abstraction, Likelihood_Of_Attack, Typical_Severity) VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Name=VALUES(Name), Status=VALUES(Status), Abstraction=VALUES(Abstraction), Likelihood_Of_Attack=VALUES(Likelihood_Of_Attack), Typical_Severity=VALUES(Typical_Severity)", data["attack_patterns"])
-    dispatch("Description", "INSERT INTO Description (DescriptionID, AttackPatternID, DescriptionText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE DescriptionText=VALUES(DescriptionText)", data["descriptions"])
-    dispatch("Extended_Description", "INSERT INTO Extended_Description (ExtendedDescriptionID, AttackPatternID, DescriptionText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE DescriptionText=VALUES(DescriptionText)", data["extended_descriptions"])
-    dispatch("Alternate_Terms", "INSERT INTO Alternate_Terms (AlternateTermID, AttackPatternID, Term, Description) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE Term=VALUES(Term), Description=VALUES(Description)", data["alternate_terms"])
-    dispatch("Related_Weaknesses", "INSERT INTO Related_Weaknesses (AttackPatternID, CWE_ID) VALUES (%s, %s) ON DUPLICATE KEY UPDATE CWE_ID=VALUES(CWE_ID)", data["related_weaknesses"])
-    dispatch("Related_Attack_Patterns", "INSERT INTO Related_Attack_Patterns (AttackPatternID, CAPEC_ID, Nature) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Nature=VALUES(Nature)", data["related_attack_patterns"])
-    dispatch("Mitigations", "INSERT INTO Mitigations (MitigationID, AttackPatternID, MitigationText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE MitigationText=VALUES(MitigationText)", data["mitigations"])
-    dispatch("Consequences", "INSERT INTO Consequences (ConsequenceID, AttackPatternID, Scope, Impact, Likelihood_Of_Attack, Note) VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Scope=VALUES(Scope), Impact=VALUES(Impact), Likelihood_Of_Attack=VALUES(Likelihood_Of_Attack), Note=VALUES(Note)", data["consequences"])
-    dispatch("Execution_Flow", "INSERT INTO Execution_Flow (ExecutionFlowID, AttackPatternID, Attack_StepNumber, Phase, Description) VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Attack_StepNumber=VALUES(Attack_StepNumber), Phase=VALUES(Phase), Description=VALUES(Description)", data["execution_flows"])
-    dispatch("Attack_Techniques", "INSERT INTO Attack_Techniques (TechniqueID, ExecutionFlowID, CAPEC_ID, TechniqueText) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE CAPEC_ID=VALUES(CAPEC_ID), TechniqueText=VALUES(TechniqueText)", data["techniques"])
-    dispatch("Prerequisites", "INSERT INTO Prerequisites (PrerequisiteID, AttackPatternID, PrerequisiteText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE PrerequisiteText=VALUES(PrerequisiteText)", data["prerequisites"])
-    dispatch("Skills_Required", "INSERT INTO Skills_Required (SkillID, AttackPatternID, SkillLevel, Skill_Description) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE SkillLevel=VALUES(SkillLevel), Skill_Description=VALUES(Skill_Description)", data["skills_required"])
-    dispatch("Resources_Required", "INSERT INTO Resources_Required (ResourceID, AttackPatternID, ResourceText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE ResourceText=VALUES(ResourceText)", data["resources_required"])
-    dispatch("Indicators", "INSERT INTO Indicators (IndicatorID, AttackPatternID, IndicatorText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE IndicatorText=VALUES(IndicatorText)", data["indicators"])
-    dispatch("Example_Instances", "INSERT INTO Example_Instances (ExampleID, AttackPatternID, ExampleText) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE ExampleText=VALUES(ExampleText)", data["example_instances"])
-    dispatch("Taxonomy_Mappings", "INSERT INTO Taxonomy_Mappings (MappingID, AttackPatternID, Taxonomy_Name, Entry_ID, Entry_Name, Mapping_Fit) VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Taxonomy_Name=VALUES(Taxonomy_Name), Entry_ID=VALUES(Entry_ID), Entry_Name=VALUES(Entry_Name), Mapping_Fit=VALUES(Mapping_Fit)", data["taxonomy_mappings"])
-    dispatch("External_References", "INSERT INTO External_References (ReferenceID, Author, Title, Edition, Publication, Publication_Year, Publication_Month, Publication_Day, Publisher, URL, URL_Date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE Author=VALUES(Author), Title=VALUES(Title), Edition=VALUES(Edition), Publication=VALUES(Publication), Publication_Year=VALUES(Publication_Year), Publication_Month=VALUES(Publication_Month), Publication_Day=VALUES(Publication_Day), Publisher=VALUES(Publisher), URL=VALUES(URL), URL_Date=VALUES(URL_Date)", data["external_references"])
-    dispatch("CAPEC_References", "INSERT IGNORE INTO CAPEC_References (AttackPatternID, External_Reference_ID, Section) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE Section=VALUES(Section)", data["capec_references"])
-    dispatch("Notes", "INSERT INTO Notes (NoteID, AttackPatternID, type, NoteText) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE type=VALUES(type), NoteText=VALUES(NoteText)", data["notes"])
-
-    pool.close()
-    pool.join()
-    print(f"✅ Carga finalizada. Total registros insertados: {total_inserted}")
+        # Una tarea por worker (mínimo batch_size filas); cada worker la parte en lotes adaptativos
+        chunk_size = max(batch_size, -(-len(dataset) // workers))
+        tasks = [(spec["name"], spec["sql"], dataset[i:i + chunk_size]) for i in range(0, len(dataset), chunk_size)]
+        totals[idx] = sum(pool.map(_insert_chunk, tasks))
+        print(f"✅ {totals[idx]} registros insertados en '{spec['name']}'")
+
+    # Todas las tablas comparten el Pool: cada una se lanza en cuanto sus padres están confirmados
+    start = time.perf_counter()
+    try:
+        run_in_dependency_order(set(range(len(CAPEC_TABLES))), capec_table_parents(), load_table, len(CAPEC_TABLES))
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+
+    total_inserted = sum(totals)
+    total_quarantined = count_capec_rows(data) - total_inserted
+    print(f"✅ Carga finalizada. Total registros insertados: {total_inserted} en {elapsed:.2f}s ({total_inserted / max(elapsed, 1e-9):.0f} filas/s)")
+    if total_quarantined:
+        print(f"⚠️ {total_quarantined} filas rechazadas guardadas en cuarentena en {QUARANTINE_PATH}.")
+    return total_inserted, elapsed
+
+def rejected_attack_patterns(rejected, data):
+    """
+    IDs de los Attack_Pattern con filas en cuarentena. rejected son los (tabla, fila) de la
+    cuarentena y data las tablas de transform_capec_data con las que se cargaron, para saber de qué
+    Attack_Pattern son las técnicas y las referencias externas.
+    """
+    flow_owners = {flow[0]: {flow[1]} for flow in data["execution_flows"]}
+    reference_users = {}
+    for ap_id, ref_id, _ in data["capec_references"]:
+        reference_users.setdefault(ref_id, set()).add(ap_id)
+    owners = {
+        "Attack_Techniques": ("ExecutionFlowID", flow_owners),
+        "External_References": ("ReferenceID", reference_users),
+    }
+    columns = {spec["name"]: parse_upsert(spec["sql"])[2] for spec in CAPEC_TABLES}
+    return rejected_entries(rejected, columns, "AttackPatternID", owners)
+
+def apply_attack_pattern_changes(root, known):
+    """
+    Aplica solo los Attack_Pattern nuevos, modificados o retirados respecto a known ({ID: hash}) y
+    devuelve ({ID: hash} de los aplicados, IDs retirados, IDs con filas en cuarentena).
+    Sin known se carga el catálogo entero. La cuarentena la escriben los procesos del Pool: se leen
+    las líneas que añadieron durante la carga. Los Attack_Pattern con filas en cuarentena se
+    devuelven con RETRY_HASH para que la próxima ejecución los reaplique.
+    """
+    current = attack_pattern_hashes(root)
+    offset = _quarantine.offset()
+    if not known:
+        print(f"📥 Carga completa del catálogo: {len(current)} Attack_Pattern.")
+        data = transform_capec_data(root)
+        with deferred_checks(connect_db_capec, "capec", CAPEC_SCHEMA, enabled=DEFER_CHECKS):
+            load_capec_data(data)
+        applied, removed = dict(current), []
+    else:
+        changed, removed = diff_entries(current, known)
+        print(f"🔄 {len(changed)} Attack_Pattern nuevos o modificados y {len(removed)} retirados de {len(current)}.")
+        conn = connect_db_capec()
+        try:
+            delete_entries(conn, ATTACK_PATTERN_CHILDREN_DELETES, [entry_id for entry_id in changed if entry_id in known] + removed)
+            delete_entries(conn, ["DELETE FROM AttackPattern WHERE AttackPatternID IN ({ids})"], removed)
+        finally:
+            conn.close()
+        applied = {entry_id: current[entry_id] for entry_id in changed}
+        data = None
+        if changed:
+            # Pocas filas: con las comprobaciones activas, sin quitar índices
+            data = transform_capec_data(root, set(changed))
+            load_capec_data(data, defer_checks=False)
+
+    rejected = set()
+    if data is not None:
+        rejected = rejected_attack_patterns(_quarantine.rejected_since(offset), data) & set(applied)
+    for entry_id in rejected:
+        applied[entry_id] = RETRY_HASH
+    return applied, removed, rejected
 
 if __name__ == "__main__":
     check_or_create_capec_db()
-    data = None
-    
-    # Download and extract the XML file
-    xml_path = download_extract_capec_data(URL)
     
-    tree = ET.parse(xml_path)
+    # Download the XML file (conditional request through the feed cache)
+    feeds = FeedCache()
+    with stage("descarga"):
+        feed = feeds.fetch(URL)
+
+    # Versión cargada por última vez (Catalog_Metadata) frente a la del feed
+    conn = connect_db_capec()
+    ensure_catalog_tables(conn)
+    state = load_catalog_state(conn, CATALOG)
+    with open(feed.path, 'rb') as xml_file:
+        version, date = read_catalog_version(xml_file)
+    if SKIP_UNCHANGED_FEED and is_same_catalog(state, feed.sha256, version, date):
+        if state.sha256 != feed.sha256:
+            save_catalog_state(conn, CATALOG, version, date, feed.sha256, {}, [])
+        conn.close()
+        print(f"✅ El catálogo CAPEC {version} ({date}) ya está cargado. No hay nada que cargar.")
+        sys.exit(0)
+    known = load_entry_hashes(conn, CATALOG) if state else {}
+    conn.close()
+
+    with stage("parseo"):
+        tree = ET.parse(feed.path)
     root = tree.getroot()
 
     try:
-        data = transform_capec_data(root)
-        load_capec_data(data)
+        with stage("transformación y carga"):
+            applied, removed, rejected = apply_attack_pattern_changes(root, known)
+        if rejected:
+            # Se registra la versión con el resto de Attack_Pattern: solo estos se reaplican en la próxima ejecución
+            print(f"⚠️ {len(rejected)} Attack_Pattern con filas en cuarentena ({QUARANTINE_PATH}) no se registran como cargados: "
+                  f"se volverán a aplicar en la próxima ejecución.")
+        conn = connect_db_capec()
+        save_catalog_state(conn, CATALOG, version, date, feed.sha256, applied, removed)
+        conn.close()
         print("🚀 Datos insertados en {DB_CAPEC} correctamente.")
     except Exception as e:
         print("❌ Error en la carga de datos:", e)
+        sys.exit(1)
 
     finally:
         print("🔒 Cerrando conexión a la base de datos.")
-        # borrar el archivo XML descargado
-        if os.path.exists(xml_path):
-            os.remove(xml_path)
-            print(f"🗑️ Archivo {xml_path} eliminado.")
-        else:
-            print(f"🗑️ El archivo {xml_path} no existe.")
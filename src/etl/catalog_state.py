@@ -0,0 +1,166 @@
+"""
+Versión cargada de los catálogos CWE y CAPEC.
+
+Cada BBDD guarda en Catalog_Metadata la versión, la fecha y el SHA-256 del feed de la última
+carga correcta y en Catalog_Entries el hash de cada entrada (Weakness o Attack_Pattern). Si el
+feed es el mismo, o trae la misma Version y Date en la raíz, la ETL termina sin parsearlo; si
+cambió, solo se aplican las entradas nuevas, modificadas o retiradas.
+
+Las entradas con filas en cuarentena se registran con RETRY_HASH: el resto de la carga cuenta como
+hecha y la siguiente ejecución vuelve a aplicar solo esas, aunque el feed no haya cambiado.
+"""
+import hashlib
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+CATALOG_METADATA_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS Catalog_Metadata (
+        catalog VARCHAR(16) PRIMARY KEY,
+        version VARCHAR(32) NOT NULL,
+        catalog_date VARCHAR(32),
+        content_sha256 CHAR(64) NOT NULL,
+        loaded_at DATETIME NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Catalog_Entries (
+        catalog VARCHAR(16) NOT NULL,
+        entry_id VARCHAR(64) NOT NULL,
+        content_hash CHAR(32) NOT NULL,
+        PRIMARY KEY (catalog, entry_id)
+    )
+    """,
+]
+
+# Hash que se registra para las entradas con filas en cuarentena: no coincide con ningún hash real,
+# así que la siguiente ejecución las vuelve a aplicar (borrando antes sus filas hijas)
+RETRY_HASH = ""
+
+class CatalogState:
+    """Última carga correcta de un catálogo (fila de Catalog_Metadata) y entradas pendientes de reintento."""
+
+    def __init__(self, version, date, sha256, pending=0):
+        self.version = version
+        self.date = date
+        self.sha256 = sha256
+        self.pending = pending
+
+def ensure_catalog_tables(conn):
+    cursor = conn.cursor()
+    try:
+        for statement in CATALOG_METADATA_DDL:
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def load_catalog_state(conn, catalog):
+    """CatalogState de la última carga de catalog, o None si nunca se cargó."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version, catalog_date, content_sha256 FROM Catalog_Metadata WHERE catalog = %s", (catalog,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        cursor.execute("SELECT COUNT(*) FROM Catalog_Entries WHERE catalog = %s AND content_hash = %s", (catalog, RETRY_HASH))
+        pending = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    return CatalogState(*row, pending=pending)
+
+def load_entry_hashes(conn, catalog):
+    """{entry_id: content_hash} de las entradas de la última carga."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT entry_id, content_hash FROM Catalog_Entries WHERE catalog = %s", (catalog,))
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+def read_catalog_version(xml_file):
+    """(Version, Date) de la raíz del catálogo, leyendo solo hasta la etiqueta de apertura."""
+    for _, root in ET.iterparse(xml_file, events=('start',)):
+        return root.get('Version'), root.get('Date')
+    return None, None
+
+def is_same_catalog(state, sha256, version=None, date=None):
+    """
+    True si el feed es el de la última carga (mismo contenido o misma Version y Date) y no quedan
+    entradas por reintentar.
+    """
+    if state is None or state.pending:
+        return False
+    if state.sha256 == sha256:
+        return True
+    return version is not None and (state.version, state.date) == (version, date)
+
+def entry_hash(elem):
+    """Hash MD5 del XML completo de una entrada del catálogo."""
+    return hashlib.md5(ET.tostring(elem)).hexdigest()
+
+def diff_entries(current, known):
+    """Entradas nuevas o modificadas y entradas retiradas entre {id: hash} actual y el conocido."""
+    changed = [entry_id for entry_id, content_hash in current.items() if known.get(entry_id) != content_hash]
+    removed = [entry_id for entry_id in known if entry_id not in current]
+    return changed, removed
+
+def delete_entries(conn, statements, entry_ids, batch_size=1000):
+    """Ejecuta las sentencias DELETE ... IN ({ids}) para las entradas dadas, por lotes."""
+    entry_ids = list(entry_ids)
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(entry_ids), batch_size):
+            batch = entry_ids[i:i + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            for statement in statements:
+                cursor.execute(statement.format(ids=placeholders), batch)
+            conn.commit()
+    finally:
+        cursor.close()
+
+def rejected_entries(rejected, columns, entry_column, owners=None):
+    """
+    IDs (como texto) de las entradas con alguna fila en cuarentena. rejected son los (tabla, fila)
+    de Quarantine.rejected_since y columns {tabla: columnas de su INSERT}. La entrada de una fila es
+    su columna entry_column; owners cambia eso por tabla: {tabla: (columna, None)} si la columna
+    es el propio ID de la entrada o {tabla: (columna, {valor: IDs})} para las filas que no cuelgan
+    de una sola entrada (p. ej. una referencia externa compartida).
+    """
+    owners = owners or {}
+    entries = set()
+    for table, row in rejected:
+        values = dict(zip(columns[table], row))
+        column, lookup = owners.get(table, (entry_column, None))
+        if lookup is None:
+            entries.add(str(values[column]))
+        else:
+            entries |= {str(entry_id) for entry_id in lookup.get(values[column], ())}
+    return entries
+
+def save_catalog_state(conn, catalog, version, date, sha256, changed_hashes, removed, batch_size=1000):
+    """
+    Registra una carga: hashes de las entradas aplicadas (RETRY_HASH en las que tienen filas en
+    cuarentena), retiradas y versión del catálogo.
+    """
+    cursor = conn.cursor()
+    try:
+        rows = [(catalog, entry_id, content_hash) for entry_id, content_hash in changed_hashes.items()]
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(
+                "INSERT INTO Catalog_Entries (catalog, entry_id, content_hash) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash)", rows[i:i + batch_size])
+        removed = list(removed)
+        for i in range(0, len(removed), batch_size):
+            batch = removed[i:i + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"DELETE FROM Catalog_Entries WHERE catalog = %s AND entry_id IN ({placeholders})", [catalog, *batch])
+        cursor.execute(
+            "INSERT INTO Catalog_Metadata (catalog, version, catalog_date, content_sha256, loaded_at) VALUES (%s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE version = VALUES(version), catalog_date = VALUES(catalog_date), "
+            "content_sha256 = VALUES(content_sha256), loaded_at = VALUES(loaded_at)",
+            (catalog, version, date, sha256, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        conn.commit()
+    finally:
+        cursor.close()
+    print(f"📌 Catálogo {catalog} {version} ({date}) registrado: {len(changed_hashes)} entradas aplicadas, {len(removed)} retiradas.")
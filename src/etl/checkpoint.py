@@ -0,0 +1,104 @@
+"""
+Checkpoints reanudables para las cargas de las ETL.
+
+Cada lote se escribe antes de enviarlo a MySQL en el fichero de chunks de su tabla
+(pickles concatenados, solo se añade al final) y queda pendiente en manifest.json hasta
+que se confirma. Si la carga se interrumpe, la siguiente ejecución lee únicamente los
+lotes pendientes, en el mismo orden en el que se escribieron.
+"""
+import json
+import os
+import pickle
+import shutil
+import threading
+
+MANIFEST = "manifest.json"
+
+class CheckpointStore:
+    """Chunks por tabla en directory y manifest con los lotes aún sin confirmar."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST)
+        self._lock = threading.Lock()
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = self._empty_manifest()
+
+    @staticmethod
+    def _empty_manifest():
+        # state: None, "running" (en curso o corte brusco) o "failed" (buffers volcados tras un error)
+        # parsed: todas las filas de la fuente están ya en el checkpoint
+        return {"state": None, "parsed": False, "next_seq": 0, "pending": {}}
+
+    @property
+    def state(self):
+        return self.manifest["state"]
+
+    @property
+    def parsed(self):
+        return self.manifest["parsed"]
+
+    def pending_count(self):
+        return len(self.manifest["pending"])
+
+    def pending_rows(self):
+        return sum(chunk["rows"] for chunk in self.manifest["pending"].values())
+
+    def _save(self):
+        # Escritura atómica: el manifest nunca queda a medias
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def set_state(self, state):
+        with self._lock:
+            self.manifest["state"] = state
+            self._save()
+
+    def mark_parsed(self):
+        with self._lock:
+            self.manifest["parsed"] = True
+            self._save()
+
+    def append(self, table, rows):
+        """Guarda un lote de filas de table y devuelve su número de secuencia."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{table}.chunks"), 'ab') as f:
+                offset = f.tell()
+                pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            seq = self.manifest["next_seq"]
+            self.manifest["next_seq"] = seq + 1
+            self.manifest["pending"][str(seq)] = {"table": table, "offset": offset, "rows": len(rows)}
+            self._save()
+            return seq
+
+    def mark_committed(self, seq):
+        with self._lock:
+            self.manifest["pending"].pop(str(seq), None)
+            self._save()
+
+    def pending(self):
+        """Devuelve (seq, tabla, filas) de cada lote sin confirmar, en orden de escritura."""
+        with self._lock:
+            chunks = sorted((int(seq), chunk) for seq, chunk in self.manifest["pending"].items())
+        for seq, chunk in chunks:
+            with open(os.path.join(self.directory, f"{chunk['table']}.chunks"), 'rb') as f:
+                f.seek(chunk["offset"])
+                rows = pickle.load(f)
+            yield seq, chunk["table"], rows
+
+    def clear(self):
+        """Elimina el checkpoint tras una carga completa."""
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.manifest = self._empty_manifest()
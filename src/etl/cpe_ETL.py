@@ -1,14 +1,27 @@
 import hashlib
-import pickle
-import requests
-import zipfile
-import os
+import sys
 import xml.etree.ElementTree as ET
 from src.config.db_config import connect_db_cpe, DB_CPE, create_db
-import io
+from src.etl.batching import AdaptiveBatcher, max_allowed_packet
+from src.etl.batch_executor import Quarantine, execute_batch
+from src.etl.checkpoint import CheckpointStore
+from src.etl.date_utils import convert_iso_to_mysql_date
+from src.etl.download import FeedCache, open_zip_member
+from src.etl.pipeline import stage
+from queue import Full, Queue
+from threading import Event, Thread
 
 URL = 'https://nvd.nist.gov/feeds/xml/cpe/dictionary/official-cpe-dictionary_v2.3.xml.zip'
-TEMP_FILE = 'temp_cpe.pkl'
+# Lotes pendientes de confirmar para reanudar una carga interrumpida
+CHECKPOINT_DIR = 'cpe_checkpoint'
+# Filas por lote del checkpoint; los INSERT se parten en lotes adaptativos (src/etl/batching.py)
+BATCH_SIZE = 10000
+# No hacer nada si el ZIP del diccionario es el mismo de la última carga correcta (ver src/etl/download.py)
+SKIP_UNCHANGED_FEED = True
+# Grupos de filas que el hilo de parseo puede adelantarse a la carga
+PREFETCH_BATCHES = 2
+# Filas que el servidor rechaza, para revisarlas sin abortar la carga
+QUARANTINE_PATH = 'quarantine/cpe.jsonl'
 
 # Define namespaces
 namespaces = {
@@ -17,63 +30,9 @@ namespaces = {
     'meta': 'http://scap.nist.gov/schema/cpe-dictionary-metadata/0.2'
 }
 
-def save_processed_data(filename, data):
-    """Guarda los datos procesados en un archivo."""
-    with open(filename, 'wb') as f:
-        pickle.dump(data, f)
-    print(f"✅ Datos procesados guardados en {filename}.")
-
-def load_processed_data(filename):
-    """Carga los datos procesados desde un archivo."""
-    with open(filename, 'rb') as f:
-        data = pickle.load(f)
-    print(f"✅ Datos procesados cargados desde {filename}.")
-    return data
-
 def generate_hash(object):
     return hashlib.md5(object.encode()).hexdigest()
 
-def download_extract_cpe_data(url, filename='cpe.xml', destino='.'):
-    """
-    Descarga un ZIP desde una URL, extrae el archivo XML y lo guarda como 'cpe.xml'.
-
-    Parámetros:
-    url (str): URL del archivo ZIP a descargar.
-    filename (str): Nombre con el que se guardará el archivo XML extraído.
-    destino (str): Carpeta destino donde se guardará el archivo.
-
-    Retorna:
-    str: Ruta al archivo extraído o None si ocurre un error.
-    """
-    try:
-        # Descargar el ZIP
-        print(f"Descargando desde {url}...")
-        response = requests.get(url)
-        response.raise_for_status()
-
-        # Abrir el ZIP desde memoria
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-            # Buscar archivo XML
-            xml_file = next((name for name in zip_ref.namelist() if name.endswith('.xml')), None)
-
-            if xml_file:
-                # Extraer y renombrar
-                zip_ref.extract(xml_file, destino)
-                original_path = os.path.join(destino, xml_file)
-                final_path = os.path.join(destino, filename)
-                # Eliminar el archivo de destino si ya existe
-                if os.path.exists(final_path):
-                    os.remove(final_path)
-                os.rename(original_path, final_path)
-                print(f"Archivo XML extraído como: {final_path}")
-                return final_path
-            else:
-                print("No se encontró ningún archivo XML en el ZIP.")
-                return None
-    except Exception as e:
-        print(f"Error al descargar o extraer: {e}")
-        return None
-
 def check_or_create_cpe_db():
     conn = create_db()
     cursor = conn.cursor()
@@ -138,99 +97,168 @@ def check_or_create_cpe_db():
         else:
             print("✅ Todas las tablas necesarias existen. Continuando con el proceso de ETL...")
 
+# Etiquetas con espacio de nombres, para comparar directamente con elem.tag
+CPE_TAG = '{http://cpe.mitre.org/dictionary/2.0}'
+CPE23_TAG = '{http://scap.nist.gov/schema/cpe-extension/2.3}'
+CPE_ITEM = CPE_TAG + 'cpe-item'
+
+def first_child(elem, tag):
+    for child in elem:
+        if child.tag == tag:
+            return child
+    return None
+
+def transform_cpe_item(cpe_item):
+    """
+    Devuelve (fila de cpe, filas de cpe_references, fila de cpe23_data o None) de un cpe-item.
+    Los hijos se recorren una sola vez en lugar de un find() por cada campo.
+    """
+    cpe_name = cpe_item.get('name')
+    cpe_id = generate_hash(cpe_name)
+
+    title_elem = None
+    cpe23_item = None
+    reference_elems = []
+    for child in cpe_item:
+        tag = child.tag
+        if tag == CPE_TAG + 'title':
+            if title_elem is None:
+                title_elem = child
+        elif tag == CPE23_TAG + 'cpe23-item':
+            if cpe23_item is None:
+                cpe23_item = child
+        elif tag == CPE_TAG + 'references':
+            reference_elems.extend(ref for ref in child if ref.tag == CPE_TAG + 'reference')
+    title = title_elem.text if title_elem is not None else None
+
+    deprecated = cpe_item.get('deprecated') == 'true'
+    deprecation_date = convert_iso_to_mysql_date(cpe_item.get('deprecation_date')) if deprecated else None
+    cpe23_name = cpe23_item.get('name') if cpe23_item is not None else None
+    cpe23_id = generate_hash(cpe23_name) if cpe23_item is not None else None
+
+    item = (cpe_id, cpe_name, title, deprecated, deprecation_date)
+
+    # Extract references
+    references = []
+    for idx, ref in enumerate(reference_elems, start=1):
+        ref_id = generate_hash(f"{cpe_id}_{idx}")
+        references.append((ref_id, cpe_id, ref.get('href'), ref.text))
+
+    # Extract additional data from cpe23-item if deprecated
+    cpe23 = None
+    if deprecated and cpe23_item is not None:
+        deprecation = first_child(cpe23_item, CPE23_TAG + 'deprecation')
+        deprecated_date = None
+        deprecated_by = None
+        deprecated_by_type = None
+        if deprecation is not None:
+            deprecated_date = convert_iso_to_mysql_date(deprecation.get('date'))
+            deprecated_by_elem = first_child(deprecation, CPE23_TAG + 'deprecated-by')
+            if deprecated_by_elem is not None:
+                deprecated_by = deprecated_by_elem.get('name')
+                deprecated_by_type = deprecated_by_elem.get('type')
+        cpe23 = (cpe23_id, cpe23_name, cpe_id, deprecated_date, deprecated_by, deprecated_by_type)
+
+    return item, references, cpe23
+
 def transform_cpe_data(root):
     # Extract CPE items
     cpe_items = []
     references = []
     cpe23_data = []
 
-    data = root.findall('{http://cpe.mitre.org/dictionary/2.0}cpe-item')
-
-    for cpe_item in data:
-        cpe_name = cpe_item.get('name')
-        cpe_id = generate_hash(cpe_name)
-        
-        title_elem = cpe_item.find('{http://cpe.mitre.org/dictionary/2.0}title')
-        title = title_elem.text if title_elem is not None else None
-
-        deprecated = cpe_item.get('deprecated')
-        if deprecated == 'true':
-            deprecated = True
-        else:
-            deprecated = False
-
-        deprecation_date = cpe_item.get('deprecation_date')[:10] if deprecated and cpe_item.get('deprecation_date') else None
-        cpe23_item = cpe_item.find('cpe-23:cpe23-item', namespaces) if cpe_item.find('cpe-23:cpe23-item', namespaces) is not None else None
-        cpe23_name = cpe23_item.get('name')
-        cpe23_id = generate_hash(cpe23_name) if cpe23_item is not None else None
-
-        cpe_items.append((cpe_id, cpe_name, title, deprecated, deprecation_date))
-        
-        # Extract references
-        for idx, ref in enumerate(cpe_item.findall('references/reference', namespaces), start=1):
-            ref_id = generate_hash(f"{cpe_id}_{idx}")
-            ref_text = ref.text if ref.text is not None else None
-            references.append((ref_id, cpe_id, ref.get('href'), ref_text))
-
-        # Extract additional data from cpe23-item if deprecated
-        if deprecated and cpe23_item is not None:
-            deprecated_date = cpe23_item.find('cpe-23:deprecation', namespaces).get('date')[:10] if cpe23_item.find('cpe-23:deprecation', namespaces) is not None and cpe23_item.find('cpe-23:deprecation', namespaces).get('date') else None
-            deprecation_element = cpe23_item.find('cpe-23:deprecation', namespaces)
-            deprecated_by = deprecation_element.find('cpe-23:deprecated-by', namespaces).get('name') if deprecation_element is not None and deprecation_element.find('cpe-23:deprecated-by', namespaces) is not None else None
-            deprecated_by_type = deprecation_element.find('cpe-23:deprecated-by', namespaces).get('type') if deprecation_element is not None and deprecation_element.find('cpe-23:deprecated-by', namespaces) is not None else None
-            cpe23_data.append((cpe23_id, cpe23_name, cpe_id, deprecated_date, deprecated_by, deprecated_by_type))
+    for cpe_item in root.iter(CPE_ITEM):
+        item, item_references, cpe23 = transform_cpe_item(cpe_item)
+        cpe_items.append(item)
+        references.extend(item_references)
+        if cpe23 is not None:
+            cpe23_data.append(cpe23)
 
     return cpe_items, references, cpe23_data
 
-def load_cpe_data(cpe_items, references, cpe23_data, batch_size=10000):
-    # Connect to database
-    conn = connect_db_cpe()
-    cursor = conn.cursor()
-
-    # Insert data into the tables with progress printing
-    total_items = len(cpe_items) + len(references) + len(cpe23_data)
-    processed_items = 0
-
-    print(f"Total items cpes: {len(cpe_items)}")
-    print(f"Total items references: {len(references)}")
-    print(f"Total items cpe23_data: {len(cpe23_data)}")
-    print(f"Total items to process: {total_items}")
-
-    # Insert cpe_items in batches
-    for i in range(0, len(cpe_items), batch_size):
-        batch = cpe_items[i:i + batch_size]
+def iter_cpe_batches(xml_source, batch_size=BATCH_SIZE):
+    """
+    Recorre el diccionario (ruta o fichero abierto, p. ej. el miembro del ZIP) con iterparse
+    y devuelve {tabla: filas} cada batch_size cpe-items.
+    Cada cpe-item se transforma en su evento 'end' y se libera, así que la memoria no depende
+    del tamaño del fichero.
+    """
+    context = ET.iterparse(xml_source, events=('start', 'end'))
+    _, root = next(context)
+    batch = {name: [] for name in CPE_UPSERTS}
+    for event, elem in context:
+        if event != 'end' or elem.tag != CPE_ITEM:
+            continue
+        item, item_references, cpe23 = transform_cpe_item(elem)
+        batch['cpe_items'].append(item)
+        batch['references'].extend(item_references)
+        if cpe23 is not None:
+            batch['cpe23_data'].append(cpe23)
+        # Los cpe-item ya procesados cuelgan de la raíz: se sueltan para que no se acumulen
+        root.clear()
+        if len(batch['cpe_items']) >= batch_size:
+            yield batch
+            batch = {name: [] for name in CPE_UPSERTS}
+    if batch['cpe_items']:
+        yield batch
+
+def prefetch(items, depth=PREFETCH_BATCHES):
+    """Genera items en un hilo aparte, con hasta depth elementos adelantados, para solapar parseo y carga."""
+    queue = Queue(maxsize=depth)
+    done = object()
+    stop = Event()
+
+    def put(item):
+        # Si el consumidor ha parado, la cola no se vaciará: se deja de esperar
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    thread = Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = queue.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
 
-        cursor.executemany('''
+# Upsert de cada tabla, en orden de carga (cpe antes que sus hijas)
+CPE_UPSERTS = {
+    'cpe_items': '''
         INSERT INTO cpe (cpe_id, cpe_name, title, deprecated, deprecation_date)
         VALUES (%s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE
         title = VALUES(title),
         deprecated = VALUES(deprecated),
         deprecation_date = VALUES(deprecation_date)
-        ''', batch)
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cpe_items).")
-
-    # Insert references in batches
-    for i in range(0, len(references), batch_size):
-        batch = references[i:i + batch_size]
-
-        cursor.executemany('''
+        ''',
+    'references': '''
         INSERT INTO `cpe_references` (ref_id, cpe_id, reference_url, reference_text)
         VALUES (%s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE
         reference_url = VALUES(reference_url),
         reference_text = VALUES(reference_text)
-        ''', batch)
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (references).")
-
-    # Insert cpe23_data in batches
-    for i in range(0, len(cpe23_data), batch_size):
-        batch = cpe23_data[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    'cpe23_data': '''
         INSERT INTO cpe23_data (cpe23_id, cpe23_name, cpe_id, deprecated_date, deprecated_by, deprecated_by_type)
         VALUES (%s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE
@@ -238,44 +266,99 @@ def load_cpe_data(cpe_items, references, cpe23_data, batch_size=10000):
         deprecated_date = VALUES(deprecated_date),
         deprecated_by = VALUES(deprecated_by),
         deprecated_by_type = VALUES(deprecated_by_type)
-        ''', batch)
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cpe23_data).")
+        ''',
+}
 
-    cursor.close()
-    conn.close()
+def load_cpe_data(checkpoint, quarantine=None, batches=None):
+    """
+    Inserta los lotes pendientes del checkpoint y los marca como confirmados.
+    Con batches ({tabla: filas}, p. ej. de iter_cpe_batches) cada grupo se guarda en el checkpoint
+    y se carga según llega, padres antes que hijas; al acabar el checkpoint queda como parseado.
+    Con quarantine, las filas que el servidor rechaza se apartan y el resto del lote se confirma.
+    """
+    # Connect to database
+    conn = connect_db_cpe()
+    cursor = conn.cursor()
+
+    processed_items = 0
+    if batches is None:
+        total_items = checkpoint.pending_rows()
+        print(f"Total items to process: {total_items}")
+
+    packet_limit = max_allowed_packet(conn)
+    batchers = {name: AdaptiveBatcher(packet_limit) for name in CPE_UPSERTS}
+
+    def load_pending():
+        nonlocal processed_items
+        for seq, name, batch in checkpoint.pending():
+            def upsert(rows, query=CPE_UPSERTS[name]):
+                cursor.executemany(query, rows)
+                conn.commit()
+
+            def load_batch(rows, name=name, upsert=upsert):
+                return execute_batch(conn, rows, upsert, name, quarantine, cursors=(cursor,))
+
+            batchers[name].run(batch, load_batch)
+            checkpoint.mark_committed(seq)
+            processed_items += len(batch)
+            if batches is None:
+                print(f"Progreso: {processed_items}/{total_items} items procesados ({name}).")
+            else:
+                print(f"Progreso: {processed_items} items procesados ({name}).")
+
+    try:
+        load_pending()
+        if batches is not None:
+            for batch in batches:
+                for name in CPE_UPSERTS:
+                    if batch[name]:
+                        checkpoint.append(name, batch[name])
+                load_pending()
+            checkpoint.mark_parsed()
+    finally:
+        cursor.close()
+        conn.close()
 
 if __name__ == "__main__":
     print("🔄 Iniciando el proceso de ETL...")
 
     check_or_create_cpe_db()
-    
+
+    checkpoint = CheckpointStore(CHECKPOINT_DIR)
+    quarantine = Quarantine(QUARANTINE_PATH)
+    feeds = FeedCache()
     try:
-        # Verificar si hay datos procesados guardados
-        if os.path.exists(TEMP_FILE):
-            print(f"♻️ Archivo temporal encontrado: {TEMP_FILE}. Cargando datos procesados...")
-            cpe_items, references, cpe23_data = load_processed_data(TEMP_FILE)
-            print("✅ Datos procesados cargados correctamente.")
+        # Verificar si hay una carga anterior sin terminar
+        if checkpoint.parsed:
+            print(f"♻️ Checkpoint encontrado en {CHECKPOINT_DIR}: {checkpoint.pending_count()} lotes pendientes.")
+            with stage("checkpoint"):
+                load_cpe_data(checkpoint, quarantine)
+            print(f"🚀 Datos insertados en {DB_CPE} correctamente.")
+            checkpoint.clear()
         else:
-            # Download and extract the XML file
-            xml_path = download_extract_cpe_data(URL)
-            # Parse the XML file
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-            # Transform data from the XML file
-            cpe_items, references, cpe23_data = transform_cpe_data(root)
-
-        load_cpe_data(cpe_items, references, cpe23_data)
-        print("🚀 Datos insertados en {DB_CPE} correctamente.")
-
-        if os.path.exists(TEMP_FILE):
-            os.remove(TEMP_FILE)
+            checkpoint.clear()
+            # Download the ZIP file (conditional request through the feed cache)
+            with stage("descarga"):
+                feed = feeds.fetch(URL)
+            if SKIP_UNCHANGED_FEED and not feed.changed:
+                print("✅ El diccionario CPE no ha cambiado desde la última carga. No hay nada que cargar.")
+            else:
+                # El XML se descomprime y se parsea en un hilo aparte mientras se cargan los grupos ya transformados
+                with stage("parseo y carga"), open_zip_member(feed.path) as xml_file:
+                    load_cpe_data(checkpoint, quarantine, prefetch(iter_cpe_batches(xml_file)))
+                print(f"🚀 Datos insertados en {DB_CPE} correctamente.")
+                checkpoint.clear()
+                # Misma política de cuarentena que las demás ETL: lo rechazado no cuenta como cargado.
+                # Sin estado por entrada, el reintento vuelve a pasar el diccionario por el upsert
+                if quarantine.count:
+                    print("⚠️ Con filas en cuarentena el diccionario no se marca como procesado: la próxima ejecución lo reintenta.")
+                else:
+                    feeds.mark_processed(feed)
     except Exception as e:
         print("❌ Error en la carga de datos:", e)
-        save_processed_data(TEMP_FILE, (cpe_items, references, cpe23_data))
-        print(f"♻️ Datos procesados guardados en {TEMP_FILE}. Puedes recuperarlos más tarde.")
+        if checkpoint.parsed:
+            print(f"♻️ {checkpoint.pending_count()} lotes pendientes guardados en {CHECKPOINT_DIR}. Se reanudarán en la próxima ejecución.")
+        sys.exit(1)
     finally:
-        os.remove(xml_path)
-        print("🗑️ Archivos .zip y .xml eliminados correctamente.")
-        print("🔚 Proceso de ETL finalizado.")
\ No newline at end of file
+        quarantine.report()
+        print("🔚 Proceso de ETL finalizado.")
@@ -3,116 +3,105 @@ import os
 import zipfile
 import json
 from src.config.db_config import connect_db_cve, create_db, DB_CVE
-from datetime import datetime
-from multiprocessing import Pool, cpu_count
-import pickle
+from src.etl.checkpoint import CheckpointStore
+from src.etl.bulk_load import bulk_upsert, enable_local_infile, parse_upsert
+from src.etl.batching import AdaptiveBatcher, max_allowed_packet
+from src.etl.batch_executor import Quarantine, execute_batch, register_session_init
+from src.etl.parallel_loader import ancestors, borrow, connection_pool, run_in_dependency_order
+from src.etl.schema import load_schema_dependencies, load_schema_foreign_keys, load_schema_statements
+from src.etl.shadow_tables import (
+    build_shadow_indexes, create_shadow_tables, drop_shadow_tables, shadow_upsert, swap_shadow_tables, SHADOW_SUFFIX,
+)
+from src.etl.index import index_clauses
+from src.etl.integrity import deferred_checks, set_session_checks
+from src.etl.date_utils import convert_iso_to_mysql_datetime
+from src.etl.download import FeedCache
+from src.etl.pipeline import cpu_workers, db_connections, stage
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+from threading import Semaphore
 import re
 import requests
 import shutil
-import html
+import sys
 import json
 EXTRACT_DIR = "./cve_data"
+# ZIP local de cvelistV5 por defecto en los benchmarks (la ETL usa el de la caché de feeds)
 ZIP_PATH = "cvelistV5-main.zip"
+CVE_SCHEMA = "BBDD/BBDD_CVE.sql"
 URL = "https://github.com/CVEProject/cvelistV5/archive/refs/heads/main.zip"
-TEMP_FILE = "processed_data.pkl"
-
-def download_extract_cve_data(url, extract_to):
-    print(f"Descargando {url} ...")
-    
-    print(f"ZIP descargado en {ZIP_PATH}")
-
-    print(f"Extrayendo ZIP en {extract_to} ...")
-    with zipfile.ZipFile(ZIP_PATH, 'r') as zip_ref:
-        zip_ref.extractall(extract_to)
-    print("Extracción completada.")
-    return ZIP_PATH
-
-def clean_for_sql(
-    value,
-    quitar_html=True,
-    reemplazar_comillas=True,
-    escapar_barra=True,
-    normalizar_unicode=True,
-    eliminar_control=True,
-    eliminar_puntoycoma=True,
-    eliminar_comodines=True
-):
-    """
-    Limpia y prepara un texto para inserción segura en SQL.
-    - Elimina o escapa caracteres problemáticos.
-    - Opcionalmente elimina etiquetas HTML o las escapa.
-    - Opcionalmente reemplaza comillas por tipográficas.
-    - Elimina caracteres de control y punto y coma.
-    - Normaliza a Unicode NFC.
-    - Elimina comodines si se desea.
-    """
-    if not value or str(value).strip() == "":
-        return ""
-    if not isinstance(value, str):
-        value = str(value)
-    # Normaliza Unicode (opcional)
-    if normalizar_unicode:
-        try:
-            import unicodedata
-            value = unicodedata.normalize("NFC", value)
-        except ImportError:
-            pass
-    # Elimina caracteres de control
-    if eliminar_control:
-        value = re.sub(r"[\x00-\x1F\x7F]", "", value)
-    # Reemplaza comillas si se desea
-    if reemplazar_comillas:
-        value = value.replace("'", "`").replace('"', "``")
-    # Escapa barra invertida si se desea
-    if escapar_barra:
-        value = value.replace("\\", "\\\\")
-    # Elimina punto y coma si se desea
-    if eliminar_puntoycoma:
-        value = value.replace(";", "")
-    # Elimina comodines si se desea
-    if eliminar_comodines:
-        value = value.replace("%", "").replace("_", "").replace("[", "").replace("]", "")
-    # Limpieza de HTML
-    if quitar_html:
-        value = re.sub(r'<.*?>', '', value)
-    else:
-        value = html.escape(value)
-    # Elimina dobles espacios y espacios al inicio/final
-    value = re.sub(r'\s+', ' ', value).strip()
-    return value
+# Lotes pendientes de confirmar para reanudar una carga interrumpida
+CHECKPOINT_DIR = "cve_checkpoint"
+# Filas que el servidor rechaza (una por línea, con el error), para revisarlas sin abortar la carga
+QUARANTINE_PATH = "quarantine/cve.jsonl"
+# Leer los JSON directamente del ZIP en los workers en lugar de extraerlos a EXTRACT_DIR
+STREAM_FROM_ZIP = True
+# Número de ficheros del ZIP que procesa cada tarea del Pool
+ZIP_SHARD_SIZE = 500
+# Ficheros por tarea del Pool cuando se leen ya extraídos
+POOL_CHUNKSIZE = 50
+# Tareas pendientes por worker antes de que el proceso principal deje de encolar más
+MAX_PENDING_TASKS_PER_WORKER = 2
+# Sincronización incremental: omite CVEs y contenedores sin cambios respecto a la BBDD
+INCREMENTAL_SYNC = True
+# Carga masiva con LOAD DATA LOCAL INFILE (el servidor debe tener local_infile=ON)
+BULK_LOAD = False
+# Filas por tabla que se acumulan antes de cada LOAD DATA
+BULK_BATCH_SIZE = 50000
+# Conexiones con las que se cargan en paralelo las tablas hermanas (1 = carga secuencial)
+LOAD_WORKERS = db_connections(4)
+# Reconstrucción completa: carga en tablas sombra sin índices secundarios y las intercambia al final
+FULL_REBUILD = False
+# En las cargas completas, quitar los índices del catálogo y las comprobaciones de FK/UNIQUE
+# mientras se carga, y reconstruir y validar al final
+DEFER_CHECKS = True
+# Los workers del Pool insertan ellos mismos las filas que parsean, cada uno con su conexión,
+# y el proceso principal solo suma los totales (sin checkpoint: si falla, se recarga todo)
+WORKER_WRITES = False
+# No hacer nada si el ZIP de cvelistV5 es el mismo de la última carga correcta (ver src/etl/download.py)
+SKIP_UNCHANGED_FEED = True
+# Modo delta: en lugar del ZIP completo se cargan solo los CVEs nuevos o modificados que lista
+# el deltaLog de cvelistV5 desde la última ejecución (ruta local o URL)
+DELTA_MODE = False
+DELTA_MANIFEST = "https://raw.githubusercontent.com/CVEProject/cvelistV5/main/cves/deltaLog.json"
+# fetchTime del último delta aplicado
+DELTA_STATE_PATH = "cve_delta_state.json"
+# Copia local de cvelistV5 (directorio con cves/<año>/...) de la que leer los registros; None = githubLink
+DELTA_RECORDS_DIR = None
+# Descargas simultáneas de registros del delta
+DELTA_FETCH_WORKERS = 8
 
 # Generar un hash MD5 único basado en el contenido del objeto
 def generate_md5_hash(data):
+    """
+    ID determinista: MD5 de json.dumps(data). Para las claves de texto ASCII sin comillas ni
+    barras invertidas (todas las que genera la ETL) json.dumps solo añade las comillas, así que
+    se hashean directamente sin pasar por el codificador JSON. Los IDs no cambian.
+    """
+    if type(data) is str and data.isascii() and data.isprintable() and '"' not in data and '\\' not in data:
+        return hashlib.md5(b'"' + data.encode() + b'"').hexdigest()
     json_data = json.dumps(data, sort_keys=True)  # Serializar el objeto JSON
     return hashlib.md5(json_data.encode('utf-8')).hexdigest()  # Generar el hash MD5
 
-def convert_iso_to_mysql_datetime(iso_datetime):
+def generate_content_hash(data):
     """
-    Convierte una fecha en formato RFC3339/ISO8601 al formato DATETIME de MySQL.
+    Hash del contenido de un contenedor para detectar cambios (no es un ID): BLAKE2b de 16 bytes
+    sobre el JSON con las claves ordenadas y sin espacios, que no depende del orden de las claves
+    del fichero ni de la versión de Python.
     """
-    if not iso_datetime:
-        return None  # Manejar valores nulos o vacíos
-    try:
-        # Parsear el formato RFC3339/ISO8601
-        dt = datetime.fromisoformat(iso_datetime.replace("Z", "+00:00"))
-        # Convertir al formato MySQL (sin zona horaria ni milisegundos)
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except ValueError as e:
-        print(f"❌ Error al convertir la fecha '{iso_datetime}': {e}")
-        return None
-    
-def save_processed_data(filename, data):
-    """Guarda los datos procesados en un archivo."""
-    with open(filename, 'wb') as f:
-        pickle.dump(data, f)
-    print(f"✅ Datos procesados guardados en {filename}.")
-
-def load_processed_data(filename):
-    """Carga los datos procesados desde un archivo."""
-    with open(filename, 'rb') as f:
-        data = pickle.load(f)
-    print(f"✅ Datos procesados cargados desde {filename}.")
-    return data
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), check_circular=False)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+def container_changed(known_hash, content_hash, data):
+    """
+    Si el contenedor ha cambiado respecto al hash guardado en la BBDD. Los cargados antes de
+    generate_content_hash guardan el MD5 del JSON ordenado (generate_md5_hash): si no coincide el
+    hash nuevo se compara con ese, así que no se recargan y pasan al hash nuevo cuando cambian.
+    """
+    if known_hash == content_hash:
+        return False
+    return known_hash is None or known_hash != generate_md5_hash(data)
 
 def check_or_create_cve_db():
     conn = create_db()
@@ -176,6 +165,75 @@ def check_or_create_cve_db():
         else:
             print(f"✅ Todas las tablas existen en {DB_CVE}. Continuando con el proceso de ETL...")
 
+def load_known_state():
+    """
+    Carga de la BBDD los mapas (cve_id -> date_updated) y (container_id -> content_hash)
+    usados por la sincronización incremental.
+    """
+    conn = connect_db_cve()
+    cursor = conn.cursor()
+    cursor.execute("SELECT cve_id, date_updated FROM CVE")
+    known_cves = {
+        cve_id: date_updated.strftime("%Y-%m-%d %H:%M:%S") if date_updated else None
+        for cve_id, date_updated in cursor.fetchall()
+    }
+    cursor.execute("SELECT container_id, content_hash FROM Container")
+    known_containers = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    print(f"📊 Estado actual: {len(known_cves)} CVEs y {len(known_containers)} contenedores en {DB_CVE}.")
+    return known_cves, known_containers
+
+# Borrado de las filas hijas de un contenedor que ha cambiado (nietos antes que hijos).
+# Las tablas 1:1 (CNA, ADP, Provider_Metadata) se actualizan con el upsert normal.
+CONTAINER_CHILDREN_DELETES = [
+    "DELETE m FROM Descriptions_Supporting_Media m JOIN Descriptions d ON m.description_id = d.id WHERE d.container_id IN ({ids})",
+    "DELETE c FROM Affected_Product_cpe c JOIN Affected_Product p ON c.product_id = p.product_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Platforms c JOIN Affected_Product p ON c.product_id = p.product_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Modules c JOIN Affected_Product p ON c.product_id = p.product_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Program_Files c JOIN Affected_Product p ON c.product_id = p.product_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Affected_Version c JOIN Affected_Product p ON c.product_id = p.product_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Program_Routines c JOIN Affected_Product p ON c.product_id = p.product_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Problem_Type_Description_References c JOIN Problem_Types p ON c.problem_type_id = p.problem_type_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Problem_Type_Description c JOIN Problem_Types p ON c.problem_type_id = p.problem_type_id WHERE p.container_id IN ({ids})",
+    "DELETE c FROM Impact_Description c JOIN Impact i ON c.impact_id = i.impact_id WHERE i.container_id IN ({ids})",
+    # El resto cuelga de container_id (Taxonomy_Relations, CPE_Node/CPE_Match y las métricas caen por ON DELETE CASCADE)
+    "DELETE FROM Descriptions WHERE container_id IN ({ids})",
+    "DELETE FROM CVE_References WHERE container_id IN ({ids})",
+    "DELETE FROM Affected_Product WHERE container_id IN ({ids})",
+    "DELETE FROM Problem_Types WHERE container_id IN ({ids})",
+    "DELETE FROM Impact WHERE container_id IN ({ids})",
+    "DELETE FROM Configurations WHERE container_id IN ({ids})",
+    "DELETE FROM Workarounds WHERE container_id IN ({ids})",
+    "DELETE FROM Solutions WHERE container_id IN ({ids})",
+    "DELETE FROM Exploits WHERE container_id IN ({ids})",
+    "DELETE FROM Timeline WHERE container_id IN ({ids})",
+    "DELETE FROM Credit WHERE container_id IN ({ids})",
+    "DELETE FROM Tags WHERE container_id IN ({ids})",
+    "DELETE FROM Taxonomy_Mappings WHERE container_id IN ({ids})",
+    "DELETE FROM CPE_Applicability WHERE container_id IN ({ids})",
+    "DELETE FROM Metrics WHERE container_id IN ({ids})",
+]
+
+def delete_container_children(conn, cursor, container_ids, batch_size=1000):
+    """Elimina las filas hijas de los contenedores modificados antes de reinsertarlas."""
+    for i in range(0, len(container_ids), batch_size):
+        batch = container_ids[i:i + batch_size]
+        placeholders = ", ".join(["%s"] * len(batch))
+        for statement in CONTAINER_CHILDREN_DELETES:
+            cursor.execute(statement.format(ids=placeholders), batch)
+        conn.commit()
+    print(f"🧹 Hijos eliminados de {len(container_ids)} contenedores modificados.")
+
+def delete_containers(conn, cursor, container_ids):
+    """Elimina contenedores que ya no están en cvelistV5 (p. ej. un ADP retirado) con sus filas hijas."""
+    delete_container_children(conn, cursor, container_ids)
+    placeholders = ", ".join(["%s"] * len(container_ids))
+    # CNA, ADP y Provider_Metadata caen por ON DELETE CASCADE
+    cursor.execute(f"DELETE FROM Container WHERE container_id IN ({placeholders})", container_ids)
+    conn.commit()
+    print(f"🗑️ {len(container_ids)} contenedores retirados en cvelistV5 eliminados.")
+
 def process_zip_and_find_json(zip_path, extract_to):
     os.makedirs(extract_to, exist_ok=True)
     cve_files = []
@@ -197,9 +255,98 @@ def process_zip_and_find_json(zip_path, extract_to):
     print(f"✅ Archivos extraídos en: {extract_to}")
     return cve_files
 
+def list_cve_members(zip_path):
+    """Devuelve los nombres de los CVE-*.json del ZIP sin extraerlos."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = [
+            name for name in zip_ref.namelist()
+            if os.path.basename(name).startswith('CVE-') and name.endswith('.json')
+        ]
+    print(f"🔄 {len(members)} ficheros CVE encontrados en {zip_path}")
+    return members
+
+# Estado propio de cada worker (se inicializa una vez en el initializer del Pool):
+# handle del ZIP y mapas de la sincronización incremental
+_zip_ref = None
+_known_cves = None
+_known_containers = None
+
+def init_worker(zip_path=None, known_state=None):
+    global _zip_ref, _known_cves, _known_containers
+    if zip_path:
+        _zip_ref = zipfile.ZipFile(zip_path, 'r')
+    if known_state:
+        _known_cves, _known_containers = known_state
+
+# Conexión, batchers y cuarentena de cada worker cuando escribe directamente en MySQL (WORKER_WRITES)
+_worker_connection = None
+_worker_batchers = None
+_worker_quarantine = None
+_worker_known_containers = None
+
+def init_writer_worker(zip_path=None, known_state=None, known_containers=None, bulk=False, checks=True):
+    global _worker_connection, _worker_batchers, _worker_quarantine, _worker_known_containers
+    init_worker(zip_path, known_state)
+    _worker_known_containers = known_containers
+    _worker_connection = open_cve_connection(bulk, checks)
+    conn, cursor, bulk_cursor = _worker_connection
+    _worker_batchers = cve_batchers(conn, bulk=bulk_cursor is not None)
+    _worker_quarantine = Quarantine(QUARANTINE_PATH)
+    # Se cierra cuando el worker termina (Pool.close + join)
+    Finalize(None, close_cve_connection, args=(_worker_connection,), exitpriority=10)
+
+def transform_cve_members(members):
+    """Procesa una lista de ficheros leyéndolos directamente del ZIP del worker."""
+    results = []
+    for member in members:
+        data = json.loads(_zip_ref.read(member))
+        parsed = transform_cve_record(data, _known_cves, _known_containers)
+        if parsed:
+            results.append(parsed)
+    return results
+
 def transform_cve_data(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
         data = json.load(f)
+    return transform_cve_record(data, _known_cves, _known_containers)
+
+# Clave del registro compacto con los contenedores que hay que borrar (no es una tabla)
+STALE_CONTAINERS = "stale_containers"
+
+def transform_cve_record(data, known_cves=None, known_containers=None):
+    """
+    Transforma un registro CVE en un registro compacto {índice en CVE_TABLES: filas}
+    con solo las tablas que tienen filas. Es lo que los workers devuelven al proceso principal.
+    """
+    tables = transform_cve_tables(data, known_cves, known_containers)
+    if not tables:
+        return None
+    record = compact_record(tables)
+    if known_containers:
+        stale = stale_adp_containers(data, known_containers)
+        if stale:
+            record[STALE_CONTAINERS] = stale
+    return record
+
+def stale_adp_containers(data, known_containers):
+    """
+    IDs de los contenedores ADP de la BBDD que el registro ya no trae. Los ADP se numeran por
+    posición (<cve>_adp_1, _adp_2...), así que son los de número mayor que los del registro.
+    """
+    cve_id = data['cveMetadata'].get('cveId')
+    position = len(data['containers'].get('adp') or []) + 1
+    stale = []
+    while f"{cve_id}_adp_{position}" in known_containers:
+        stale.append(f"{cve_id}_adp_{position}")
+        position += 1
+    return stale
+
+def transform_cve_tables(data, known_cves=None, known_containers=None):
+    """
+    Transforma un registro CVE en una tupla con las filas de cada tabla (orden de CVE_TABLES).
+    Si se pasan los mapas de la BBDD (modo incremental) devuelve None para los CVE cuyo
+    dateUpdated no ha cambiado y omite los contenedores cuyo hash de contenido coincide.
+    """
     if 'cveMetadata' not in data or data['cveMetadata']['state'] != 'PUBLISHED':
         return None
 
@@ -245,16 +392,25 @@ def transform_cve_data(filepath):
 
     cve_metadata = data['cveMetadata']
     cve_id = cve_metadata.get('cveId')
+    date_updated = convert_iso_to_mysql_datetime(cve_metadata.get('dateUpdated'))
+
+    # Modo incremental: CVE sin cambios desde la última carga
+    if known_cves is not None and date_updated is not None and known_cves.get(cve_id) == date_updated:
+        return None
+    if known_containers is None:
+        known_containers = {}
     
     # CVE Table
-    cves = [(cve_id, data['dataType'], data['dataVersion'], cve_metadata.get('state'), cve_metadata.get('assignerOrgId'), cve_metadata.get('assignerShortName'), cve_metadata.get('requesterUserId'), convert_iso_to_mysql_datetime(cve_metadata.get('dateUpdated')), cve_metadata.get('serial'), convert_iso_to_mysql_datetime(cve_metadata.get('dateReserved')), convert_iso_to_mysql_datetime(cve_metadata.get('datePublished')))]
+    cves = [(cve_id, data['dataType'], data['dataVersion'], cve_metadata.get('state'), cve_metadata.get('assignerOrgId'), cve_metadata.get('assignerShortName'), cve_metadata.get('requesterUserId'), date_updated, cve_metadata.get('serial'), convert_iso_to_mysql_datetime(cve_metadata.get('dateReserved')), convert_iso_to_mysql_datetime(cve_metadata.get('datePublished')))]
 
     container_cna = data['containers']['cna']
     container_id_cna = cve_id + "_cna"  # Generar un ID único para el contenedor CNA
-    container_content_hash = generate_md5_hash(container_cna)
-    containers.append((container_id_cna, cve_id, 'cna', container_content_hash))
-    # Recorrer CNA
-    if container_cna:
+    container_content_hash = generate_content_hash(container_cna)
+    cna_changed = container_changed(known_containers.get(container_id_cna), container_content_hash, container_cna)
+    if cna_changed:
+        containers.append((container_id_cna, cve_id, 'cna', container_content_hash))
+    # Recorrer CNA (solo si su contenido ha cambiado)
+    if container_cna and cna_changed:
         # CNA Table
         cna_table.append((container_id_cna, convert_iso_to_mysql_datetime(container_cna.get('dateAssigned')), convert_iso_to_mysql_datetime(container_cna.get('datePublic')), container_cna.get('title'), json.dumps(container_cna.get('source'))))
 
@@ -573,7 +729,10 @@ def transform_cve_data(filepath):
             #Generar un hash único para cada publicador basado en el contenido del objeto
             i += 1
             container_id_adp = container_adp_id = cve_id + "_adp_" + str(i)  # Generar un ID único para el contenedor ADP
-            containers.append((container_adp_id, cve_id, 'adp', generate_md5_hash(adp_entry)))
+            adp_content_hash = generate_content_hash(adp_entry)
+            if not container_changed(known_containers.get(container_adp_id), adp_content_hash, adp_entry):
+                continue  # ADP sin cambios
+            containers.append((container_adp_id, cve_id, 'adp', adp_content_hash))
             
             # ADP Table
             adp_table.append((container_adp_id, convert_iso_to_mysql_datetime(adp_entry.get('datePublic')), adp_entry.get('title'), json.dumps(adp_entry.get('source'))))
@@ -892,68 +1051,21 @@ def transform_cve_data(filepath):
     affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2
 )
 
-def clean_files(zip_path, extract_to):
-    if os.path.exists(zip_path):
-        os.remove(zip_path)
-        print(f"ZIP eliminado: {zip_path}")
+def clean_files(extract_to):
+    # El ZIP se queda en la caché de feeds para las descargas condicionales
     if os.path.exists(extract_to):
         shutil.rmtree(extract_to)
         print(f"Directorio extraído eliminado: {extract_to}")
 
-def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2, batch_size=10000):
-    conn = connect_db_cve()
-    conn.ping(reconnect=True)
-    cursor = conn.cursor(prepared=True)
-
-    # Insert data into the tables with progress printing
-    total_items = len(cves) + len(containers) + len(cna_table) + len(adp_table) + len(provider_metadata) + len(timelines) + len(descriptions) + len(references) + len(problem_types) + len(problem_types_descriptions) + len(credits_cve) + len(affected_products) + len(affected_products_cpe) + len(affected_products_platforms) + len(affected_products_modules) + len(affected_products_program_files) + len(affected_products_versions) + len(affected_products_program_routines) + len(problem_types_descriptions_refs) + len(configurations) + len(workarounds) + len(solutions) + len(exploits) + len(impacts) + len(impact_descriptions) + len(taxonomy_mappings) + len(taxonomy_relations) + len(tags) + len(cpe_applicability) + len(cpe_nodes) + len(cpe_match) + len(metrics) + len(metrics_scenarios) + len(metrics_cvssv4) + len(metrics_cvssv3_1) + len(metrics_cvssv3) + len(metrics_cvssv2)
-    
-    processed_items = 0
-
-    print(f'📊 Total de items cve: {len(cves)}')
-    print(f'📊 Total de items containers: {len(containers)}')
-    print(f'📊 Total de items CNA: {len(cna_table)}')
-    print(f'📊 Total de items ADP: {len(adp_table)}')
-    print(f'📊 Total de items provider_metadata: {len(provider_metadata)}')
-    print(f'📊 Total de items timelines: {len(timelines)}')
-    print(f'📊 Total de items descriptions: {len(descriptions)}')
-    print(f'📊 Total de items descriptions_supporting_media: {len(descriptions_supporting_media)}')
-    print(f'📊 Total de items references: {len(references)}')
-    print(f'📊 Total de items problem_types: {len(problem_types)}')
-    print(f'📊 Total de items problem_types_descriptions: {len(problem_types_descriptions)}')
-    print(f'📊 Total de items problem_types_descriptions_refs: {len(problem_types_descriptions_refs)}')
-    print(f'📊 Total de items credits_cve: {len(credits_cve)}')
-    print(f'📊 Total de items affected_products: {len(affected_products)}')
-    print(f'📊 Total de items affected_products_cpe: {len(affected_products_cpe)}')
-    print(f'📊 Total de items affected_products_platforms: {len(affected_products_platforms)}')
-    print(f'📊 Total de items affected_products_modules: {len(affected_products_modules)}')
-    print(f'📊 Total de items affected_products_program_files: {len(affected_products_program_files)}')
-    print(f'📊 Total de items affected_products_versions: {len(affected_products_versions)}')
-    print(f'📊 Total de items affected_products_program_routines: {len(affected_products_program_routines)}')
-    print(f'📊 Total de items configurations: {len(configurations)}')
-    print(f'📊 Total de items workarounds: {len(workarounds)}')
-    print(f'📊 Total de items solutions: {len(solutions)}')
-    print(f'📊 Total de items exploits: {len(exploits)}')
-    print(f'📊 Total de items impacts: {len(impacts)}')
-    print(f'📊 Total de items impact_descriptions: {len(impact_descriptions)}')
-    print(f'📊 Total de items taxonomy_mappings: {len(taxonomy_mappings)}')
-    print(f'📊 Total de items taxonomy_relations: {len(taxonomy_relations)}')
-    print(f'📊 Total de items tags: {len(tags)}')
-    print(f'📊 Total de items cpe_applicability: {len(cpe_applicability)}')
-    print(f'📊 Total de items cpe_nodes: {len(cpe_nodes)}')
-    print(f'📊 Total de items cpe_match: {len(cpe_match)}')
-    print(f'📊 Total de items metrics: {len(metrics)}')
-    print(f'📊 Total de items metrics_scenarios: {len(metrics_scenarios)}')
-    print(f'📊 Total de items metrics_cvssv4: {len(metrics_cvssv4)}')
-    print(f'📊 Total de items metrics_cvssv3_1: {len(metrics_cvssv3_1)}')
-    print(f'📊 Total de items metrics_cvssv3: {len(metrics_cvssv3)}')
-    print(f'📊 Total de items metrics_cvssv2: {len(metrics_cvssv2)}')
-
-    print(f"🔄 Cargando {total_items} CVEs en la base de datos...")
-    # Insert CVEs data
-    for i in range(0, len(cves), batch_size):
-        batch = cves[i:i + batch_size]
-        cursor.executemany('''
+# Tablas destino en el mismo orden que la tupla de transform_cve_record.
+# El orden respeta las FK (padres antes que hijos), así que volcar cualquier prefijo de
+# la lista es seguro. depends_on indica los padres de las tablas que no aparecen en
+# BBDD_CVE.sql. El tamaño de cada lote lo ajusta un AdaptiveBatcher por tabla
+# (src/etl/batching.py) y las filas rechazadas van a cuarentena (src/etl/batch_executor.py).
+CVE_TABLES = [
+    {
+        "name": "cves",
+        "sql": '''
             INSERT INTO CVE (cve_id, data_type, data_version, state, assigner_org_id, assigner_short_name, requester_user_id, date_updated, number_serial, date_reserved, date_published)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
@@ -967,30 +1079,19 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
                 number_serial = VALUES(number_serial),
                 date_reserved = VALUES(date_reserved),
                 date_published = VALUES(date_published)
-        ''', batch)
-        processed_items += len(batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cve_items).")
-
-    # Insert Containers data
-    for i in range(0, len(containers), batch_size):
-        batch = containers[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "containers",
+        "sql": '''
             INSERT INTO Container (container_id, cve_id, container_type, content_hash)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (containers).")
-
-    # Insert CNA Table data
-    for i in range(0, len(cna_table), batch_size):
-        batch = cna_table[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "cna_table",
+        "sql": '''
             INSERT INTO CNA (cna_id, date_assigned, date_public, title, source)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
@@ -998,125 +1099,84 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
                 date_public = VALUES(date_public),
                 title = VALUES(title),
                 source = VALUES(source)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cna_table).")
-    
-    # Insert ADP Table data
-    for i in range(0, len(adp_table), batch_size):
-        batch = adp_table[i:i + batch_size]
-        
-        cursor.executemany('''
-        INSERT INTO ADP (adp_id, date_public, title, source)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE 
-        date_public = VALUES(date_public),
-        title = VALUES(title),
-        source = VALUES(source)
-        ''', batch)
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (adp_table).")
-        
-    # Insert Provider Metadata data
-    for i in range(0, len(provider_metadata), batch_size):
-        batch = provider_metadata[i:i + batch_size]
-        
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "adp_table",
+        "sql": '''
+            INSERT INTO ADP (adp_id, date_public, title, source)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+            date_public = VALUES(date_public),
+            title = VALUES(title),
+            source = VALUES(source)
+        ''',
+    },
+    {
+        "name": "provider_metadata",
+        "sql": '''
             INSERT INTO Provider_Metadata (container_id, provider_org_id, short_name, date_updated)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
                 provider_org_id = VALUES(provider_org_id),
                 short_name = VALUES(short_name),
                 date_updated = VALUES(date_updated)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (provider_metadata).")
-
-    # Insert Timelines data
-    for i in range(0, len(timelines), batch_size):
-        batch = timelines[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "timelines",
+        "sql": '''
             INSERT INTO Timeline (timeline_id, container_id, event_time, lang, value)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
                 event_time = VALUES(event_time),
                 lang = VALUES(lang),
                 value = VALUES(value)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (timelines).")
-
-    # Insert Descriptions data
-    for i in range(0, len(descriptions), batch_size // 2):
-        batch = descriptions[i:i + batch_size // 2]
-        
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "descriptions",
+        "sql": '''
             INSERT IGNORE INTO Descriptions (id, container_id, lang, value)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
                 lang = VALUES(lang),
                 value = VALUES(value)
-        ''', batch)
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados  (descriptions).")
-
-    # Insert Descriptions Supporting Media data
-    for i in range(0, len(descriptions_supporting_media), batch_size):
-        batch = descriptions_supporting_media[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "descriptions_supporting_media",
+        "sql": '''
             INSERT INTO Descriptions_Supporting_Media (id, description_id, media_type, base_64, value)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
             media_type = VALUES(media_type),
             base_64 = VALUES(base_64),
             value = VALUES(value)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (descriptions_supporting_media).")
-
-    # Insert References data
-    for i in range(0, len(references), batch_size):
-        batch = references[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "references",
+        "sql": '''
             INSERT INTO CVE_References (id, container_id, url, name, tags)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
                 url = VALUES(url),
                 name = VALUES(name),
                 tags = VALUES(tags)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (CVE_References).")
-
-    # Insert Problem Types data
-    for i in range(0, len(problem_types), batch_size):
-        batch = problem_types[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "problem_types",
+        "sql": '''
             INSERT INTO Problem_Types (problem_type_id, container_id)
             VALUES (%s, %s)
             ON DUPLICATE KEY UPDATE container_id = VALUES(container_id)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (problem_types).")
-    
-    # Insert Problem Types Descriptions data
-    for i in range(0, len(problem_types_descriptions), batch_size):
-        batch = problem_types_descriptions[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "problem_types_descriptions",
+        "sql": '''
             INSERT INTO Problem_Type_Description (description_id, problem_type_id, lang, description, cwe_id, type)
             VALUES (%s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
@@ -1124,32 +1184,23 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
                 description = VALUES(description),
                 cwe_id = VALUES(cwe_id),
                 type = VALUES(type)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (problem_types_descriptions).")
-
-    # Insert Problem Types Descriptions References data
-    for i in range(0, len(problem_types_descriptions_refs), batch_size):
-        batch = problem_types_descriptions_refs[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "problem_types_descriptions_refs",
+        "sql": '''
             INSERT INTO Problem_Type_Description_References (reference_id, problem_type_id, url, name, tags)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
                 url = VALUES(url),
                 name = VALUES(name),
                 tags = VALUES(tags)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (problem_types_descriptions_refs).")
-
-    # Insert Credits data
-    for i in range(0, len(credits_cve), batch_size):
-        batch = credits_cve[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+        "depends_on": ["Problem_Types"],
+    },
+    {
+        "name": "credits_cve",
+        "sql": '''
             INSERT INTO Credit (credit_id, container_id, lang, value, user_id, type)
             VALUES (%s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
@@ -1157,16 +1208,11 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
                 value = VALUES(value),
                 user_id = VALUES(user_id),
                 type = VALUES(type)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (credits_cve).")
-
-    # Insert Affected Products data
-    for i in range(0, len(affected_products), batch_size):
-        batch = affected_products[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products",
+        "sql": '''
             INSERT INTO Affected_Product (product_id, container_id, vendor, product_name, collection_url, package_name, default_status, repo)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE 
@@ -1176,282 +1222,172 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
                 package_name = VALUES(package_name),
                 default_status = VALUES(default_status),
                 repo = VALUES(repo)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products).")
-    
-    # Insert Affected Products CPE data
-    for i in range(0, len(affected_products_cpe), batch_size):
-        batch = affected_products_cpe[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products_cpe",
+        "sql": '''
             INSERT INTO Affected_Product_cpe (cpe_id, product_id, cpe23_item)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE
                 cpe23_item = VALUES(cpe23_item)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products_cpe).")
-
-    # Insert Affected Products Platforms data
-    for i in range(0, len(affected_products_platforms), batch_size):
-        batch = affected_products_platforms[i:i + batch_size]
-        try:
-            cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products_platforms",
+        "sql": '''
             INSERT INTO Platforms (platform_id, product_id, platform)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE product_id = VALUES(product_id), platform = VALUES(platform)
-        ''', batch)
-            processed_items += len(batch)
-
-            conn.commit()
-            print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products_platforms).")
-        except Exception as e:
-            print(f"❌ Error al insertar datos en Platforms: {e}")
-            print(f"Batch problemático: {batch[:5]}")  # Muestra las primeras 5 filas del batch
-            conn.rollback()
-
-    # Insert Affected Products Modules data
-    for i in range(0, len(affected_products_modules), batch_size):
-        batch = affected_products_modules[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products_modules",
+        "sql": '''
             INSERT INTO Modules (module_id, product_id, module)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE product_id = VALUES(product_id), module = VALUES(module)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products_modules).")
-
-    # Insert Affected Products Program Files data
-    for i in range(0, len(affected_products_program_files), batch_size):
-        batch = affected_products_program_files[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products_program_files",
+        "sql": '''
             INSERT INTO Program_Files (file_id, product_id, file_path)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE product_id = VALUES(product_id), file_path = VALUES(file_path)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products_program_files).")
-
-    # Insert Affected Products Versions data
-    for i in range(0, len(affected_products_versions), batch_size):
-        batch = affected_products_versions[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products_versions",
+        "sql": '''
             INSERT INTO Affected_Version (affected_version_id, product_id, affected_version, affected_status, version_type, less_than, less_than_or_equal, affected_changes)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE product_id = VALUES(product_id), affected_version = VALUES(affected_version), affected_status = VALUES(affected_status), version_type = VALUES(version_type), less_than = VALUES(less_than), less_than_or_equal = VALUES(less_than_or_equal), affected_changes = VALUES(affected_changes)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products_versions).")
-
-    # Insert Affected Products Program Routines data
-    for i in range(0, len(affected_products_program_routines), batch_size):
-        batch = affected_products_program_routines[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "affected_products_program_routines",
+        "sql": '''
             INSERT INTO Program_Routines (routine_id, product_id, routine)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE product_id = VALUES(product_id), routine = VALUES(routine)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (affected_products_program_routines).")    
-
-    # Insert Configurations data
-    for i in range(0, len(configurations), batch_size):
-        batch = configurations[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "configurations",
+        "sql": '''
             INSERT INTO Configurations (configuration_id, container_id, lang, value, supporting_media)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE lang = VALUES(lang), value = VALUES(value), supporting_media = VALUES(supporting_media)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (configurations).")
-    
-    # Insert Workarounds data
-    for i in range(0, len(workarounds), batch_size):
-        batch = workarounds[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "workarounds",
+        "sql": '''
             INSERT INTO Workarounds (workaround_id, container_id, lang, value, supporting_media)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE lang = VALUES(lang), value = VALUES(value), supporting_media = VALUES(supporting_media)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (workarounds).")
-    
-    # Insert Solutions data
-    for i in range(0, len(solutions), batch_size):
-        batch = solutions[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "solutions",
+        "sql": '''
             INSERT INTO Solutions (solution_id, container_id, lang, value, supporting_media)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE lang = VALUES(lang), value = VALUES(value), supporting_media = VALUES(supporting_media)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (solutions).")
-    
-    # Insert Exploits data
-    for i in range(0, len(exploits), batch_size):
-        batch = exploits[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "exploits",
+        "sql": '''
             INSERT INTO Exploits (exploit_id, container_id, lang, value, supporting_media)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE lang = VALUES(lang), value = VALUES(value), supporting_media = VALUES(supporting_media)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (exploits).")
-    
-    # Insert Impacts data
-    for i in range(0, len(impacts), batch_size):
-        batch = impacts[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "impacts",
+        "sql": '''
             INSERT INTO Impact (impact_id, container_id, capec_id)
             VALUES (%s, %s, %s)
             ON DUPLICATE KEY UPDATE capec_id = VALUES(capec_id)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (impacts).")
-
-    # Insert Impact Descriptions data
-    for i in range(0, len(impact_descriptions), batch_size):
-        batch = impact_descriptions[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "impact_descriptions",
+        "sql": '''
             INSERT INTO Impact_Description (description_id, impact_id, lang, value, supporting_media)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE lang = VALUES(lang), value = VALUES(value), supporting_media = VALUES(supporting_media)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (impact_descriptions).")
-
-    # Insert Taxonomy Mappings data
-    for i in range(0, len(taxonomy_mappings), batch_size):
-        batch = taxonomy_mappings[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "taxonomy_mappings",
+        "sql": '''
             INSERT INTO Taxonomy_Mappings (taxonomy_id_hash, container_id, taxonomy_name, taxonomy_version)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE taxonomy_name = VALUES(taxonomy_name), taxonomy_version = VALUES(taxonomy_version)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (taxonomy_mappings).")
-
-    # Insert Taxonomy Relations data
-    for i in range(0, len(taxonomy_relations), batch_size):
-        batch = taxonomy_relations[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "taxonomy_relations",
+        "sql": '''
             INSERT INTO Taxonomy_Relations (relation_id, taxonomy_id_hash, taxonomy_id, relationship_name, relationship_value)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE taxonomy_id = VALUES(taxonomy_id), relationship_name = VALUES(relationship_name), relationship_value = VALUES(relationship_value)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (taxonomy_relations).")
-    
-    # Insert Tags data
-    for i in range(0, len(tags), batch_size):
-        batch = tags[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "tags",
+        "sql": '''
             INSERT INTO Tags (container_id, tag_extension)
             VALUES (%s, %s)
             ON DUPLICATE KEY UPDATE tag_extension = VALUES(tag_extension)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (tags).")
-
-    # Insert CPE Applicability data
-    for i in range(0, len(cpe_applicability), batch_size):
-        batch = cpe_applicability[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "cpe_applicability",
+        "sql": '''
             INSERT INTO CPE_Applicability (applicability_id, container_id, operator, negate)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE operator = VALUES(operator), negate = VALUES(negate)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cpe_applicability).")
-    
-    # Insert CPE Nodes data
-    for i in range(0, len(cpe_nodes), batch_size):
-        batch = cpe_nodes[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "cpe_nodes",
+        "sql": '''
             INSERT INTO CPE_Node (node_id, applicability_id, operator, negate)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE operator = VALUES(operator), negate = VALUES(negate)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cpe_nodes).")
-    
-    # Insert CPE Match data
-    for i in range(0, len(cpe_match), batch_size):
-        batch = cpe_match[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "cpe_match",
+        "sql": '''
             INSERT INTO CPE_Match (match_id, node_id, vulnerable, criteria_cpe23, match_criteria_id, version_start_excluding, version_start_including, version_end_excluding, version_end_including)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE vulnerable = VALUES(vulnerable), criteria_cpe23 = VALUES(criteria_cpe23), match_criteria_id = VALUES(match_criteria_id), version_start_excluding = VALUES(version_start_excluding), version_start_including = VALUES(version_start_including), version_end_excluding = VALUES(version_end_excluding), version_end_including = VALUES(version_end_including)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cpe_match).")
-
-    # Insert Metrics data
-    for i in range(0, len(metrics), batch_size):
-        batch = metrics[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "metrics",
+        "sql": '''
             INSERT INTO Metrics (metric_id, container_id, format, other_type, other_content)
             VALUES (%s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE other_type = VALUES(other_type), other_content = VALUES(other_content)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (metrics).")
-    
-    # Insert Metrics Scenarios data
-    for i in range(0, len(metrics_scenarios), batch_size):
-        batch = metrics_scenarios[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "metrics_scenarios",
+        "sql": '''
             INSERT INTO Metrics_Scenarios (scenario_id, metric_id, lang, value)
             VALUES (%s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE lang = VALUES(lang), value = VALUES(value)
-        ''', batch)
-        processed_items += len(batch)
-
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (metrics_scenarios).")
-    
-    # # Insert Metrics CVSSv4 data
-    for i in range(0, len(metrics_cvssv4), batch_size):
-        batch = metrics_cvssv4[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "metrics_cvssv4",
+        "sql": '''
             INSERT INTO CVSSV4 (
             cvssv4_id, metric_id, vector_string, version, base_score, base_severity, attack_vector, attack_complexity, 
             attack_requirements, privileges_required, user_interaction, vuln_confidentiality_impact, vuln_integrity_impact, 
@@ -1503,16 +1439,11 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
             value_density = VALUES(value_density),
             vulnerability_response_effort = VALUES(vulnerability_response_effort),
             provider_urgency = VALUES(provider_urgency)
-        ''', batch)
-        processed_items += len(batch)
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (metrics_cvssv4).")    
-
-    # Insert Metrics CVSSv3.1 data
-    for i in range(0, len(metrics_cvssv3_1), batch_size // 2):  # Reduce aún más el tamaño del lote
-        batch = metrics_cvssv3_1[i:i + batch_size // 2]
-        try:
-            cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "metrics_cvssv3_1",
+        "sql": '''
             INSERT INTO CVSSV3_1 (
             cvssv3_1_id, metric_id, version, vector_string, base_score, base_severity, attack_vector, 
             attack_complexity, privileges_required, user_interaction, scope, confidentiality_impact, 
@@ -1557,21 +1488,11 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
             modified_availability_impact = VALUES(modified_availability_impact),
             environmental_score = VALUES(environmental_score),
             environmental_severity = VALUES(environmental_severity)
-        ''', batch)
-            
-            processed_items += len(batch)
-            conn.commit()
-            print(f"Progreso: {processed_items}/{total_items} items procesados (metrics_cvssv2).")
-        except Exception as e:
-            print(f"❌ Error al procesar el lote: {e}")
-            conn.rollback()
-
-    # Insert Metrics CVSSv3 data
-    for i in range(0, len(metrics_cvssv3), batch_size // 2):  # Reduce aún más el tamaño del lote
-        batch = metrics_cvssv3[i:i + batch_size // 2]
-
-        try:
-            cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "metrics_cvssv3",
+        "sql": '''
             INSERT INTO CVSSV3 (
             cvssv3_id, metric_id, version, vector_string, base_score, base_severity, attack_vector, 
             attack_complexity, privileges_required, user_interaction, scope, confidentiality_impact, 
@@ -1616,19 +1537,11 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
             modified_availability_impact = VALUES(modified_availability_impact),
             environmental_score = VALUES(environmental_score),
             environmental_severity = VALUES(environmental_severity)
-        ''', batch)
-        
-            processed_items += len(batch)
-            conn.commit()
-            print(f"Progreso: {processed_items}/{total_items} items procesados (metrics_cvssv2).")
-        except Exception as e:
-            print(f"❌ Error al procesar el lote: {e}")
-            conn.rollback()
-    
-    # Insert Metrics CVSSv2 data
-    for i in range(0, len(metrics_cvssv2), batch_size):
-        batch = metrics_cvssv2[i:i + batch_size]
-        cursor.executemany('''
+        ''',
+    },
+    {
+        "name": "metrics_cvssv2",
+        "sql": '''
             INSERT INTO CVSSV2 (
             cvssv2_id, metric_id, version, vector_string, base_score, access_vector, 
             access_complexity, authentication, confidentiality_impact, integrity_impact, 
@@ -1661,111 +1574,681 @@ def load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, tim
             integrity_requirement = VALUES(integrity_requirement),
             availability_requirement = VALUES(availability_requirement),
             environmental_score = VALUES(environmental_score)
-        ''', batch)
-        processed_items += len(batch)
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (metrics_cvssv2).")
-    
-    conn.commit()
+        ''',
+    },
+]
+
+def insert_table_rows(conn, cursor, spec, rows, batcher, bulk_cursor=None, quarantine=None):
+    """
+    Inserta las filas de una tabla en los lotes que marca batcher usando el upsert de su especificación.
+    Con bulk_cursor cada lote se carga con LOAD DATA LOCAL INFILE en lugar de executemany.
+    Con quarantine, las filas que el servidor rechaza se apartan y el resto del lote se confirma.
+    """
+    def upsert(batch):
+        if bulk_cursor is not None:
+            bulk_upsert(conn, bulk_cursor, spec["sql"], batch)
+        else:
+            cursor.executemany(spec["sql"], batch)
+            conn.commit()
+
+    def load_batch(batch):
+        return execute_batch(conn, batch, upsert, spec["name"], quarantine, cursors=(cursor, bulk_cursor))
+
+    return batcher.run(rows, load_batch)
+
+def cve_batchers(conn, specs=CVE_TABLES, bulk=False):
+    """Un AdaptiveBatcher por tabla, limitado por el max_allowed_packet del servidor (sin límite con LOAD DATA)."""
+    packet_limit = None if bulk else max_allowed_packet(conn)
+    return {spec["name"]: AdaptiveBatcher(packet_limit) for spec in specs}
+
+# Columnas con pocos valores distintos (idiomas, tipos, estados). Junto con los enumerados de
+# las tablas CVSS se internan para que pickle las serialice una vez por lote y el proceso
+# principal comparta un único objeto por valor.
+INTERNED_COLUMNS = {
+    'data_type', 'data_version', 'state', 'assigner_org_id', 'assigner_short_name', 'container_type',
+    'provider_org_id', 'short_name', 'lang', 'media_type', 'type', 'cwe_id', 'default_status',
+    'affected_status', 'version_type', 'platform', 'operator', 'taxonomy_name', 'format', 'other_type',
+}
+
+def interned_positions(spec):
+    """Posiciones de las columnas de una tabla de CVE_TABLES cuyos valores se internan."""
+    columns = parse_upsert(spec["sql"])[2]
+    cvss = spec["name"].startswith("metrics_cvss")
+    return tuple(
+        i for i, column in enumerate(columns)
+        if column in INTERNED_COLUMNS
+        or (cvss and column != "vector_string" and not column.endswith(("_id", "_score")))
+    )
+
+CVE_INTERNED_POSITIONS = [interned_positions(spec) for spec in CVE_TABLES]
+
+def intern_row(row, positions):
+    row = list(row)
+    for i in positions:
+        if type(row[i]) is str:
+            row[i] = sys.intern(row[i])
+    return tuple(row)
+
+def compact_record(tables):
+    """Convierte la tupla de transform_cve_tables en {índice: filas} sin las tablas vacías."""
+    record = {}
+    for idx, rows in enumerate(tables):
+        if rows:
+            positions = CVE_INTERNED_POSITIONS[idx]
+            record[idx] = [intern_row(row, positions) for row in rows] if positions else rows
+    return record
+
+def cve_table_parents():
+    """
+    Devuelve {índice en CVE_TABLES: set(índices de sus tablas padre)} a partir de las FK
+    de BBDD_CVE.sql y de los depends_on de la especificación.
+    """
+    schema = load_schema_dependencies(CVE_SCHEMA)
+    index = {parse_upsert(spec["sql"])[1].lower(): idx for idx, spec in enumerate(CVE_TABLES)}
+    parents = {}
+    for table, idx in index.items():
+        spec = CVE_TABLES[idx]
+        if "depends_on" in spec:
+            table_parents = {parent.lower() for parent in spec["depends_on"]}
+        elif table in schema:
+            table_parents = schema[table]
+        else:
+            raise ValueError(f"La tabla {table} no está en {CVE_SCHEMA} y no tiene depends_on.")
+        parents[idx] = {index[parent] for parent in table_parents if parent in index}
+    return parents
+
+def open_cve_connection(bulk=False, checks=True):
+    """
+    Abre una conexión de carga: (conn, cursor preparado, cursor para LOAD DATA o None).
+    Con checks=False la sesión no comprueba FK ni claves únicas (ver integrity.deferred_checks).
+    """
+    conn = connect_db_cve()
+    # LOAD DATA no admite sentencias preparadas: necesita un cursor normal
+    bulk_cursor = conn.cursor() if bulk and enable_local_infile(conn) else None
+    conn.ping(reconnect=True)
+    if not checks:
+        # También tras reconectar: con las FK activas, un hijo cuyo padre aún carga otra conexión iría a cuarentena
+        register_session_init(conn, lambda conn: set_session_checks(conn, False))
+    return conn, conn.cursor(prepared=True), bulk_cursor
+
+def close_cve_connection(connection):
+    conn, cursor, bulk_cursor = connection
     cursor.close()
+    if bulk_cursor is not None:
+        bulk_cursor.close()
     conn.close()
+
+def load_table_rows(conn, cursor, bulk_cursor, spec, rows, batcher, known_containers=None, quarantine=None):
+    """Carga las filas de una tabla de CVE_TABLES y devuelve cuántas se insertaron."""
+    # Modo incremental: los hijos de los contenedores modificados se borran antes de reinsertarlos
+    if spec["name"] == "containers" and known_containers:
+        changed = [row[0] for row in rows if row[0] in known_containers]
+        if changed:
+            delete_container_children(conn, cursor, changed)
+    return insert_table_rows(conn, cursor, spec, rows, batcher, bulk_cursor, quarantine)
+
+def replay_cve_checkpoint(checkpoint, known_containers=None, bulk=False, quarantine=None):
+    """Carga, en el orden en que se escribieron, los lotes del checkpoint que no llegaron a confirmarse."""
+    specs = {spec["name"]: spec for spec in CVE_TABLES}
+    print(f"♻️ Reanudando {checkpoint.pending_count()} lotes pendientes ({checkpoint.pending_rows()} filas)...")
+    conn, cursor, bulk_cursor = open_cve_connection(bulk)
+    batchers = cve_batchers(conn, bulk=bulk_cursor is not None)
+    try:
+        for seq, name, rows in checkpoint.pending():
+            load_table_rows(conn, cursor, bulk_cursor, specs[name], rows, batchers[name], known_containers, quarantine)
+            checkpoint.mark_committed(seq)
+    finally:
+        close_cve_connection((conn, cursor, bulk_cursor))
+    print("✅ Lotes pendientes del checkpoint cargados.")
+
+def load_cve_data(records, batch_size=10000, known_containers=None, bulk=False, workers=LOAD_WORKERS, checkpoint=None,
+                  specs=CVE_TABLES, parents=None, checks=True, quarantine=None):
+    """
+    Carga en streaming los registros que van generando los workers.
+    Cada tabla tiene su propio buffer; cuando uno llega a batch_size se vuelca junto con
+    los de sus tablas ancestro, por lo que la memoria no depende del tamaño del corpus.
+    Dentro de cada volcado las sentencias van en lotes de tamaño adaptativo (AdaptiveBatcher).
+    Cada volcado carga en paralelo (workers conexiones) las tablas cuyos padres ya están confirmados.
+    Con checkpoint, cada lote se guarda antes de enviarlo y, si la carga falla, también
+    los buffers sin volcar, de forma que la siguiente ejecución pueda reanudarla.
+    specs sustituye a CVE_TABLES (mismo orden) y parents al grafo de FK, p. ej. para las tablas sombra.
+    checks=False desactiva las comprobaciones de FK y UNIQUE en las conexiones de carga.
+    Con quarantine, las filas rechazadas se guardan allí en lugar de abortar la carga.
+    """
+    if parents is None:
+        parents = cve_table_parents()
+    lineage = [ancestors(idx, parents) | {idx} for idx in range(len(specs))]
+
+    connections = [open_cve_connection(bulk, checks) for _ in range(max(1, workers))]
+    if bulk:
+        if all(bulk_cursor is not None for _, _, bulk_cursor in connections):
+            print("🚚 Carga masiva con LOAD DATA LOCAL INFILE activada.")
+        else:
+            print("⚠️ local_infile no está disponible en el servidor. Se usa executemany.")
+            connections = [(conn, cursor, None) for conn, cursor, _ in connections]
+    pool = connection_pool(connections)
+    batchers = cve_batchers(connections[0][0], specs, bulk=connections[0][2] is not None)
+
+    buffers = [[] for _ in specs]
+    totals = [0] * len(specs)
+
+    def flush(tables):
+        ready = {}
+        seqs = {}
+        for idx in sorted(tables):
+            if buffers[idx]:
+                ready[idx] = buffers[idx]
+                buffers[idx] = []
+                if checkpoint:
+                    seqs[idx] = checkpoint.append(specs[idx]["name"], ready[idx])
+
+        def load_table(idx):
+            with borrow(pool) as (conn, cursor, bulk_cursor):
+                totals[idx] += load_table_rows(conn, cursor, bulk_cursor, specs[idx], ready[idx], batchers[specs[idx]["name"]],
+                                               known_containers, quarantine)
+            if checkpoint:
+                checkpoint.mark_committed(seqs[idx])
+
+        run_in_dependency_order(set(ready), parents, load_table, workers)
+        print(f"Progreso: {sum(totals)} items insertados.")
+
+    print(f"🔄 Cargando CVEs en la base de datos con {len(connections)} conexiones...")
+    try:
+        for parsed in records:
+            # Los ADP retirados se borran antes de cargar el CVE: si la carga se corta, el CVE se vuelve a procesar
+            stale = parsed.pop(STALE_CONTAINERS, None)
+            if stale:
+                with borrow(pool) as (conn, cursor, _):
+                    delete_containers(conn, cursor, stale)
+            # El registro entra completo en los buffers antes de volcar, para no dejarlo a medias si falla la carga
+            full = set()
+            for idx, rows in parsed.items():
+                buffers[idx].extend(rows)
+                if len(buffers[idx]) >= batch_size:
+                    full |= lineage[idx]
+            if full:
+                flush(full)
+        if checkpoint:
+            checkpoint.mark_parsed()
+        flush(range(len(specs)))
+    except BaseException:
+        if checkpoint:
+            # Los buffers se guardan en orden de CVE_TABLES (padres antes que hijos)
+            for idx, rows in enumerate(buffers):
+                if rows:
+                    checkpoint.append(specs[idx]["name"], rows)
+            checkpoint.set_state("failed")
+        raise
+    finally:
+        for connection in connections:
+            close_cve_connection(connection)
+
+    for spec, total in zip(specs, totals):
+        print(f'📊 Total de items {spec["name"]}: {total} (lote final: {batchers[spec["name"]].size})')
     print("✅ Datos insertados en la base de datos correctamente.")
 
-def process_files_in_parallel(cve_files):
-    # Usa todos los núcleos disponibles
-    num_workers = cpu_count()
+def rebuild_cve_data(records, batch_size=10000, bulk=False, workers=LOAD_WORKERS, quarantine=None):
+    """
+    Reconstrucción completa sin tocar las tablas en uso: carga todos los CVEs en tablas sombra
+    (Tabla__new) que solo tienen clave primaria, sin FK que ordenen la carga, crea después sus
+    índices secundarios (los del script y los de index.py) y sus FK, y las intercambia con las
+    tablas en uso en un único RENAME TABLE.
+    """
+    statements = load_schema_statements(CVE_SCHEMA)
+    loaded = [parse_upsert(spec["sql"])[1] for spec in CVE_TABLES]
+    # Tablas del script que la ETL no carga: se copian tal cual para que el intercambio sea completo
+    copied = [table for table in statements if table not in loaded]
+    tables = loaded + copied
+
+    conn = connect_db_cve()
+    cursor = conn.cursor()
+    try:
+        try:
+            print(f"🏗️ Creando {len(tables)} tablas {SHADOW_SUFFIX}...")
+            deferred = create_shadow_tables(cursor, statements, tables)
+            for table in copied:
+                cursor.execute(f"INSERT INTO {table}{SHADOW_SUFFIX} SELECT * FROM {table}")
+            conn.commit()
+
+            specs = [dict(spec, sql=shadow_upsert(spec["sql"])) for spec in CVE_TABLES]
+            load_cve_data(records, batch_size=batch_size, bulk=bulk, workers=workers,
+                          specs=specs, parents={idx: set() for idx in range(len(specs))}, quarantine=quarantine)
+
+            build_shadow_indexes(cursor, deferred, {table: index_clauses(table, "cve") for table in tables})
+        except BaseException:
+            print("❌ Reconstrucción interrumpida. Las tablas en uso no se han modificado.")
+            drop_shadow_tables(cursor, tables)
+            raise
+
+        print("🔀 Intercambiando las tablas sombra con las tablas en uso...")
+        swap_shadow_tables(cursor, tables)
+        print(f"✅ Reconstrucción completa de {DB_CVE} finalizada.")
+    finally:
+        cursor.close()
+        conn.close()
+
+def iter_transformed_records(cve_files, zip_path=None, known_state=None):
+    """
+    Devuelve los registros transformados según los van terminando los workers.
+    Un semáforo limita las tareas pendientes para que los resultados no se acumulen en
+    memoria cuando la carga en MySQL va más lenta que el parseo.
+    """
+    # Usa todos los núcleos disponibles (o los que le asigne run_all_etls)
+    num_workers = cpu_workers()
     print(f"🔄 Procesando archivos en paralelo con {num_workers} núcleos...")
 
-    with Pool(num_workers) as pool:
-        results = pool.map(transform_cve_data, cve_files)
+    if zip_path:
+        # Cada worker abre su propio ZipFile y recibe listas de nombres de fichero
+        tasks = (cve_files[i:i + ZIP_SHARD_SIZE] for i in range(0, len(cve_files), ZIP_SHARD_SIZE))
+        worker, chunksize = transform_cve_members, 1
+    else:
+        tasks = iter(cve_files)
+        worker, chunksize = transform_cve_data, POOL_CHUNKSIZE
+    slots = Semaphore(num_workers * chunksize * MAX_PENDING_TASKS_PER_WORKER)
+
+    def bounded(items):
+        for item in items:
+            slots.acquire()
+            yield item
+
+    changed = 0
+    with Pool(num_workers, initializer=init_worker, initargs=(zip_path, known_state)) as pool:
+        try:
+            for result in pool.imap_unordered(worker, bounded(tasks), chunksize=chunksize):
+                slots.release()
+                for parsed in (result if zip_path else [result]):
+                    if parsed:
+                        changed += 1
+                        yield parsed
+        finally:
+            # Desbloquea el hilo que alimenta el Pool si la carga se interrumpe
+            slots.release(len(cve_files))
+
+    if known_state:
+        print(f"♻️ Sincronización incremental: {changed} CVEs nuevos o modificados de {len(cve_files)}.")
+
+def load_cve_shard(shard):
+    """
+    Worker de WORKER_WRITES: parsea un grupo de ficheros y carga sus filas con la conexión del
+    worker, tabla a tabla en el orden de CVE_TABLES (padres antes que hijos). Cada grupo tiene
+    CVEs completos, así que sus FK no dependen de otros grupos.
+    Devuelve (CVEs cargados, filas insertadas por tabla, filas en cuarentena).
+    """
+    if _zip_ref is not None:
+        records = transform_cve_members(shard)
+    else:
+        records = [parsed for parsed in map(transform_cve_data, shard) if parsed]
+    conn, cursor, bulk_cursor = _worker_connection
+    tables = {}
+    stale = []
+    for parsed in records:
+        stale.extend(parsed.pop(STALE_CONTAINERS, []))
+        for idx, rows in parsed.items():
+            tables.setdefault(idx, []).extend(rows)
+    if stale:
+        delete_containers(conn, cursor, stale)
+
+    counts = [0] * len(CVE_TABLES)
+    for idx in sorted(tables):
+        spec = CVE_TABLES[idx]
+        counts[idx] = load_table_rows(conn, cursor, bulk_cursor, spec, tables[idx], _worker_batchers[spec["name"]],
+                                      _worker_known_containers, _worker_quarantine)
+    rejected = sum(len(rows) for rows in tables.values()) - sum(counts)
+    return len(records), counts, rejected
+
+def load_cve_data_in_workers(cve_files, zip_path=None, known_state=None, known_containers=None, bulk=False, checks=True):
+    """
+    Parseo y carga en los mismos workers: cada uno abre su conexión en el initializer del Pool
+    e inserta las filas de sus grupos de ficheros, sin enviarlas al proceso principal.
+    """
+    # Cada worker abre una conexión: no más que las asignadas a la ETL
+    num_workers = min(cpu_workers(), db_connections(cpu_workers()))
+    shards = [cve_files[i:i + ZIP_SHARD_SIZE] for i in range(0, len(cve_files), ZIP_SHARD_SIZE)]
+    print(f"🔄 Parseando y cargando CVEs en {num_workers} workers con su propia conexión...")
+
+    totals = [0] * len(CVE_TABLES)
+    changed = 0
+    rejected = 0
+    pool = Pool(num_workers, initializer=init_writer_worker, initargs=(zip_path, known_state, known_containers, bulk, checks))
+    try:
+        for done, (loaded, counts, shard_rejected) in enumerate(pool.imap_unordered(load_cve_shard, shards), start=1):
+            changed += loaded
+            rejected += shard_rejected
+            totals = [total + count for total, count in zip(totals, counts)]
+            print(f"Progreso: {done}/{len(shards)} grupos, {sum(totals)} items insertados.")
+        # close + join deja terminar a los workers, que cierran sus conexiones
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    if known_state:
+        print(f"♻️ Sincronización incremental: {changed} CVEs nuevos o modificados de {len(cve_files)}.")
+    for spec, total in zip(CVE_TABLES, totals):
+        print(f'📊 Total de items {spec["name"]}: {total}')
+    if rejected:
+        print(f"⚠️ {rejected} filas rechazadas guardadas en cuarentena en {QUARANTINE_PATH}.")
+    print("✅ Datos insertados en la base de datos correctamente.")
+
+def cve_record_path(cve_id):
+    """Ruta relativa del JSON de un CVE en cvelistV5: cves/2024/1xxx/CVE-2024-1234.json."""
+    _, year, number = cve_id.split("-")
+    return os.path.join("cves", year, f"{int(number) // 1000}xxx", f"{cve_id}.json")
+
+def read_delta_manifest(source, feeds):
+    """
+    Lee un deltaLog.json (lista de deltas) o un delta.json (un solo delta) de una ruta local o,
+    con la caché de feeds, de una URL. Devuelve la lista de deltas.
+    """
+    path = source if os.path.exists(source) else feeds.fetch(source).path
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest if isinstance(manifest, list) else [manifest]
 
-    # Combinar los resultados
-    all_cves, all_containers, all_cna_table, all_adp_table, all_provider_metadata, all_timelines, all_descriptions, all_descriptions_supporting_media, all_references, all_problem_types, all_problem_types_descriptions, all_problem_types_descriptions_refs, all_credits_cve, all_affected_products, all_affected_products_cpe, all_affected_products_platforms, all_affected_products_modules, all_affected_products_program_files, all_affected_products_versions, all_affected_products_program_routines, all_configurations, all_workarounds, all_solutions, all_exploits, all_impacts, all_impact_descriptions, all_taxonomy_mappings, all_taxonomy_relations, all_tags, all_cpe_applicability, all_cpe_nodes, all_cpe_match, all_metrics, all_metrics_scenarios, all_metrics_cvssv4, all_metrics_cvssv3_1, all_metrics_cvssv3, all_metrics_cvssv2  = ([] for _ in range(38))
+def collect_delta_changes(deltas, since=None):
+    """
+    Junta los deltas posteriores a since (fetchTime) del más antiguo al más reciente.
+    Devuelve ({cve_id: entrada más reciente de new/updated}, cve_ids borrados, último fetchTime).
+    """
+    changed = {}
+    deleted = set()
+    latest = since
+    for delta in sorted(deltas, key=lambda d: d.get("fetchTime") or ""):
+        fetch_time = delta.get("fetchTime")
+        if since and fetch_time and fetch_time <= since:
+            continue
+        for entry in delta.get("new", []) + delta.get("updated", []):
+            changed[entry["cveId"]] = entry
+            deleted.discard(entry["cveId"])
+        for entry in delta.get("deleted", []):
+            changed.pop(entry["cveId"], None)
+            deleted.add(entry["cveId"])
+        if fetch_time and (latest is None or fetch_time > latest):
+            latest = fetch_time
+    return changed, deleted, latest
+
+def read_delta_record(entry, session=None, records_dir=None):
+    """JSON del CVE de una entrada del delta (de records_dir o de su githubLink); None si ya no existe."""
+    if records_dir:
+        path = os.path.join(records_dir, cve_record_path(entry["cveId"]))
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    response = (session or requests).get(entry["githubLink"], timeout=60)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
 
+def fetch_delta_records(entries, records_dir=None, workers=DELTA_FETCH_WORKERS):
+    """Devuelve [(cve_id, JSON o None)] de las entradas del delta, descargándolas en paralelo."""
+    session = None if records_dir else requests.Session()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            records = executor.map(lambda entry: read_delta_record(entry, session, records_dir), entries)
+            return [(entry["cveId"], data) for entry, data in zip(entries, records)]
+    finally:
+        if session is not None:
+            session.close()
+
+def delete_cves(conn, cursor, cve_ids, batch_size=1000):
+    """Elimina CVEs con todos sus contenedores y filas hijas."""
+    cve_ids = list(cve_ids)
+    for i in range(0, len(cve_ids), batch_size):
+        batch = cve_ids[i:i + batch_size]
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"SELECT container_id FROM Container WHERE cve_id IN ({placeholders})", batch)
+        container_ids = [row[0] for row in cursor.fetchall()]
+        if container_ids:
+            delete_container_children(conn, cursor, container_ids)
+        # Container, CNA, ADP y Provider_Metadata caen por ON DELETE CASCADE
+        cursor.execute(f"DELETE FROM CVE WHERE cve_id IN ({placeholders})", batch)
+        conn.commit()
+    print(f"🗑️ {len(cve_ids)} CVEs borrados de {DB_CVE} (eliminados o rechazados en cvelistV5).")
 
-    for parsed in results:
+def rejected_cves(cursor, rejected):
+    """
+    CVEs de las filas en cuarentena (los (tabla, fila) de Quarantine.rejected_since). Cada fila se
+    sigue por las FK de CVE_SCHEMA hasta una columna cve_id: el padre se busca entre las demás
+    filas rechazadas o, si llegó a insertarse, en la BBDD. Devuelve (CVEs, filas sin resolver).
+    """
+    upserts = {spec["name"]: parse_upsert(spec["sql"]) for spec in CVE_TABLES}
+    foreign_keys = {}
+    for table, columns, parent, parent_columns in load_schema_foreign_keys(CVE_SCHEMA):
+        foreign_keys.setdefault(table, (columns, parent, parent_columns))
+    rows = [(upserts[name][1], dict(zip(upserts[name][2], row))) for name, row in rejected]
+
+    cve_ids = set()
+    unresolved = 0
+    for table, values in rows:
+        while values is not None and not values.get("cve_id"):
+            if table not in foreign_keys:
+                values = None
+                break
+            columns, parent, parent_columns = foreign_keys[table]
+            key = [values[column] for column in columns]
+            values = next((other for other_table, other in rows
+                           if other_table == parent and [other.get(column) for column in parent_columns] == key), None)
+            if values is None:
+                where = " AND ".join(f"{column} = %s" for column in parent_columns)
+                cursor.execute(f"SELECT * FROM {parent} WHERE {where} LIMIT 1", key)
+                row = cursor.fetchone()
+                values = dict(zip([column[0] for column in cursor.description], row)) if row else None
+            table = parent
+        if values is None:
+            unresolved += 1
+        else:
+            cve_ids.add(values["cve_id"])
+    return cve_ids, unresolved
+
+def invalidate_cves(conn, cursor, cve_ids, batch_size=1000):
+    """
+    Quita date_updated de los CVEs y content_hash de sus contenedores: la siguiente sincronización
+    incremental los trata como modificados y los recarga enteros.
+    """
+    cve_ids = list(cve_ids)
+    for i in range(0, len(cve_ids), batch_size):
+        batch = cve_ids[i:i + batch_size]
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"UPDATE CVE SET date_updated = NULL WHERE cve_id IN ({placeholders})", batch)
+        cursor.execute(f"UPDATE Container SET content_hash = NULL WHERE cve_id IN ({placeholders})", batch)
+        conn.commit()
+
+def invalidate_rejected_cves(quarantine, offset):
+    """
+    Invalida los CVEs con filas añadidas a la cuarentena desde offset y devuelve cuántas filas son.
+    Misma política que CWE y CAPEC: los CVEs limpios quedan registrados en la BBDD (date_updated y
+    hashes) y la próxima ejecución solo recarga los invalidados.
+    """
+    rejected = quarantine.rejected_since(offset)
+    if not rejected:
+        return 0
+    conn = connect_db_cve()
+    cursor = conn.cursor()
+    try:
+        cve_ids, unresolved = rejected_cves(cursor, rejected)
+        invalidate_cves(conn, cursor, sorted(cve_ids))
+    finally:
+        cursor.close()
+        conn.close()
+    print(f"⚠️ {len(rejected)} filas en cuarentena en {len(cve_ids)} CVEs: se recargarán en la próxima ejecución.")
+    if unresolved:
+        print(f"⚠️ {unresolved} filas en cuarentena sin CVE en {DB_CVE}: revisar {QUARANTINE_PATH}.")
+    return len(rejected)
+
+def finish_cve_load(feeds, feed, quarantine, offset):
+    """
+    Cierra una carga de cvelistV5: invalida los CVEs con filas en cuarentena y, si no hubo ninguna,
+    registra el ZIP como procesado. Con filas rechazadas el ZIP sigue pendiente para que la próxima
+    ejecución no lo salte; con INCREMENTAL_SYNC solo recarga los CVEs invalidados.
+    """
+    if invalidate_rejected_cves(quarantine, offset) == 0 and feed is not None:
+        feeds.mark_processed(feed)
+
+def load_delta_state(path=DELTA_STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f).get("fetch_time")
+
+def save_delta_state(fetch_time, path=DELTA_STATE_PATH):
+    with open(path + ".tmp", "w") as f:
+        json.dump({"fetch_time": fetch_time}, f)
+    os.replace(path + ".tmp", path)
+
+def load_cve_delta(source=DELTA_MANIFEST, feeds=None, records_dir=DELTA_RECORDS_DIR, quarantine=None,
+                   state_path=DELTA_STATE_PATH):
+    """
+    Aplica los deltas de cvelistV5 posteriores al último aplicado: carga los CVEs nuevos o
+    modificados (con la sincronización incremental, solo los contenedores que han cambiado) y
+    borra los eliminados y los que han pasado a REJECTED, que la carga completa tampoco incluye.
+    """
+    deltas = read_delta_manifest(source, feeds or FeedCache())
+    since = load_delta_state(state_path)
+    changed, deleted, latest = collect_delta_changes(deltas, since)
+    if since is None:
+        # El deltaLog solo cubre los últimos días: la BBDD debe venir de una carga completa reciente
+        print("⚠️ Primer delta: se aplican todos los del manifiesto.")
+    print(f"🔄 Delta desde {since or 'el inicio del manifiesto'}: {len(changed)} CVEs nuevos o modificados, {len(deleted)} eliminados.")
+
+    known_cves, known_containers = load_known_state() if INCREMENTAL_SYNC else (None, None)
+    records = []
+    for cve_id, data in fetch_delta_records(list(changed.values()), records_dir):
+        if data is None or data.get("cveMetadata", {}).get("state") != "PUBLISHED":
+            deleted.add(cve_id)
+            continue
+        parsed = transform_cve_record(data, known_cves, known_containers)
         if parsed:
-            cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2 = parsed
-            all_cves.extend(cves)
-            all_containers.extend(containers)
-            all_cna_table.extend(cna_table)
-            all_adp_table.extend(adp_table)
-            all_provider_metadata.extend(provider_metadata)
-            all_timelines.extend(timelines)
-            all_descriptions.extend(descriptions)
-            all_descriptions_supporting_media.extend(descriptions_supporting_media)
-            all_references.extend(references)
-            all_problem_types.extend(problem_types)
-            all_problem_types_descriptions.extend(problem_types_descriptions)
-            all_problem_types_descriptions_refs.extend(problem_types_descriptions_refs)
-            all_credits_cve.extend(credits_cve)
-            all_affected_products.extend(affected_products)
-            all_affected_products_cpe.extend(affected_products_cpe)
-            all_affected_products_platforms.extend(affected_products_platforms)
-            all_affected_products_modules.extend(affected_products_modules)
-            all_affected_products_program_files.extend(affected_products_program_files)
-            all_affected_products_versions.extend(affected_products_versions)
-            all_affected_products_program_routines.extend(affected_products_program_routines)
-            all_configurations.extend(configurations)
-            all_workarounds.extend(workarounds)
-            all_solutions.extend(solutions)
-            all_exploits.extend(exploits)
-            all_impacts.extend(impacts)
-            all_impact_descriptions.extend(impact_descriptions)
-            all_taxonomy_mappings.extend(taxonomy_mappings)
-            all_taxonomy_relations.extend(taxonomy_relations)
-            all_tags.extend(tags)
-            all_cpe_applicability.extend(cpe_applicability)
-            all_cpe_nodes.extend(cpe_nodes)
-            all_cpe_match.extend(cpe_match)
-            all_metrics.extend(metrics)
-            all_metrics_scenarios.extend(metrics_scenarios)
-            all_metrics_cvssv4.extend(metrics_cvssv4)
-            all_metrics_cvssv3_1.extend(metrics_cvssv3_1)
-            all_metrics_cvssv3.extend(metrics_cvssv3)
-            all_metrics_cvssv2.extend(metrics_cvssv2)
-
-
-    return all_cves, all_containers, all_cna_table, all_adp_table, all_provider_metadata, all_timelines, all_descriptions, all_descriptions_supporting_media, all_references, all_problem_types, all_problem_types_descriptions, all_problem_types_descriptions_refs, all_credits_cve, all_affected_products, all_affected_products_cpe, all_affected_products_platforms, all_affected_products_modules, all_affected_products_program_files, all_affected_products_versions, all_affected_products_program_routines, all_configurations, all_workarounds, all_solutions, all_exploits, all_impacts, all_impact_descriptions, all_taxonomy_mappings, all_taxonomy_relations, all_tags, all_cpe_applicability, all_cpe_nodes, all_cpe_match, all_metrics, all_metrics_scenarios, all_metrics_cvssv4, all_metrics_cvssv3_1, all_metrics_cvssv3, all_metrics_cvssv2
+            records.append(parsed)
 
-def main():
-    # Initialize variables to avoid UnboundLocalError in case of an exception
-    cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2 = ([] for _ in range(38))
+    if deleted:
+        conn = connect_db_cve()
+        cursor = conn.cursor()
+        try:
+            delete_cves(conn, cursor, sorted(deleted))
+        finally:
+            cursor.close()
+            conn.close()
+    if records:
+        load_cve_data(records, known_containers=known_containers, quarantine=quarantine)
+    else:
+        print("✅ Ningún CVE del delta ha cambiado respecto a la BBDD.")
 
+    if latest:
+        save_delta_state(latest, state_path)
+    print(f"✅ Delta aplicado hasta {latest}.")
+
+def find_cve_files(zip_path):
+    """Devuelve (ruta del ZIP, ficheros CVE a procesar) del ZIP de cvelistV5."""
+    if STREAM_FROM_ZIP:
+        cve_files = list_cve_members(zip_path)
+    else:
+        print("🔄 Descomprimiendo datos...")
+        cve_files = process_zip_and_find_json(zip_path, EXTRACT_DIR)
+    print(f"✅ {len(cve_files)} archivos encontrados.")
+    return zip_path, cve_files
+
+def main():
+    checkpoint = CheckpointStore(CHECKPOINT_DIR)
+    quarantine = Quarantine(QUARANTINE_PATH)
+    # Filas que esta ejecución añade a la cuarentena (también las de los workers): sus CVEs se reintentan
+    offset = quarantine.offset()
+    feeds = FeedCache()
+    feed = None
+    batch_size = BULK_BATCH_SIZE if BULK_LOAD else 10000
     try:
         check_or_create_cve_db()
 
-        # Verificar si hay datos procesados guardados
-        if os.path.exists(TEMP_FILE):
-            print(f"♻️ Archivo temporal encontrado: {TEMP_FILE}. Cargando datos procesados...")
-            cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2 = load_processed_data(TEMP_FILE)
-            print("✅ Datos procesados cargados correctamente.")
+        if FULL_REBUILD:
+            # La reconstrucción sustituye todas las tablas: los lotes pendientes ya no aplican
+            checkpoint.clear()
+            with stage("descarga"):
+                feed = feeds.fetch(URL)
+            with stage("descompresión"):
+                zip_path, cve_files = find_cve_files(feed.path)
+            records = iter_transformed_records(cve_files, zip_path=zip_path if STREAM_FROM_ZIP else None)
+            with stage("parseo y carga"):
+                rebuild_cve_data(records, batch_size=batch_size, bulk=BULK_LOAD, quarantine=quarantine)
+            finish_cve_load(feeds, feed, quarantine, offset)
+            return
+
+        # Reanudar una carga interrumpida: primero los lotes que no llegaron a confirmarse
+        if checkpoint.pending_count():
+            print(f"♻️ Checkpoint encontrado en {CHECKPOINT_DIR}.")
+            known_containers = load_known_state()[1] if INCREMENTAL_SYNC else None
+            with stage("checkpoint"):
+                replay_cve_checkpoint(checkpoint, known_containers, BULK_LOAD, quarantine)
+
+        # Con una carga completa a medias (estado "running" o "failed") se termina esa antes que el delta
+        if DELTA_MODE and checkpoint.state is None:
+            with stage("delta"):
+                load_cve_delta(feeds=feeds, quarantine=quarantine)
+            # El estado del delta avanza igualmente (el deltaLog solo cubre unos días): los CVEs
+            # invalidados los recarga el siguiente delta que los incluya o la próxima carga del ZIP
+            invalidate_rejected_cves(quarantine, offset)
+            return
+
+        if not (checkpoint.parsed and checkpoint.state == "failed"):
+            with stage("descarga"):
+                feed = feeds.fetch(URL)
+            # Solo si la última carga terminó bien: una carga cortada hay que completarla aunque el ZIP no cambie
+            if SKIP_UNCHANGED_FEED and not feed.changed and checkpoint.state is None:
+                print("✅ cvelistV5 no ha cambiado desde la última carga. No hay nada que cargar.")
+                # Por si el checkpoint reanudado dejó filas en cuarentena
+                invalidate_rejected_cves(quarantine, offset)
+                return
+
+        known_state = None
+        known_containers = None
+        if INCREMENTAL_SYNC:
+            known_state = load_known_state()
+            known_containers = known_state[1]
+            if checkpoint.state == "running":
+                # Corte brusco: los buffers sin volcar se perdieron y hay CVEs a medias en la BBDD. Sin hashes,
+                # todos los contenedores cuentan como modificados; los ID siguen sirviendo para los ADP retirados
+                print("⚠️ La carga anterior se interrumpió sin guardar sus buffers. Se recargan todos los CVEs.")
+                known_state = ({}, dict.fromkeys(known_containers))
+
+        if feed is None:
+            # Todas las filas de la ejecución anterior estaban ya en el checkpoint
+            records = []
         else:
-            zip_path = download_extract_cve_data(URL, EXTRACT_DIR)
-            print("🔄 Descomprimiendo datos...")
-            cve_files = process_zip_and_find_json(zip_path, EXTRACT_DIR)
-            print(f"✅ {len(cve_files)} archivos encontrados.")
-
-            # Procesar archivos en paralelo
-            cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2 = process_files_in_parallel(cve_files)
+            with stage("descompresión"):
+                zip_path, cve_files = find_cve_files(feed.path)
+            zip_path = zip_path if STREAM_FROM_ZIP else None
+            # Parseo y carga en paralelo: los lotes se insertan mientras los workers siguen parseando
+            records = None if WORKER_WRITES else iter_transformed_records(cve_files, zip_path=zip_path, known_state=known_state)
 
+        checkpoint.set_state("running")
         print("🚀 Cargando datos a la base de datos...")
-        load_cve_data(cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2)
-
-        # Eliminar el archivo temporal después de una carga exitosa
-        if os.path.exists(TEMP_FILE):
-            #os.remove(temp_file)
-            print(f"🗑️ Archivo temporal {TEMP_FILE} eliminado.")
+        # Índices y FK al final solo si no hay contenedores que borrar: los DELETE de los hijos necesitan los
+        # índices y, sin foreign_key_checks, sus ON DELETE CASCADE (métricas, CPE_Node, Taxonomy_Relations) no saltan
+        defer = DEFER_CHECKS and not known_containers
+        with stage("parseo y carga"), deferred_checks(connect_db_cve, "cve", CVE_SCHEMA, enabled=defer):
+            if records is None:
+                # Sin checkpoint: si falla, el estado queda en "running" y la próxima ejecución recarga todos los CVEs
+                load_cve_data_in_workers(cve_files, zip_path=zip_path, known_state=known_state,
+                                         known_containers=known_containers, bulk=BULK_LOAD, checks=not defer)
+            else:
+                load_cve_data(records, batch_size=batch_size, known_containers=known_containers, bulk=BULK_LOAD,
+                              checkpoint=checkpoint, checks=not defer, quarantine=quarantine)
+        checkpoint.clear()
+        finish_cve_load(feeds, feed, quarantine, offset)
 
     except Exception as e:
         print("❌ Error en la carga de datos:", e)
-        # Guardar los datos procesados en un archivo temporal
-        save_processed_data(TEMP_FILE, (cves, containers, cna_table, adp_table, provider_metadata, timelines, descriptions, descriptions_supporting_media, references, problem_types, problem_types_descriptions, problem_types_descriptions_refs, credits_cve, affected_products, affected_products_cpe, affected_products_platforms, affected_products_modules, affected_products_program_files, affected_products_versions, affected_products_program_routines, configurations, workarounds, solutions, exploits, impacts, impact_descriptions, taxonomy_mappings, taxonomy_relations, tags, cpe_applicability, cpe_nodes, cpe_match, metrics, metrics_scenarios, metrics_cvssv4, metrics_cvssv3_1, metrics_cvssv3, metrics_cvssv2))
-        print(f"♻️ Datos procesados guardados en {TEMP_FILE}. Puedes recuperarlos más tarde.")
+        if checkpoint.pending_count():
+            print(f"♻️ {checkpoint.pending_count()} lotes pendientes guardados en {CHECKPOINT_DIR}. Se reanudarán en la próxima ejecución.")
+        # Código de salida distinto de 0 para que run_all_etls marque la ETL como fallida
+        sys.exit(1)
 
     finally:
+        quarantine.report()
         print("📄 ETL de CVEs finalizado.")
-        clean_files(ZIP_PATH, EXTRACT_DIR)
+        clean_files(EXTRACT_DIR)
 
 if __name__ == "__main__":
     main()
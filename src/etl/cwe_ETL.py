@@ -1,13 +1,34 @@
-import io
 import re
-import requests
-import zipfile
-import os
+import sys
+import threading
 import xml.etree.ElementTree as ET
 from src.config.db_config import connect_db_cwe, create_db, DB_CWE
+from src.etl.text_utils import escape_characters, extract_all_text_from_element
+from src.etl.integrity import deferred_checks, set_session_checks
+from src.etl.batching import AdaptiveBatcher, max_allowed_packet
+from src.etl.batch_executor import Quarantine, execute_batch, register_session_init
+from src.etl.download import FeedCache, open_zip_member
+from src.etl.bulk_load import parse_upsert
+from src.etl.parallel_loader import borrow, connection_pool, run_in_dependency_order
+from src.etl.pipeline import db_connections, stage
+from src.etl.schema import load_schema_dependencies
+from src.etl.catalog_state import (delete_entries, diff_entries, ensure_catalog_tables, entry_hash, is_same_catalog,
+                                   load_catalog_state, load_entry_hashes, read_catalog_version, rejected_entries,
+                                   save_catalog_state, RETRY_HASH)
 import hashlib
 
 URL = 'https://cwe.mitre.org/data/xml/cwec_latest.xml.zip'
+CWE_SCHEMA = 'BBDD/CWE_BBDD.sql'
+# Quitar índices y comprobaciones de FK/UNIQUE durante la carga; reconstruir y validar al final
+DEFER_CHECKS = True
+# Filas que el servidor rechaza, para revisarlas sin abortar la carga
+QUARANTINE_PATH = 'quarantine/cwe.jsonl'
+# No hacer nada si el feed, o su Version y Date, son los de la última carga correcta (ver src/etl/catalog_state.py)
+SKIP_UNCHANGED_FEED = True
+# Nombre del catálogo en Catalog_Metadata y Catalog_Entries
+CATALOG = 'cwe'
+# Conexiones con las que se cargan en paralelo las tablas cuyos padres ya están confirmados
+LOAD_WORKERS = db_connections(4)
 
 # Define namespaces
 namespaces = {
@@ -16,56 +37,6 @@ namespaces = {
     'xhtml': 'http://www.w3.org/1999/xhtml'
 }
 
-def escape_characters(value):
-    if not value or str(value).strip() == "":
-        return None
-    if isinstance(value, str):
-        value = value.replace("'", "’").replace('"', "”")  # Reemplaza comillas
-        value = re.sub(r"[\x00-\x1F\x7F]", "", value)  # Elimina caracteres de control
-        return value.strip()
-    return str(value)
-
-def download_extract_cwe_data(url, nombre_salida='cwe.xml', destino='.'):
-    """
-    Descarga un ZIP desde una URL, extrae el archivo XML y lo guarda como 'cwe.xml'.
-
-    Parámetros:
-    url (str): URL del archivo ZIP a descargar.
-    nombre_salida (str): Nombre con el que se guardará el archivo XML extraído.
-    destino (str): Carpeta destino donde se guardará el archivo.
-
-    Retorna:
-    str: Ruta al archivo extraído o None si ocurre un error.
-    """
-    try:
-        # Descargar el ZIP
-        print(f"Descargando desde {url}...")
-        response = requests.get(url)
-        response.raise_for_status()
-
-        # Abrir el ZIP desde memoria
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-            # Buscar archivo XML
-            archivo_xml = next((name for name in zip_ref.namelist() if name.endswith('.xml')), None)
-
-            if archivo_xml:
-                # Extraer y renombrar
-                zip_ref.extract(archivo_xml, destino)
-                ruta_original = os.path.join(destino, archivo_xml)
-                ruta_final = os.path.join(destino, nombre_salida)
-                # Eliminar el archivo de destino si ya existe
-                if os.path.exists(ruta_final):
-                    os.remove(ruta_final)
-                os.rename(ruta_original, ruta_final)
-                print(f"Archivo XML extraído como: {ruta_final}")
-                return ruta_final
-            else:
-                print("No se encontró ningún archivo XML en el ZIP.")
-                return None
-    except Exception as e:
-        print(f"Error al descargar o extraer: {e}")
-        return None
-
 def check_or_create_cwe_db():
     conn = create_db()
     cursor = conn.cursor()
@@ -131,404 +102,641 @@ def check_or_create_cwe_db():
         else:
             print("✅ Todas las tablas necesarias ya existen en {DB_CWE}. Continuando con el proceso de ETL...")
 
-def extract_all_text_from_element(elem):
-    if elem is not None:
-        if isinstance(elem, list):
-            text = ';'.join(e.text for e in elem if e.text is not None)
-        elif hasattr(elem, 'itertext'):
-            text = ';'.join(elem.itertext())
-        else:
-            text = elem
-    else:
-        text = ""
-    return text.strip()
-
 def generate_hash(object):
     return hashlib.md5(object.encode()).hexdigest()
 
-def transform_cwe_data(root):
-    # Extract CWE items
-    cwe_items = []
-    references = []
-    external_references = []
-    capec_references = []
-    references_externals_table = []
-
-    # Extract Aplicable_Platforms
-    languages = []
-    architectures = []
-    technologies = []
-    operating_systems = []
-
-    # Extract Potential_Mitigations
-    mitigations = []
-
-    # Extract Alternate_Terms
-    alternate_terms = []
-
-    # Extract Modes_Of_Introduction
-    modes_of_introduction = []
-
-    # RElated_WEAKNESSES
-    related_weaknesses = []
-
-    # Extract Detection_Methods
-    detection_methods = []
-
-    # Extract observed examples
-    observed_examples = []
-
-    # Extract Common Consequences
-    consequences = []
-
-    # Extract Background_Details
-    backgroun_details = []
-
-    # Extract Notes
-    notes = []
-
-    # Extract Usage Details
-    mapping_notes = []
-
-    # Extract mapping_suggestions
-    mapping_suggestions = []
-
-    # Extract Functional_Areas
-    functional_areas = []
-
-    # Extract Affected Resources
-    affected_resources = []
-
-    weakness_ordinalities = []
-    taxonomy_mapping = []
-    demostrative_examples = []
-
-    # Extract WEAKNESS nodes
-    weakness_nodes = root.findall('.//Weakness', namespaces)
-    for weakness in weakness_nodes:
-        weakness_id = weakness.get('ID')
-        weakness_name = weakness.get('Name')
-        weakness_abstraction = weakness.get('Abstraction')
-        weakness_structure = weakness.get('Structure')
-        weakness_status = weakness.get('Status')
-        
-        weakness_description = weakness.find('Description', namespaces).text if weakness.find('Description', namespaces) is not None else None
-
-        # Extract extended description
-        extended_description_elem = weakness.find('Extended_Description', namespaces)
-        extended_description = extract_all_text_from_element(extended_description_elem)
-
-        likelihood_of_exploit = weakness.find('Likelihood_Of_Exploit', namespaces).text if weakness.find('Likelihood_Of_Exploit', namespaces) is not None else None
-        # Ensure likelihood_of_exploit value is valid
-        valid_likelihoods = {'Low', 'Medium', 'High', 'Unknown'}
-        if likelihood_of_exploit not in valid_likelihoods:
-            likelihood_of_exploit = 'Unknown'
-        
-        diagram = weakness.get('Diagram')
-        
-        # Extract references within weaknesses
-        references = weakness.findall('References/Reference', namespaces)
-        for reference in references:
-            external_reference_id = reference.get('External_Reference_ID')
-            section = reference.get('Section')
-            references_externals_table.append((weakness_id, external_reference_id, section))
-
-        # Extract related attack patterns within weaknesses
-        related_attack_patterns = weakness.findall('Related_Attack_Patterns/Related_Attack_Pattern', namespaces)
-        for attack_pattern in related_attack_patterns:
-            capec_id = attack_pattern.get('CAPEC_ID')
-            capec_references.append((weakness_id, capec_id))
-
-        # Extract Applicable_Platforms
-        platforms = weakness.findall('.//Applicable_Platforms', namespaces)
-        valid_prevalences = {'Often', 'Sometimes', 'Rarely', 'Undetermined'}
-        for idx_platform, platform in enumerate(platforms):
-            for idx_language, language in enumerate(platform.findall('Language', namespaces)):
-                language_name = language.get('Name')
-                language_class = language.get('Class')
-                language_prevalence = language.get('Prevalence')
-                if language_prevalence not in valid_prevalences:
-                    language_prevalence = 'Undetermined'
-        
-                #hashear el objeto y guardarlo como ID para evitar duplicados
-                
-                language_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_language}")
-
-                languages.append((language_hash_id, weakness_id, language_name, language_class, language_prevalence))
-            for idx_architecture, architecture in enumerate(platform.findall('Architecture', namespaces)):
-                architecture_name = architecture.get('Name')
-                architecture_class = architecture.get('Class')
-                architecture_prevalence = architecture.get('Prevalence')
-                if architecture_prevalence not in valid_prevalences:
-                    architecture_prevalence = 'Undetermined'
-                
-                #hashear el objeto y guardarlo como ID para evitar duplicados
-                architecture_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_architecture}")
-                architectures.append((architecture_hash_id, weakness_id, architecture_name, architecture_class, architecture_prevalence))            
-            for idx_technology, technology in enumerate(platform.findall('Technology', namespaces)):
-                technology_name = technology.get('Name')
-                technology_class = technology.get('Class')
-                technology_prevalence = technology.get('Prevalence')
-                if technology_prevalence not in valid_prevalences:
-                    technology_prevalence = 'Undetermined'
-                
-                technology_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_technology}")
-                technologies.append((technology_hash_id, weakness_id, technology_name, technology_class, technology_prevalence))
-            for idx_operating_system, operating_system in enumerate(platform.findall('Operating_System', namespaces)):
-                operating_system_name = operating_system.get('Name')
-                operating_system_class = operating_system.get('Class')
-                operating_system_prevalence = operating_system.get('Prevalence')
-                if operating_system_prevalence not in valid_prevalences:
-                    operating_system_prevalence = 'Undetermined'
-                operating_system_cpeID = operating_system.get('CPE_ID')
-                operating_system_version = operating_system.get('Version')
-                
-                operating_system_hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx_operating_system}")
-                operating_systems.append((operating_system_hash_id, weakness_id, operating_system_name, operating_system_class, operating_system_cpeID, operating_system_version, operating_system_prevalence))
- 
-        # Extract Potential_Mitigations
-        mitigations_container = weakness.findall('.//Potential_Mitigations/Mitigation', namespaces)
-        for idx_mitigation, mitigation in enumerate(mitigations_container):
-            mitigation_id = mitigation.get('Mitigation_ID')
-
-            # Extract mitigation_description
-            mitigation_description_elem = mitigation.find('Description', namespaces)
-            mitigation_description = extract_all_text_from_element(mitigation_description_elem)
-
-            phase = mitigation.find('Phase', namespaces).text if mitigation.find('Phase', namespaces) is not None else None
-            strategy = mitigation.find('Strategy', namespaces).text if mitigation.find('Strategy', namespaces) is not None else None
-            # Extract effectiveness
-            effectiveness = mitigation.find('Effectiveness', namespaces).text if mitigation.find('Effectiveness', namespaces) is not None else None
-            valid_effectiveness = {'High', 'Moderate', 'Limited', 'Incidental', 'Discouraged Common Practice', 'Defense in Depth', 'None'}
-            if effectiveness not in valid_effectiveness:
-                effectiveness = None 
-            
-            # Extract effectiveness_notes
-            effectiveness_notes_el = mitigation.find('Effectiveness_Notes', namespaces)
-            effectiveness_notes = extract_all_text_from_element(effectiveness_notes_el)
-
-            # Hashear el objeto y guardarlo como ID para evitar duplicados
-            mitigation_hash_id = generate_hash(f"{weakness_id}_{idx_mitigation}")
-            
-            mitigations.append((mitigation_hash_id, weakness_id, mitigation_id, mitigation_description, phase, strategy, effectiveness, effectiveness_notes))
-
-        # Extract Alternate terms
-        alternate_terms_container = weakness.findall('.//Alternate_Terms/Alternate_Term', namespaces)
-        for idx_term, term in enumerate(alternate_terms_container):
-            term_name = term.find('Term', namespaces).text if term.find('Term', namespaces) is not None else None
-            term_description_elem = term.find('Description', namespaces)
-            term_description = extract_all_text_from_element(term_description_elem)
-            term_id = generate_hash(f"{weakness_id}_{idx_term}")
-            alternate_terms.append((term_id, weakness_id, term_name, term_description))
-
-        # Extract Modes_Of_Introduction
-        modes_of_introduction_container = weakness.findall('.//Modes_Of_Introduction/Introduction', namespaces)
-        for idx, introduction in enumerate(modes_of_introduction_container):
-            introduction_phase = introduction.find('Phase', namespaces).text if introduction.find('Phase', namespaces) is not None else None
-            introduction_description_elem = introduction.find('Note', namespaces)
-            introduction_note = extract_all_text_from_element(introduction_description_elem)
-            introduction_id = generate_hash(f"{weakness_id}_{idx}")
-            modes_of_introduction.append((introduction_id, weakness_id, introduction_phase, introduction_note))
-
-        # Extract Related_Weaknesses
-        related_weaknesses_container = weakness.findall('.//Related_Weaknesses/Related_Weakness', namespaces)
-        for related_weakness in related_weaknesses_container:
-            related_nature = related_weakness.get('Nature')
-            related_weakness_id = related_weakness.get('CWE_ID')
-            related_view = related_weakness.get('View_ID')
-            related_chain = related_weakness.get('Chain_ID')
-            related_ordinal = related_weakness.get('Ordinal')
-            related_weaknesses.append((weakness_id, related_nature, related_weakness_id, related_view, related_chain, related_ordinal))
-
-        # Extract Detection_Methods
-        detection_methods_container = weakness.findall('.//Detection_Methods/Detection_Method', namespaces)
-        for idx_detection, detection_method in enumerate(detection_methods_container):
-            detection_method_id = detection_method.get('Detection_Method_ID')
-            detection_method_name = detection_method.find('Method', namespaces).text if detection_method.find('Method', namespaces) is not None else None
-            detection_method_description_elem = detection_method.find('Description', namespaces) if detection_method.find('Description', namespaces) is not None else None
-            detection_method_description = extract_all_text_from_element(detection_method_description_elem)
-            
-            detection_effectiveness = detection_method.find('Effectiveness', namespaces).text if detection_method.find('Effectiveness', namespaces) is not None else None
-            valid_effectiveness = {'High', 'Moderate', 'SOAR Partial', 'Opportunistic', 'Limited', 'None'}
-            if detection_effectiveness not in valid_effectiveness:
-                detection_effectiveness = None
-            detection_effectiveness_notes_el = detection_method.find('Effectiveness_Notes', namespaces) if detection_method.find('Effectiveness_Notes', namespaces) is not None else None
-            detection_effectiveness_notes = extract_all_text_from_element(detection_effectiveness_notes_el)
-
-            detection_method_hash_id = generate_hash(f"{weakness_id}_{idx_detection}")
-
-            detection_methods.append((detection_method_hash_id, weakness_id, detection_method_id, detection_method_name, detection_method_description, detection_effectiveness, detection_effectiveness_notes))
-
-        # Extract Observed_Examples
-        observed_examples_container = weakness.findall('.//Observed_Examples/Observed_Example', namespaces)
-        for example in observed_examples_container:
-            example_id = example.find('Reference', namespaces).text
-            example_description_elem = example.find('Description', namespaces)
-            example_description = extract_all_text_from_element(example_description_elem)
-            example_url = example.find('Link', namespaces).text if example.find('Link', namespaces) is not None else None
-            observed_examples.append((weakness_id, example_id, example_description, example_url))
-        
-        # Extract Common Consequences
-        consequences_container = weakness.findall('.//Common_Consequences/Consequence', namespaces)
-        for idx_consequence, consequence in enumerate(consequences_container):
-            consequence_id = consequence.get('Consequence_ID') if consequence.get('Consequence_ID') is not None else None
-            consequence_scope = consequence.find('Scope', namespaces).text if consequence.find('Scope', namespaces) is not None else None
-            valid_scopes = {'Confidentiality', 'Integrity', 'Availability', 'Access Control', 'Accountability', 'Authentication', 'Authorization', 'Non-Repudiation', 'Other'}
-            if consequence_scope not in valid_scopes:
-                consequence_scope = 'Other'  # or handle appropriately
-
-            consequence_impact = consequence.find('Impact', namespaces).text if consequence.find('Impact', namespaces) is not None else None
-            consequence_likelihood = consequence.find('Likelihood', namespaces).text if consequence.find('Likelihood', namespaces) is not None else None
-            valid_likelihoods = {'Low', 'Medium', 'High', 'Unknown'}
-            if consequence_likelihood not in valid_likelihoods:
-                consequence_likelihood = 'Unknown'
-            consequence_note_elem = consequence.find('Note', namespaces)
-            consequence_note = extract_all_text_from_element(consequence_note_elem)
-            consequence_hash_id = generate_hash(f"{weakness_id}_{idx_consequence}")
-            consequences.append((consequence_hash_id, weakness_id, consequence_id, consequence_scope, consequence_impact, consequence_likelihood, consequence_note))
-
-        # Extract Background_Details
-        background_details_container = weakness.findall('.//Background_Details/Background_Detail', namespaces)
-        for idx_back, background_detail in enumerate(background_details_container):
-            back_id = generate_hash(f"{weakness_id}_{idx_back}")
-            background_detail_text = extract_all_text_from_element(background_detail)
-            backgroun_details.append((back_id, weakness_id, background_detail_text))
-
-        # Extract Notes
-        notes_container = weakness.findall('.//Notes/Note', namespaces)
-        for idx_note, note in enumerate(notes_container):
-            note_type = note.get('Type')
-            note_text = extract_all_text_from_element(note)
-            note_id = generate_hash(f"{weakness_id}_{idx_note}")
-            notes.append((note_id, weakness_id, note_type, note_text))
-
-        # Extract Mapping_Notes
-        mapping_notes_container = weakness.findall('.//Mapping_Notes', namespaces)
-        for mapping_note in mapping_notes_container:
-            mapping_usage = mapping_note.find('Usage', namespaces).text if mapping_note.find('Usage', namespaces) is not None else None
-            valid_usages = {'Discouraged', 'Prohibited', 'Allowed', 'Allowed-with-Review'}
-            if mapping_usage not in valid_usages:
-                mapping_usage = None  # or handle appropriately
-
-            mapping_rationale_elem = mapping_note.find('Rationale', namespaces)
-            mapping_rationale_text = extract_all_text_from_element(mapping_rationale_elem)
-
-            mapping_comment_elem = mapping_note.find('Comments', namespaces)
-            mapping_comment_text = extract_all_text_from_element(mapping_comment_elem)
-
-            # Join all reasons by commas
-            mapping_reasons_container = mapping_note.findall('.//Reasons/Reason', namespaces)
-            mapping_reasons_text = ', '.join(str(reason.get('Type') or '') for reason in mapping_reasons_container)
-            
-            # Create a hash of the object
-            hash_object = f"{weakness_id}{mapping_usage}{mapping_rationale_text}{mapping_comment_text}{mapping_reasons_text}"
-            mapping_note_id = hashlib.md5(hash_object.encode()).hexdigest()
-            
-            # Extract Suggestions
-            suggestions_container = mapping_note.findall('.//Suggestions/Suggestion', namespaces)
-            for suggestion in suggestions_container:
-                suggestion_cwe_id = suggestion.get('CWE_ID')
-                suggestion_comment = suggestion.get('Comment')
-                mapping_suggestions.append((mapping_note_id, suggestion_cwe_id, suggestion_comment))
-           
-            # Append the mapping_note_id to the mapping_notes tuple
-            mapping_notes.append((mapping_note_id, weakness_id, mapping_usage, mapping_rationale_text, mapping_comment_text, mapping_reasons_text))
-
-        # Extract Functional_Areas
-        functional_areas_container = weakness.findall('.//Functional_Areas/Functional_Area', namespaces)
-        for functional_area in functional_areas_container:
-            functional_areas.append((weakness_id, functional_area.text))
-
-        # Extract Affected_Resources
-        affected_resources_container = weakness.findall('.//Affected_Resources/Affected_Resource', namespaces)
-        for affected_resource in affected_resources_container:
-            affected_resource_resource = affected_resource.text
-            valid_affected_resource = {'CPU', 'File or Directory', 'Memory', 'System Process', 'Other'}
-            if affected_resource_resource not in valid_affected_resource:
-                affected_resource_resource = 'Other'
-            affected_resources.append((weakness_id, affected_resource_resource))
-
-        # Extract Weakness_Ordinalities
-        weakness_ordinalities_container = weakness.findall('.//Weakness_Ordinalities/Weakness_Ordinality', namespaces)
-        for ordinality in weakness_ordinalities_container:
-            ordinality_name = ordinality.find('Ordinality', namespaces).text
-            valid_ordinalities = {'Indirect', 'Primary', 'Resultant'}
-            if ordinality_name not in valid_ordinalities:
-                ordinality_name = None  # or handle appropriately
-            ordinality_description = ordinality.find('Description', namespaces).text if ordinality.find('Description', namespaces) is not None else None
-            weakness_ordinalities.append((weakness_id, ordinality_name, ordinality_description))
-        
-        # Extract Taxonomy_Mappings
-        taxonomy_mappings_container = weakness.findall('.//Taxonomy_Mappings/Taxonomy_Mapping', namespaces)
-        for mapping in taxonomy_mappings_container:
-            mapping_name = mapping.get('Taxonomy_Name')
-            mapping_entry_id = mapping.find('Entry_ID', namespaces).text if mapping.find('Entry_ID', namespaces) is not None else None
-            mapping_entry_name_elem = mapping.find('Entry_Name', namespaces)
-            mapping_entry_name = extract_all_text_from_element(mapping_entry_name_elem)
-            
-            mapping_fit_elem = mapping.find('Mapping_Fit', namespaces)
-            mapping_fit = mapping_fit_elem.text if mapping_fit_elem is not None else None
-            valid_mapping_fits = {'Exact', 'CWE More Abstract', 'CWE More Specific', 'Imprecise', 'Perspective'}
-            if mapping_fit not in valid_mapping_fits:
-                mapping_fit = None  # Evita errores por valores inválidos
-
-
-            taxonomy_mapping.append((weakness_id, mapping_name, mapping_entry_id, mapping_entry_name, mapping_fit))
-
-        # Extract Demonstrative_Examples
-        demostrative_examples_container = weakness.findall('.//Demonstrative_Examples/Demonstrative_Example', namespaces)
-        for idx_demostrative_example, demostrative_example in enumerate(demostrative_examples_container):
-            demostrative_example_hash = generate_hash(f"{weakness_id}_{idx_demostrative_example}")
-            demostrative_example_id = demostrative_example.get('Demonstrative_Example_ID')
-            demostrative_example_tittle = demostrative_example.find('Title_Text', namespaces).text if demostrative_example.find('Title_Text', namespaces) is not None else ''
-            demostrative_example_intro_elem = demostrative_example.find('Intro_Text', namespaces)
-            demostrative_example_intro = extract_all_text_from_element(demostrative_example_intro_elem)
-
-            demostrative_example_body_elem = demostrative_example.findall('Body_Text', namespaces)
-            demostrative_example_body = extract_all_text_from_element(demostrative_example_body_elem)
-
-            demostrative_example_code_elem = demostrative_example.findall('Example_Code', namespaces)
-            demostrative_example_code = extract_all_text_from_element(demostrative_example_code_elem)
-
-            demostrative_examples_references_elem = demostrative_example.findall('References', namespaces)
-            demostrative_examples_references = extract_all_text_from_element(demostrative_examples_references_elem)
-
-            demostrative_examples.append((demostrative_example_hash, weakness_id, demostrative_example_id, demostrative_example_tittle, demostrative_example_intro, demostrative_example_body, demostrative_example_code, demostrative_examples_references))
-
-        cwe_items.append((weakness_id, weakness_name, weakness_description, extended_description, weakness_structure, weakness_abstraction, weakness_status, likelihood_of_exploit, diagram))
+# Prefijo de las etiquetas del espacio de nombres de CWE
+CWE_NS = '{%s}' % namespaces['']
+
+VALID_LIKELIHOODS = {'Low', 'Medium', 'High', 'Unknown'}
+VALID_PREVALENCES = {'Often', 'Sometimes', 'Rarely', 'Undetermined'}
+VALID_MITIGATION_EFFECTIVENESS = {'High', 'Moderate', 'Limited', 'Incidental', 'Discouraged Common Practice', 'Defense in Depth', 'None'}
+VALID_DETECTION_EFFECTIVENESS = {'High', 'Moderate', 'SOAR Partial', 'Opportunistic', 'Limited', 'None'}
+VALID_SCOPES = {'Confidentiality', 'Integrity', 'Availability', 'Access Control', 'Accountability', 'Authentication', 'Authorization', 'Non-Repudiation', 'Other'}
+VALID_USAGES = {'Discouraged', 'Prohibited', 'Allowed', 'Allowed-with-Review'}
+VALID_AFFECTED_RESOURCES = {'CPU', 'File or Directory', 'Memory', 'System Process', 'Other'}
+VALID_ORDINALITIES = {'Indirect', 'Primary', 'Resultant'}
+VALID_MAPPING_FITS = {'Exact', 'CWE More Abstract', 'CWE More Specific', 'Imprecise', 'Perspective'}
+
+def group_children(elem):
+    """Hijos de elem del espacio de nombres de CWE agrupados por etiqueta (sin prefijo), en orden del documento."""
+    groups = {}
+    for child in elem:
+        tag = child.tag
+        if tag.startswith(CWE_NS):
+            groups.setdefault(tag[len(CWE_NS):], []).append(child)
+    return groups
+
+def first(groups, name):
+    """Primer hijo name, como elem.find(name)."""
+    elems = groups.get(name)
+    return elems[0] if elems else None
+
+def child_text(groups, name, default=None):
+    elem = first(groups, name)
+    return elem.text if elem is not None else default
+
+def section_items(sections, name):
+    """Hijos name de todas las secciones, en orden del documento (como findall('.//Seccion/name'))."""
+    tag = CWE_NS + name
+    for section in sections:
+        for elem in section:
+            if elem.tag == tag:
+                yield elem
+
+def extract_references(weakness_id, sections, rows):
+    for reference in section_items(sections, 'Reference'):
+        rows['references_externals_table'].append((weakness_id, reference.get('External_Reference_ID'), reference.get('Section')))
+
+def extract_attack_patterns(weakness_id, sections, rows):
+    for attack_pattern in section_items(sections, 'Related_Attack_Pattern'):
+        rows['capec_references'].append((weakness_id, attack_pattern.get('CAPEC_ID')))
+
+# Tabla de cada tipo de plataforma de Applicable_Platforms
+PLATFORM_TABLES = {
+    CWE_NS + 'Language': 'languages',
+    CWE_NS + 'Architecture': 'architectures',
+    CWE_NS + 'Technology': 'technologies',
+    CWE_NS + 'Operating_System': 'operating_systems',
+}
+
+def extract_platforms(weakness_id, sections, rows):
+    for idx_platform, platform in enumerate(sections):
+        # Índice de cada tipo de plataforma dentro de Applicable_Platforms
+        counters = {}
+        for elem in platform:
+            table = PLATFORM_TABLES.get(elem.tag)
+            if table is None:
+                continue
+            idx = counters.get(table, 0)
+            counters[table] = idx + 1
+            prevalence = elem.get('Prevalence')
+            if prevalence not in VALID_PREVALENCES:
+                prevalence = 'Undetermined'
+            #hashear el objeto y guardarlo como ID para evitar duplicados
+            hash_id = generate_hash(f"{weakness_id}_{idx_platform}_{idx}")
+            if table == 'operating_systems':
+                rows[table].append((hash_id, weakness_id, elem.get('Name'), elem.get('Class'), elem.get('CPE_ID'), elem.get('Version'), prevalence))
+            else:
+                rows[table].append((hash_id, weakness_id, elem.get('Name'), elem.get('Class'), prevalence))
+
+def extract_mitigations(weakness_id, sections, rows):
+    for idx_mitigation, mitigation in enumerate(section_items(sections, 'Mitigation')):
+        fields = group_children(mitigation)
+        effectiveness = child_text(fields, 'Effectiveness')
+        if effectiveness not in VALID_MITIGATION_EFFECTIVENESS:
+            effectiveness = None
+        # Hashear el objeto y guardarlo como ID para evitar duplicados
+        mitigation_hash_id = generate_hash(f"{weakness_id}_{idx_mitigation}")
+        rows['mitigations'].append((
+            mitigation_hash_id, weakness_id, mitigation.get('Mitigation_ID'),
+            extract_all_text_from_element(first(fields, 'Description')),
+            child_text(fields, 'Phase'), child_text(fields, 'Strategy'), effectiveness,
+            extract_all_text_from_element(first(fields, 'Effectiveness_Notes')),
+        ))
+
+def extract_alternate_terms(weakness_id, sections, rows):
+    for idx_term, term in enumerate(section_items(sections, 'Alternate_Term')):
+        fields = group_children(term)
+        term_id = generate_hash(f"{weakness_id}_{idx_term}")
+        rows['alternate_terms'].append((term_id, weakness_id, child_text(fields, 'Term'), extract_all_text_from_element(first(fields, 'Description'))))
+
+def extract_modes_of_introduction(weakness_id, sections, rows):
+    for idx, introduction in enumerate(section_items(sections, 'Introduction')):
+        fields = group_children(introduction)
+        introduction_id = generate_hash(f"{weakness_id}_{idx}")
+        rows['modes_of_introduction'].append((introduction_id, weakness_id, child_text(fields, 'Phase'), extract_all_text_from_element(first(fields, 'Note'))))
+
+def extract_related_weaknesses(weakness_id, sections, rows):
+    for related in section_items(sections, 'Related_Weakness'):
+        rows['related_weaknesses'].append((weakness_id, related.get('Nature'), related.get('CWE_ID'), related.get('View_ID'), related.get('Chain_ID'), related.get('Ordinal')))
+
+def extract_detection_methods(weakness_id, sections, rows):
+    for idx_detection, detection_method in enumerate(section_items(sections, 'Detection_Method')):
+        fields = group_children(detection_method)
+        effectiveness = child_text(fields, 'Effectiveness')
+        if effectiveness not in VALID_DETECTION_EFFECTIVENESS:
+            effectiveness = None
+        detection_method_hash_id = generate_hash(f"{weakness_id}_{idx_detection}")
+        rows['detection_methods'].append((
+            detection_method_hash_id, weakness_id, detection_method.get('Detection_Method_ID'), child_text(fields, 'Method'),
+            extract_all_text_from_element(first(fields, 'Description')), effectiveness,
+            extract_all_text_from_element(first(fields, 'Effectiveness_Notes')),
+        ))
+
+def extract_observed_examples(weakness_id, sections, rows):
+    for example in section_items(sections, 'Observed_Example'):
+        fields = group_children(example)
+        rows['observed_examples'].append((weakness_id, fields['Reference'][0].text, extract_all_text_from_element(first(fields, 'Description')), child_text(fields, 'Link')))
+
+def extract_consequences(weakness_id, sections, rows):
+    for idx_consequence, consequence in enumerate(section_items(sections, 'Consequence')):
+        fields = group_children(consequence)
+        # Solo el primer Scope, como hacía find
+        scope = child_text(fields, 'Scope')
+        if scope not in VALID_SCOPES:
+            scope = 'Other'
+        likelihood = child_text(fields, 'Likelihood')
+        if likelihood not in VALID_LIKELIHOODS:
+            likelihood = 'Unknown'
+        consequence_hash_id = generate_hash(f"{weakness_id}_{idx_consequence}")
+        rows['consequences'].append((
+            consequence_hash_id, weakness_id, consequence.get('Consequence_ID'), scope, child_text(fields, 'Impact'),
+            likelihood, extract_all_text_from_element(first(fields, 'Note')),
+        ))
+
+def extract_background_details(weakness_id, sections, rows):
+    for idx_back, background_detail in enumerate(section_items(sections, 'Background_Detail')):
+        back_id = generate_hash(f"{weakness_id}_{idx_back}")
+        rows['backgroun_details'].append((back_id, weakness_id, extract_all_text_from_element(background_detail)))
+
+def extract_notes(weakness_id, sections, rows):
+    for idx_note, note in enumerate(section_items(sections, 'Note')):
+        note_id = generate_hash(f"{weakness_id}_{idx_note}")
+        rows['notes'].append((note_id, weakness_id, note.get('Type'), extract_all_text_from_element(note)))
+
+def extract_mapping_notes(weakness_id, sections, rows):
+    for mapping_note in sections:
+        fields = group_children(mapping_note)
+        usage = child_text(fields, 'Usage')
+        if usage not in VALID_USAGES:
+            usage = None
+        rationale = extract_all_text_from_element(first(fields, 'Rationale'))
+        comments = extract_all_text_from_element(first(fields, 'Comments'))
+        # Join all reasons by commas
+        reasons = ', '.join(str(reason.get('Type') or '') for reason in section_items(fields.get('Reasons', ()), 'Reason'))
+
+        # Create a hash of the object
+        mapping_note_id = hashlib.md5(f"{weakness_id}{usage}{rationale}{comments}{reasons}".encode()).hexdigest()
+        for suggestion in section_items(fields.get('Suggestions', ()), 'Suggestion'):
+            rows['mapping_suggestions'].append((mapping_note_id, suggestion.get('CWE_ID'), suggestion.get('Comment')))
+        rows['mapping_notes'].append((mapping_note_id, weakness_id, usage, rationale, comments, reasons))
+
+def extract_functional_areas(weakness_id, sections, rows):
+    for functional_area in section_items(sections, 'Functional_Area'):
+        rows['functional_areas'].append((weakness_id, functional_area.text))
+
+def extract_affected_resources(weakness_id, sections, rows):
+    for affected_resource in section_items(sections, 'Affected_Resource'):
+        resource = affected_resource.text
+        if resource not in VALID_AFFECTED_RESOURCES:
+            resource = 'Other'
+        rows['affected_resources'].append((weakness_id, resource))
+
+def extract_weakness_ordinalities(weakness_id, sections, rows):
+    for ordinality in section_items(sections, 'Weakness_Ordinality'):
+        fields = group_children(ordinality)
+        ordinality_name = fields['Ordinality'][0].text
+        if ordinality_name not in VALID_ORDINALITIES:
+            ordinality_name = None
+        rows['weakness_ordinalities'].append((weakness_id, ordinality_name, child_text(fields, 'Description')))
+
+def extract_taxonomy_mappings(weakness_id, sections, rows):
+    for mapping in section_items(sections, 'Taxonomy_Mapping'):
+        fields = group_children(mapping)
+        mapping_fit = child_text(fields, 'Mapping_Fit')
+        if mapping_fit not in VALID_MAPPING_FITS:
+            mapping_fit = None  # Evita errores por valores inválidos
+        rows['taxonomy_mapping'].append((weakness_id, mapping.get('Taxonomy_Name'), child_text(fields, 'Entry_ID'), extract_all_text_from_element(first(fields, 'Entry_Name')), mapping_fit))
+
+def extract_demonstrative_examples(weakness_id, sections, rows):
+    for idx_example, example in enumerate(section_items(sections, 'Demonstrative_Example')):
+        fields = group_children(example)
+        example_hash = generate_hash(f"{weakness_id}_{idx_example}")
+        rows['demostrative_examples'].append((
+            example_hash, weakness_id, example.get('Demonstrative_Example_ID'), child_text(fields, 'Title_Text', ''),
+            extract_all_text_from_element(first(fields, 'Intro_Text')),
+            extract_all_text_from_element(fields.get('Body_Text', [])),
+            extract_all_text_from_element(fields.get('Example_Code', [])),
+            extract_all_text_from_element(fields.get('References', [])),
+        ))
+
+# Función que extrae las filas de cada sección (hijo directo) de un Weakness
+WEAKNESS_SECTIONS = {
+    'References': extract_references,
+    'Related_Attack_Patterns': extract_attack_patterns,
+    'Applicable_Platforms': extract_platforms,
+    'Potential_Mitigations': extract_mitigations,
+    'Alternate_Terms': extract_alternate_terms,
+    'Modes_Of_Introduction': extract_modes_of_introduction,
+    'Related_Weaknesses': extract_related_weaknesses,
+    'Detection_Methods': extract_detection_methods,
+    'Observed_Examples': extract_observed_examples,
+    'Common_Consequences': extract_consequences,
+    'Background_Details': extract_background_details,
+    'Notes': extract_notes,
+    'Mapping_Notes': extract_mapping_notes,
+    'Functional_Areas': extract_functional_areas,
+    'Affected_Resources': extract_affected_resources,
+    'Weakness_Ordinalities': extract_weakness_ordinalities,
+    'Taxonomy_Mappings': extract_taxonomy_mappings,
+    'Demonstrative_Examples': extract_demonstrative_examples,
+}
+
+def transform_weakness(weakness, rows):
+    """Recorre una sola vez los hijos de weakness y pasa cada sección a su función de WEAKNESS_SECTIONS."""
+    weakness_id = weakness.get('ID')
+    sections = group_children(weakness)
+    for name, elems in sections.items():
+        handler = WEAKNESS_SECTIONS.get(name)
+        if handler is not None:
+            handler(weakness_id, elems, rows)
+
+    likelihood_of_exploit = child_text(sections, 'Likelihood_Of_Exploit')
+    # Ensure likelihood_of_exploit value is valid
+    if likelihood_of_exploit not in VALID_LIKELIHOODS:
+        likelihood_of_exploit = 'Unknown'
+    rows['cwe_items'].append((
+        weakness_id, weakness.get('Name'), child_text(sections, 'Description'),
+        extract_all_text_from_element(first(sections, 'Extended_Description')),
+        weakness.get('Structure'), weakness.get('Abstraction'), weakness.get('Status'),
+        likelihood_of_exploit, weakness.get('Diagram'),
+    ))
+
+def transform_external_reference(ref):
+    fields = group_children(ref)
+    authors_text = ', '.join(author.text if author.text is not None else '' for author in fields.get('Author', []))
+    publication_month = child_text(fields, 'Publication_Month')
+    if publication_month and publication_month.startswith('--'):
+        publication_month = publication_month[2:]
+    publication_day = child_text(fields, 'Publication_Day')
+    if publication_day and publication_day.startswith('---'):
+        publication_day = publication_day[3:]
+    return (ref.get('Reference_ID'), authors_text, child_text(fields, 'Title'), child_text(fields, 'Edition'),
+            child_text(fields, 'Publication'), child_text(fields, 'Publisher'), child_text(fields, 'Publication_Year'),
+            publication_month, publication_day, child_text(fields, 'URL'), child_text(fields, 'URL_Date'))
+
+def transform_cwe_data(root, weakness_ids=None):
+    """
+    Filas de las tablas de CWE_TABLES, en ese orden, a partir del catálogo CWE.
+    Con weakness_ids, solo las de esos Weakness (las referencias externas se devuelven todas).
+    """
+    rows = {spec['name']: [] for spec in CWE_TABLES}
+    for weakness in root.iterfind('.//Weakness', namespaces):
+        if weakness_ids is None or weakness.get('ID') in weakness_ids:
+            transform_weakness(weakness, rows)
 
     # Extract CWE External references
-    external_references_xml = root.findall('.//External_Reference', namespaces)
-    for ref in external_references_xml:
-        reference_id = ref.get('Reference_ID')
-        authors = [author.text if author.text is not None else '' for author in ref.findall('Author', namespaces)] if ref.findall('Author', namespaces) else []
-        authors_text = ', '.join(authors)
-        title = ref.find('Title', namespaces).text if ref.find('Title', namespaces) is not None else None
-        edition = ref.find('Edition', namespaces).text if ref.find('Edition', namespaces) is not None else None
-        publication = ref.find('Publication', namespaces).text if ref.find('Publication', namespaces) is not None else None
-        publisher = ref.find('Publisher', namespaces).text if ref.find('Publisher', namespaces) is not None else None
-        publication_year = ref.find('Publication_Year', namespaces).text if ref.find('Publication_Year', namespaces) is not None else None
-        publication_month = ref.find('Publication_Month', namespaces).text if ref.find('Publication_Month', namespaces) is not None else None
-        if publication_month and publication_month.startswith('--'):
-            publication_month = publication_month[2:]
-        publication_day = ref.find('Publication_Day', namespaces).text if ref.find('Publication_Day', namespaces) is not None else None
-        if publication_day and publication_day.startswith('---'):
-            publication_day = publication_day[3:]
-        
-        url = ref.find('URL', namespaces).text if ref.find('URL', namespaces) is not None else None
-        url_date = ref.find('URL_Date', namespaces).text if ref.find('URL_Date', namespaces) is not None else None
-        external_references.append((reference_id, authors_text, title, edition, publication, publisher, publication_year, publication_month, publication_day, url, url_date))
-
-    return cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples
-
-def load_data(cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples, batch_size=10000):
-    # Connect to database
+    for ref in root.iterfind('.//External_Reference', namespaces):
+        rows['external_references'].append(transform_external_reference(ref))
+
+    return tuple(rows[spec['name']] for spec in CWE_TABLES)
+
+def weakness_hashes(root):
+    """{ID: hash del XML} de cada Weakness del catálogo."""
+    return {weakness.get('ID'): entry_hash(weakness) for weakness in root.iterfind('.//Weakness', namespaces)}
+
+# Borrado de las filas hijas de los Weakness modificados o retirados (nietos antes que hijos).
+# Weaknesses no se borra en los modificados: las Related_Weaknesses y Mapping_Suggestions de
+# otros Weakness que apuntan a ellos caerían por ON DELETE CASCADE.
+WEAKNESS_CHILDREN_DELETES = [
+    "DELETE s FROM Mapping_Suggestions s JOIN Mapping_Notes m ON s.mapping_notes_id = m.id WHERE m.weakness_id IN ({ids})",
+    "DELETE FROM Mapping_Notes WHERE weakness_id IN ({ids})",
+    "DELETE FROM Alternate_Terms WHERE weakness_id IN ({ids})",
+    "DELETE FROM Demonstrative_Examples WHERE weakness_id IN ({ids})",
+    "DELETE FROM Observed_Examples WHERE weakness_id IN ({ids})",
+    "DELETE FROM Functional_Areas WHERE weakness_id IN ({ids})",
+    "DELETE FROM Common_Consequences WHERE weakness_id IN ({ids})",
+    "DELETE FROM Affected_Resources WHERE weakness_id IN ({ids})",
+    "DELETE FROM Languages WHERE weakness_id IN ({ids})",
+    "DELETE FROM Operating_Systems WHERE weakness_id IN ({ids})",
+    "DELETE FROM Architectures WHERE weakness_id IN ({ids})",
+    "DELETE FROM Technologies WHERE weakness_id IN ({ids})",
+    "DELETE FROM Mitigations WHERE weakness_id IN ({ids})",
+    "DELETE FROM Related_Attack_Patterns WHERE weakness_id IN ({ids})",
+    "DELETE FROM References_External_Table WHERE weakness_id IN ({ids})",
+    "DELETE FROM Related_Weaknesses WHERE weakness_id IN ({ids})",
+    "DELETE FROM Modes_Of_Introduction WHERE weakness_id IN ({ids})",
+    "DELETE FROM Detection_Methods WHERE weakness_id IN ({ids})",
+    "DELETE FROM Background_Details WHERE weakness_id IN ({ids})",
+    "DELETE FROM Notes WHERE weakness_id IN ({ids})",
+    "DELETE FROM Taxonomy_Mapping WHERE weakness_id IN ({ids})",
+    "DELETE FROM Weakness_Ordinalities WHERE weakness_id IN ({ids})",
+]
+
+def escape_notes(rows):
+    # Escapar las comillas del 3 parametro de descriptions
+    return [(row[0], row[1], row[2], escape_characters(row[2])) for row in rows]
+
+# Tablas destino de load_data, en el orden de sus argumentos. prepare transforma las filas antes
+# de insertarlas y row_by_row inserta fila a fila para mostrar el registro que provoca un error.
+CWE_TABLES = [
+    {
+        "name": "cwe_items",
+        "label": "cwe_items",
+        "sql": '''
+            INSERT INTO `weaknesses` (id, name, description, extended_description, structure, abstraction, status, likelihood_of_exploit, diagram)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            name = VALUES(name),
+            description = VALUES(description),
+            extended_description = VALUES(extended_description),
+            structure = VALUES(structure),
+            abstraction = VALUES(abstraction),
+            status = VALUES(status),
+            likelihood_of_exploit = VALUES(likelihood_of_exploit),
+            diagram = VALUES(diagram)
+        ''',
+    },
+    {
+        "name": "external_references",
+        "label": "external_references",
+        "sql": '''
+            INSERT INTO `external_references` (reference_id, author, title, edition, publication, publisher, publication_year, publication_month, publication_day, url, url_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            author = VALUES(author),
+            title = VALUES(title),
+            edition = VALUES(edition),
+            publication = VALUES(publication),
+            publisher = VALUES(publisher),
+            publication_year = VALUES(publication_year),
+            publication_month = VALUES(publication_month),
+            publication_day = VALUES(publication_day),
+            url = VALUES(url),
+            url_date = VALUES(url_date)
+        ''',
+    },
+    {
+        "name": "references_externals_table",
+        "label": "References_External_Table",
+        "sql": '''
+            INSERT INTO `references_external_table` (weakness_id, reference_id, section)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            section = VALUES(section)
+        ''',
+    },
+    {
+        "name": "capec_references",
+        "label": "Related_Attack_Patterns",
+        "sql": '''
+            INSERT IGNORE INTO `related_attack_patterns` (weakness_id, capec_id)
+            VALUES (%s, %s)
+        ''',
+    },
+    {
+        "name": "languages",
+        "label": "Languages",
+        "sql": '''
+            INSERT INTO `languages` (id, weakness_id, name, class, prevalence)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            name = VALUES(name),
+            class = VALUES(class),
+            prevalence = VALUES(prevalence)
+        ''',
+    },
+    {
+        "name": "architectures",
+        "label": "Architectures",
+        "sql": '''
+            INSERT INTO `architectures` (id, weakness_id, name, class, prevalence)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            name = VALUES(name),
+            class = VALUES(class),
+            prevalence = VALUES(prevalence)
+        ''',
+    },
+    {
+        "name": "technologies",
+        "label": "Technologies",
+        "sql": '''
+            INSERT INTO `technologies` (id, weakness_id, name, class, prevalence)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            name = VALUES(name),
+            class = VALUES(class),
+            prevalence = VALUES(prevalence)
+        ''',
+    },
+    {
+        "name": "operating_systems",
+        "label": "Operating Systems",
+        "sql": '''
+            INSERT INTO `operating_systems` (id, weakness_id, name, version, cpe_id, class, prevalence)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            name = VALUES(name),
+            version = VALUES(version),
+            cpe_id = VALUES(cpe_id),
+            class = VALUES(class),
+            prevalence = VALUES(prevalence)
+        ''',
+    },
+    {
+        "name": "mitigations",
+        "label": "Mitigations",
+        "sql": '''
+            INSERT INTO `mitigations` (id, weakness_id, mitigation_id, description, phase, strategy, effectiveness, effectiveness_notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            mitigation_id = VALUES(mitigation_id),
+            description = VALUES(description),
+            phase = VALUES(phase),
+            strategy = VALUES(strategy),
+            effectiveness = VALUES(effectiveness),
+            effectiveness_notes = VALUES(effectiveness_notes)
+        ''',
+    },
+    {
+        "name": "alternate_terms",
+        "label": "Alternate_Terms",
+        "sql": '''
+            INSERT INTO `alternate_terms` (id, weakness_id, term, description)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            description = VALUES(description)
+        ''',
+    },
+    {
+        "name": "modes_of_introduction",
+        "label": "Modes_Of_Introduction",
+        "sql": '''
+            INSERT INTO `modes_of_introduction` (id, weakness_id, phase, note)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            phase = VALUES(phase),
+            note = VALUES(note)
+        ''',
+    },
+    {
+        "name": "related_weaknesses",
+        "label": "Related_Weaknesses",
+        "sql": '''
+            INSERT INTO `related_weaknesses` (weakness_id, nature, related_weakness_id, view_id, chain_id, ordinal)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            nature = VALUES(nature),
+            chain_id = VALUES(chain_id),
+            ordinal = VALUES(ordinal)
+        ''',
+    },
+    {
+        "name": "detection_methods",
+        "label": "Detection_Methods",
+        "sql": '''
+            INSERT INTO `detection_methods` (id, weakness_id, detection_method_id, method, description, effectiveness, effectiveness_notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            detection_method_id = VALUES(detection_method_id),
+            method = VALUES(method),
+            description = VALUES(description),
+            effectiveness = VALUES(effectiveness),
+            effectiveness_notes = VALUES(effectiveness_notes)
+        ''',
+    },
+    {
+        "name": "observed_examples",
+        "label": "Observed_Examples",
+        "sql": '''
+            INSERT INTO `observed_examples` (weakness_id, cve_id, description, url)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            description = VALUES(description),
+            url = VALUES(url)
+        ''',
+    },
+    {
+        "name": "consequences",
+        "label": "Common_Consequences",
+        "sql": '''
+            INSERT INTO `common_consequences` (id, weakness_id, consequence_id, scope, impact, likelihood, note)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            consequence_id = VALUES(consequence_id),
+            scope = VALUES(scope),
+            impact = VALUES(impact),
+            likelihood = VALUES(likelihood),
+            note = VALUES(note)
+        ''',
+    },
+    {
+        "name": "backgroun_details",
+        "label": "Background_Details",
+        "sql": '''
+            INSERT INTO `background_details` (id, weakness_id, detail)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            detail = VALUES(detail)
+        ''',
+    },
+    {
+        "name": "notes",
+        "label": "Notes",
+        "sql": '''
+            INSERT INTO `notes` (id, weakness_id, type, note)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            type = VALUES(type),
+            note = VALUES(note)
+        ''',
+        "prepare": escape_notes,
+    },
+    {
+        "name": "mapping_notes",
+        "label": "Mapping_Notes",
+        "sql": '''
+            INSERT INTO `mapping_notes` (id, weakness_id, uso, rationale, comments, reasons)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            id = VALUES(id),
+            weakness_id = VALUES(weakness_id),
+            uso = VALUES(uso),
+            rationale = VALUES(rationale),
+            comments = VALUES(comments),
+            reasons = VALUES(reasons)
+        ''',
+    },
+    {
+        "name": "mapping_suggestions",
+        "label": "Mapping_Suggestions",
+        "sql": '''
+            INSERT INTO `mapping_suggestions` (mapping_notes_id, cwe_id, comment)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            comment = VALUES(comment)
+        ''',
+    },
+    {
+        "name": "functional_areas",
+        "label": "Functional_Areas",
+        "sql": '''
+            INSERT IGNORE INTO `functional_areas` (weakness_id, area)
+            VALUES (%s, %s)
+        ''',
+    },
+    {
+        "name": "affected_resources",
+        "label": "Affected_Resources",
+        "sql": '''
+            INSERT IGNORE INTO `affected_resources` (weakness_id, affected_resource)
+            VALUES (%s, %s)
+        ''',
+    },
+    {
+        "name": "weakness_ordinalities",
+        "label": "Weakness_Ordinalities",
+        "sql": '''
+            INSERT INTO `weakness_ordinalities` (weakness_id, ordinality, description)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            description = VALUES(description)
+        ''',
+    },
+    {
+        "name": "taxonomy_mapping",
+        "label": "Taxonomy_Mapping",
+        "sql": '''
+            INSERT INTO Taxonomy_Mapping (weakness_id, taxonomy_name, entry_id, entry_name, mapping_fit)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                entry_id = VALUES(entry_id),
+                entry_name = VALUES(entry_name),
+                mapping_fit = VALUES(mapping_fit)
+        ''',
+        "row_by_row": True,
+    },
+    {
+        "name": "demostrative_examples",
+        "label": "Demonstrative_Examples",
+        "sql": '''
+            INSERT INTO `demonstrative_examples` (id, weakness_id, demostrative_id, title, intro, body, code, references_url)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            demostrative_id = VALUES(demostrative_id),
+            title = VALUES(title),
+            intro = VALUES(intro),
+            body = VALUES(body),
+            code = VALUES(code),
+            references_url = VALUES(references_url)
+        ''',
+    },
+]
+
+def cwe_table_parents():
+    """Devuelve {índice en CWE_TABLES: set(índices de sus tablas padre)} a partir de las FK de CWE_BBDD.sql."""
+    schema = load_schema_dependencies(CWE_SCHEMA)
+    index = {parse_upsert(spec["sql"])[1].lower(): idx for idx, spec in enumerate(CWE_TABLES)}
+    return {idx: {index[parent] for parent in schema.get(table, ()) if parent in index} for table, idx in index.items()}
+
+def open_cwe_connection(defer_checks=DEFER_CHECKS):
+    """Abre una conexión de carga (conn, cursor); con defer_checks sin comprobaciones de FK ni UNIQUE."""
     conn = connect_db_cwe()
-    cursor = conn.cursor()
+    if defer_checks:
+        register_session_init(conn, lambda conn: set_session_checks(conn, False))
+    return conn, conn.cursor()
+
+def load_data(cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples, batch_size=10000, quarantine=None, defer_checks=DEFER_CHECKS, workers=LOAD_WORKERS):
+    # Pool de conexiones: cada tabla se carga en cuanto sus padres están confirmados (src/etl/parallel_loader.py)
+    connections = [open_cwe_connection(defer_checks) for _ in range(max(1, workers))]
+    pool = connection_pool(connections)
 
     # Insert data into the tables with progress printing
     total_items = len(cwe_items) + len(external_references) + len(references_externals_table) + len(capec_references) + len(languages) + len(architectures) + len(technologies) + len(operating_systems) + len(mitigations) + len(alternate_terms) + len(modes_of_introduction) + len(related_weaknesses) + len(detection_methods) + len(observed_examples) + len(consequences) + len(backgroun_details) + len(notes) + len(mapping_notes) + len(functional_areas) + len(mapping_suggestions) + len(affected_resources) + len(weakness_ordinalities) + len(taxonomy_mapping) + len(demostrative_examples)
     processed_items = 0
+    progress_lock = threading.Lock()
 
     print(f"Total items to process: {total_items}")
     print(f"Cwe items: {len(cwe_items)}")
@@ -557,426 +765,150 @@ def load_data(cwe_items, external_references, references_externals_table, capec_
     print(f"Demonstrative examples: {len(demostrative_examples)}")
     
 
-    # Insert CWE items in batches
-    for i in range(0, len(cwe_items), batch_size):
-        batch = cwe_items[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `weaknesses` (id, name, description, extended_description, structure, abstraction, status, likelihood_of_exploit, diagram)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        name = VALUES(name),
-        description = VALUES(description),
-        extended_description = VALUES(extended_description),
-        structure = VALUES(structure),
-        abstraction = VALUES(abstraction),
-        status = VALUES(status),
-        likelihood_of_exploit = VALUES(likelihood_of_exploit),
-        diagram = VALUES(diagram)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (cwe_items).")
-
-    # Insert references in batches
-    for i in range(0, len(external_references), batch_size):
-        batch = external_references[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `external_references` (reference_id, author, title, edition, publication, publisher, publication_year, publication_month, publication_day, url, url_date)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        author = VALUES(author),
-        title = VALUES(title),
-        edition = VALUES(edition),
-        publication = VALUES(publication),
-        publisher = VALUES(publisher),
-        publication_year = VALUES(publication_year),
-        publication_month = VALUES(publication_month),
-        publication_day = VALUES(publication_day),
-        url = VALUES(url),
-        url_date = VALUES(url_date)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (external_references).")
-
-    # Insert references_externals_table in batches
-    for i in range(0, len(references_externals_table), batch_size):
-        batch = references_externals_table[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `references_external_table` (weakness_id, reference_id, section)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        section = VALUES(section)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (References_External_Table).")
-
-    # Insert capec_references in batches
-    for i in range(0, len(capec_references), batch_size):
-        batch = capec_references[i:i + batch_size]
-        cursor.executemany('''
-        INSERT IGNORE INTO `related_attack_patterns` (weakness_id, capec_id)
-        VALUES (%s, %s)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Related_Attack_Patterns).")
-
-    # Insert languages in batches
-    for i in range(0, len(languages), batch_size):
-        batch = languages[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `languages` (id, weakness_id, name, class, prevalence)
-        VALUES (%s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        name = VALUES(name),
-        class = VALUES(class),
-        prevalence = VALUES(prevalence)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Languages).")
-    
-    # Insert architectures in batches
-    for i in range(0, len(architectures), batch_size):
-        batch = architectures[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `architectures` (id, weakness_id, name, class, prevalence)
-        VALUES (%s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        name = VALUES(name),
-        class = VALUES(class),
-        prevalence = VALUES(prevalence)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Architectures).")
-    
-    # Insert technologies in batches
-    for i in range(0, len(technologies), batch_size):
-        batch = technologies[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `technologies` (id, weakness_id, name, class, prevalence)
-        VALUES (%s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        name = VALUES(name),
-        class = VALUES(class),
-        prevalence = VALUES(prevalence)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Technologies).")
-
-    # Insert operating systems in batches
-    for i in range(0, len(operating_systems), batch_size):
-        batch = operating_systems[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `operating_systems` (id, weakness_id, name, version, cpe_id, class, prevalence)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        name = VALUES(name),
-        version = VALUES(version),
-        cpe_id = VALUES(cpe_id),
-        class = VALUES(class),
-        prevalence = VALUES(prevalence)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Operating Systems).")
-
-    # Insert mitigations in batches
-    for i in range(0, len(mitigations), batch_size):
-        batch = mitigations[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `mitigations` (id, weakness_id, mitigation_id, description, phase, strategy, effectiveness, effectiveness_notes)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        mitigation_id = VALUES(mitigation_id),
-        description = VALUES(description),
-        phase = VALUES(phase),
-        strategy = VALUES(strategy),
-        effectiveness = VALUES(effectiveness),
-        effectiveness_notes = VALUES(effectiveness_notes)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Mitigations).")
-    
-    # Insert alternate terms in batches
-    for i in range(0, len(alternate_terms), batch_size):
-        batch = alternate_terms[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `alternate_terms` (id, weakness_id, term, description)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        description = VALUES(description)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Alternate_Terms).")
-
-    # Insert modes of introduction in batches
-    for i in range(0, len(modes_of_introduction), batch_size):
-        batch = modes_of_introduction[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `modes_of_introduction` (id, weakness_id, phase, note)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        phase = VALUES(phase),
-        note = VALUES(note)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Modes_Of_Introduction).")
-    
-    # Insert related weaknesses in batches
-    for i in range(0, len(related_weaknesses), batch_size):
-        batch = related_weaknesses[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `related_weaknesses` (weakness_id, nature, related_weakness_id, view_id, chain_id, ordinal)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        nature = VALUES(nature),
-        chain_id = VALUES(chain_id),
-        ordinal = VALUES(ordinal)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Related_Weaknesses).")
-    
-    # Insert detection methods in batches
-    for i in range(0, len(detection_methods), batch_size):
-        batch = detection_methods[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `detection_methods` (id, weakness_id, detection_method_id, method, description, effectiveness, effectiveness_notes)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        detection_method_id = VALUES(detection_method_id),
-        method = VALUES(method),
-        description = VALUES(description),
-        effectiveness = VALUES(effectiveness),
-        effectiveness_notes = VALUES(effectiveness_notes)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Detection_Methods).")
-    
-    # Insert observed examples in batches
-    for i in range(0, len(observed_examples), batch_size):
-        batch = observed_examples[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `observed_examples` (weakness_id, cve_id, description, url)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        description = VALUES(description),
-        url = VALUES(url)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Observed_Examples).")
-
-    # Insert Common Consequences in batches
-    for i in range(0, len(consequences), batch_size):
-        batch = consequences[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `common_consequences` (id, weakness_id, consequence_id, scope, impact, likelihood, note)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        consequence_id = VALUES(consequence_id),
-        scope = VALUES(scope),
-        impact = VALUES(impact),
-        likelihood = VALUES(likelihood),
-        note = VALUES(note)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Common_Consequences).")
-
-    # Insert Background Details in batches
-    for i in range(0, len(backgroun_details), batch_size):
-        batch = backgroun_details[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `background_details` (id, weakness_id, detail)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        detail = VALUES(detail)
-        ''', batch)
-        
-        #conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Background_Details).")
-
-    # Insert Notes in batches
-    for i in range(0, len(notes), batch_size):
-        batch = notes[i:i + batch_size]
-
-        # Escapar las comillas del 3 parametro de descriptions
-        for j in range(len(batch)):
-            batch[j] = (batch[j][0], batch[j][1], batch[j][2], escape_characters(batch[j][2]))
-
-        cursor.executemany('''
-        INSERT INTO `notes` (id, weakness_id, type, note)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        type = VALUES(type),
-        note = VALUES(note)
-        ''', batch)
-        
-        #conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Notes).")
-    
-    # Insert Mapping Notes in batches
-    for i in range(0, len(mapping_notes), batch_size):
-        batch = mapping_notes[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `mapping_notes` (id, weakness_id, uso, rationale, comments, reasons)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        id = VALUES(id),
-        weakness_id = VALUES(weakness_id),
-        uso = VALUES(uso),
-        rationale = VALUES(rationale),
-        comments = VALUES(comments),
-        reasons = VALUES(reasons)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Mapping_Notes).")
-    
-    # Insert Mapping Suggestions in batches
-    for i in range(0, len(mapping_suggestions), batch_size):
-        batch = mapping_suggestions[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `mapping_suggestions` (mapping_notes_id, cwe_id, comment)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        comment = VALUES(comment)
-        ''', batch)
-
-        #conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Mapping_Suggestions).")
-    
-    # Insert Functional Areas in batches
-    for i in range(0, len(functional_areas), batch_size):
-        batch = functional_areas[i:i + batch_size]
-        cursor.executemany('''
-        INSERT IGNORE INTO `functional_areas` (weakness_id, area)
-        VALUES (%s, %s)
-        ''', batch)
-        
-        #conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Functional_Areas).")
-
-    # Insert Affected Resources in batches
-    for i in range(0, len(affected_resources), batch_size):
-        batch = affected_resources[i:i + batch_size]
-        cursor.executemany('''
-        INSERT IGNORE INTO `affected_resources` (weakness_id, affected_resource)
-        VALUES (%s, %s)
-        ''', batch)
-        
-        #conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Affected_Resources).")
-
-    # Insert Weakness Ordinalities in batches
-    for i in range(0, len(weakness_ordinalities), batch_size):
-        batch = weakness_ordinalities[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `weakness_ordinalities` (weakness_id, ordinality, description)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        description = VALUES(description)
-        ''', batch)
-        
-        #conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Weakness_Ordinalities).")
-    
-    # Insert Taxonomy Mappings uno a uno (versión segura)
-    for i in range(0, len(taxonomy_mapping), batch_size):
-        batch = taxonomy_mapping[i:i + batch_size]
-
-        for record in batch:
-            try:
-                cursor.execute('''
-                    INSERT INTO Taxonomy_Mapping (weakness_id, taxonomy_name, entry_id, entry_name, mapping_fit)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        entry_id = VALUES(entry_id),
-                        entry_name = VALUES(entry_name),
-                        mapping_fit = VALUES(mapping_fit)
-                ''', record)
-                processed_items += 1
-
-            except Exception as e:
-                print("❌ Error al insertar en Taxonomy_Mapping:")
-                print(f"Registro problemático: {record}")
-                print(f"Error: {e}")
-                raise
+    datasets = [cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples]
+    packet_limit = max_allowed_packet(connections[0][0])
+
+    # Insert every table in adaptive batches (src/etl/batching.py)
+    def load_table(idx):
+        spec = CWE_TABLES[idx]
+        rows = datasets[idx]
+        if "prepare" in spec:
+            rows = spec["prepare"](rows)
+        with borrow(pool) as (conn, cursor):
+            load_table_rows(conn, cursor, spec, rows)
+
+    def load_table_rows(conn, cursor, spec, rows):
+        def insert(batch):
+            if spec.get("row_by_row"):
+                for record in batch:
+                    try:
+                        cursor.execute(spec["sql"], record)
+                    except Exception as e:
+                        if quarantine is None:
+                            print(f"❌ Error al insertar en {spec['label']}:")
+                            print(f"Registro problemático: {record}")
+                            print(f"Error: {e}")
+                        raise
+            else:
+                cursor.executemany(spec["sql"], batch)
+            conn.commit()
 
-        conn.commit()
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Taxonomy_Mapping).")
-
-    # Insert Demonstrative Examples in batches
-    for i in range(0, len(demostrative_examples), batch_size):
-        batch = demostrative_examples[i:i + batch_size]
-        cursor.executemany('''
-        INSERT INTO `demonstrative_examples` (id, weakness_id, demostrative_id, title, intro, body, code, references_url)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        demostrative_id = VALUES(demostrative_id),
-        title = VALUES(title),
-        intro = VALUES(intro),
-        body = VALUES(body),
-        code = VALUES(code),
-        references_url = VALUES(references_url)
-        ''', batch)
-        
-        conn.commit()
-        processed_items += len(batch)
-        print(f"Progreso: {processed_items}/{total_items} items procesados (Demonstrative_Examples).")
+        # Las filas que el servidor rechaza se apartan en quarantine y el resto del lote se confirma
+        def load_batch(batch):
+            nonlocal processed_items
+            loaded = execute_batch(conn, batch, insert, spec["label"], quarantine, cursors=(cursor,))
+            with progress_lock:
+                processed_items += loaded
+                print(f"Progreso: {processed_items}/{total_items} items procesados ({spec['label']}).")
+            return loaded
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+        AdaptiveBatcher(packet_limit, initial_size=batch_size).run(rows, load_batch)
+
+    print(f"🔄 Cargando {len(CWE_TABLES)} tablas con {len(connections)} conexiones...")
+    try:
+        run_in_dependency_order(set(range(len(CWE_TABLES))), cwe_table_parents(), load_table, workers)
+    finally:
+        for conn, cursor in connections:
+            cursor.close()
+            conn.close()
+
+def rejected_weaknesses(rejected, data):
+    """
+    IDs de los Weakness con filas en cuarentena. rejected son los (label, fila) de la cuarentena y
+    data las tablas de transform_cwe_data con las que se cargaron, para saber de qué Weakness son
+    las referencias externas y las Mapping_Suggestions.
+    """
+    rows = dict(zip((spec['name'] for spec in CWE_TABLES), data))
+    reference_users = {}
+    for weakness_id, reference_id, _ in rows['references_externals_table']:
+        reference_users.setdefault(reference_id, set()).add(weakness_id)
+    owners = {
+        'cwe_items': ('id', None),
+        'external_references': ('reference_id', reference_users),
+        'Mapping_Suggestions': ('mapping_notes_id', {note[0]: {note[1]} for note in rows['mapping_notes']}),
+    }
+    columns = {spec['label']: parse_upsert(spec['sql'])[2] for spec in CWE_TABLES}
+    return rejected_entries(rejected, columns, 'weakness_id', owners)
+
+def apply_weakness_changes(root, known, quarantine=None):
+    """
+    Aplica solo los Weakness nuevos, modificados o retirados respecto a known ({ID: hash}) y
+    devuelve ({ID: hash} de los aplicados, IDs retirados, IDs con filas en cuarentena).
+    Sin known se carga el catálogo entero. Los Weakness con filas en cuarentena se devuelven
+    con RETRY_HASH: así no cuentan como cargados y la próxima ejecución los reaplica.
+    """
+    current = weakness_hashes(root)
+    offset = quarantine.offset() if quarantine else 0
+    if not known:
+        print(f"📥 Carga completa del catálogo: {len(current)} Weakness.")
+        data = transform_cwe_data(root)
+        with deferred_checks(connect_db_cwe, "cwe", CWE_SCHEMA, enabled=DEFER_CHECKS):
+            load_data(*data, quarantine=quarantine)
+        applied, removed = dict(current), []
+    else:
+        changed, removed = diff_entries(current, known)
+        print(f"🔄 {len(changed)} Weakness nuevos o modificados y {len(removed)} retirados de {len(current)}.")
+        conn = connect_db_cwe()
+        try:
+            # Se borran los hijos de los modificados y se reinsertan; los retirados se borran enteros
+            delete_entries(conn, WEAKNESS_CHILDREN_DELETES, [entry_id for entry_id in changed if entry_id in known] + removed)
+            delete_entries(conn, ["DELETE FROM Weaknesses WHERE id IN ({ids})"], removed)
+        finally:
+            conn.close()
+        applied = {entry_id: current[entry_id] for entry_id in changed}
+        data = None
+        if changed:
+            # Pocas filas: con las comprobaciones activas, sin quitar índices
+            data = transform_cwe_data(root, set(changed))
+            load_data(*data, quarantine=quarantine, defer_checks=False)
+
+    rejected = set()
+    if quarantine and data is not None:
+        rejected = rejected_weaknesses(quarantine.rejected_since(offset), data) & set(applied)
+    for entry_id in rejected:
+        applied[entry_id] = RETRY_HASH
+    return applied, removed, rejected
 
 if __name__ == "__main__":
     check_or_create_cwe_db()
     
-    # Download and extract the XML file
-    xml_path = download_extract_cwe_data(URL)
+    # Download the ZIP file (conditional request through the feed cache)
+    feeds = FeedCache()
+    with stage("descarga"):
+        feed = feeds.fetch(URL)
 
-    # Parse the XML file
-    tree = ET.parse(xml_path)
+    # Versión cargada por última vez (Catalog_Metadata) frente a la del feed
+    conn = connect_db_cwe()
+    ensure_catalog_tables(conn)
+    state = load_catalog_state(conn, CATALOG)
+    with open_zip_member(feed.path) as xml_file:
+        version, date = read_catalog_version(xml_file)
+    if SKIP_UNCHANGED_FEED and is_same_catalog(state, feed.sha256, version, date):
+        if state.sha256 != feed.sha256:
+            save_catalog_state(conn, CATALOG, version, date, feed.sha256, {}, [])
+        conn.close()
+        print(f"✅ El catálogo CWE {version} ({date}) ya está cargado. No hay nada que cargar.")
+        sys.exit(0)
+    known = load_entry_hashes(conn, CATALOG) if state else {}
+    conn.close()
+
+    # Parse the XML file straight from the ZIP, without extracting it
+    with stage("parseo"), open_zip_member(feed.path) as xml_file:
+        tree = ET.parse(xml_file)
     root = tree.getroot()
+    quarantine = Quarantine(QUARANTINE_PATH)
     try:
-        # Extract data from the XML file
-        cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples = transform_cwe_data(root)
-        
-        # Load the extracted data into the database
-        load_data(cwe_items, external_references, references_externals_table, capec_references, languages, architectures, technologies, operating_systems, mitigations, alternate_terms, modes_of_introduction, related_weaknesses, detection_methods, observed_examples, consequences, backgroun_details, notes, mapping_notes, mapping_suggestions, functional_areas, affected_resources, weakness_ordinalities, taxonomy_mapping, demostrative_examples)
-
+        # Extract and load only what changed since the last loaded version
+        with stage("transformación y carga"):
+            applied, removed, rejected = apply_weakness_changes(root, known, quarantine)
+
+        if rejected:
+            # Se registra la versión con el resto de Weakness: solo estos se reaplican en la próxima ejecución
+            print(f"⚠️ {len(rejected)} Weakness con filas en cuarentena ({QUARANTINE_PATH}) no se registran como cargados: "
+                  f"se volverán a aplicar en la próxima ejecución.")
+        conn = connect_db_cwe()
+        save_catalog_state(conn, CATALOG, version, date, feed.sha256, applied, removed)
+        conn.close()
         print("🚀 Datos insertados en {DB_CWE} correctamente.")
     except Exception as e:
         print("❌ Error en la carga de datos:", e)
@@ -988,7 +920,7 @@ if __name__ == "__main__":
         # conn.commit()
         # cursor.close()
         # conn.close()
+        sys.exit(1)
     finally:
-        os.remove(xml_path)
-        print("🗑️ Archivos .zip y .xml eliminados correctamente.")
-        print("🔚 Proceso de ETL finalizado.")
\ No newline at end of file
+        quarantine.report()
+        print("🔚 Proceso de ETL finalizado.")
@@ -0,0 +1,55 @@
+"""
+Conversión de fechas ISO-8601/RFC3339 al formato DATETIME/DATE de MySQL para las ETL.
+
+Las fechas bien formadas (las de cvelistV5 y el diccionario CPE) se convierten recortando
+la cadena, sin construir objetos datetime; el resto pasa por datetime.fromisoformat.
+Los resultados se memorizan porque los mismos valores se repiten miles de veces.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Tamaño de la caché de conversiones
+DATE_CACHE_SIZE = 65536
+
+# YYYY-MM-DDTHH:MM:SS[.fff|.ffffff][Z|±HH:MM]
+_RFC3339_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.\d{3}|\.\d{6})?(?:Z|[+-](\d{2}):(\d{2}))?"
+)
+
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _valid_fields(year, month, day, hour, minute, second):
+    if not (1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month - 1]):
+        return False
+    if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        return False
+    return year >= 1 and hour <= 23 and minute <= 59 and second <= 59
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def convert_iso_to_mysql_datetime(iso_datetime):
+    """
+    Convierte una fecha en formato RFC3339/ISO8601 al formato DATETIME de MySQL
+    (sin zona horaria ni milisegundos).
+    """
+    if not iso_datetime:
+        return None  # Manejar valores nulos o vacíos
+    match = _RFC3339_RE.fullmatch(iso_datetime)
+    if match:
+        year, month, day, hour, minute, second, tz_hour, tz_minute = match.groups()
+        if _valid_fields(int(year), int(month), int(day), int(hour), int(minute), int(second)) and (
+            tz_hour is None or (int(tz_hour) <= 23 and int(tz_minute) <= 59)
+        ):
+            return iso_datetime[:10] + " " + iso_datetime[11:19]
+    try:
+        # Formatos poco habituales: parseo completo
+        dt = datetime.fromisoformat(iso_datetime.replace("Z", "+00:00"))
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError as e:
+        print(f"❌ Error al convertir la fecha '{iso_datetime}': {e}")
+        return None
+
+def convert_iso_to_mysql_date(iso_datetime):
+    """Convierte una fecha ISO8601 (con o sin hora) al formato DATE de MySQL."""
+    converted = convert_iso_to_mysql_datetime(iso_datetime)
+    return converted[:10] if converted else None
@@ -0,0 +1,173 @@
+"""
+Descarga de los feeds de las ETL en streaming.
+
+La respuesta se escribe a disco por trozos (nunca entera en memoria) en un fichero .part que
+se renombra al terminar, y el XML de los ZIP se lee directamente del archivo, descomprimiéndolo
+según lo consume el parser, sin extraer una copia intermedia.
+
+FeedCache guarda cada feed en disco por el SHA-256 de su contenido: las descargas son
+condicionales (If-None-Match / If-Modified-Since), una descarga cortada se reanuda con Range
+y, si el contenido coincide con el de la última carga correcta, la ETL puede no hacer nada.
+"""
+import hashlib
+import json
+import os
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+import requests
+
+# Bytes que se leen de la respuesta en cada trozo
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Cada cuántos bytes descargados se imprime el progreso
+PROGRESS_STEP = 10 << 20
+# Segundos de espera para conectar y entre trozos de la respuesta
+DOWNLOAD_TIMEOUT = 60
+PART_SUFFIX = '.part'
+# Directorio de la caché de feeds compartida por todas las ETL
+FEED_CACHE_DIR = 'feed_cache'
+# Bytes por lectura al calcular el SHA-256 de una descarga parcial
+HASH_CHUNK_SIZE = 1 << 20
+
+def format_size(size):
+    return f"{size / (1 << 20):.1f} MB"
+
+def write_response(response, f, offset=0, digest=None, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Escribe el cuerpo de response en f por trozos, informando del progreso, y devuelve el tamaño
+    total del fichero. offset son los bytes que ya tenía f (descarga reanudada).
+    """
+    downloaded = offset
+    length = int(response.headers.get('Content-Length') or 0)
+    total = offset + length if length else 0
+    next_report = (downloaded // PROGRESS_STEP + 1) * PROGRESS_STEP
+    for chunk in response.iter_content(chunk_size):
+        f.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        downloaded += len(chunk)
+        if downloaded >= next_report:
+            if total:
+                print(f"📥 {format_size(downloaded)} de {format_size(total)} ({downloaded * 100 // total}%)")
+            else:
+                print(f"📥 {format_size(downloaded)} descargados")
+            next_report += PROGRESS_STEP
+    return downloaded
+
+def file_sha256(path, digest=None):
+    """SHA-256 (o digest ya iniciado, actualizado) del contenido de path."""
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+class Feed:
+    """Resultado de FeedCache.fetch: fichero local del feed y si cambió desde la última carga."""
+
+    def __init__(self, url, path, sha256, changed):
+        self.url = url
+        self.path = path
+        self.sha256 = sha256
+        self.changed = changed
+
+class FeedCache:
+    """
+    Caché de feeds en directory: <sha256><ext> con el contenido de cada descarga y
+    <clave de la URL>.json con sus validadores HTTP, su SHA-256 y el de la última carga correcta.
+    """
+
+    def __init__(self, directory=FEED_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(url.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, key + suffix)
+
+    def _blob_path(self, url, sha256):
+        extension = os.path.splitext(url.split('?')[0])[1]
+        return os.path.join(self.directory, sha256 + extension)
+
+    def _load(self, url):
+        path = self._path(url, '.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save(self, url, meta):
+        # Escritura atómica, como el manifest de los checkpoints
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url, '.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def _feed(self, url, meta):
+        sha256 = meta['sha256']
+        return Feed(url, self._blob_path(url, sha256), sha256, sha256 != meta.get('processed_sha256'))
+
+    def fetch(self, url):
+        """Descarga url si cambió (o continúa la descarga cortada) y devuelve su Feed."""
+        meta = self._load(url)
+        headers = {}
+        if meta.get('sha256') and os.path.exists(self._blob_path(url, meta['sha256'])):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        # Descarga anterior cortada: se pide solo lo que falta, si el contenido no ha cambiado desde entonces
+        part_path = self._path(url, PART_SUFFIX)
+        partial = meta.get('partial') or {}
+        validator = partial.get('etag') or partial.get('last_modified')
+        offset = os.path.getsize(part_path) if validator and os.path.exists(part_path) else 0
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+
+        print(f"Descargando desde {url}...")
+        with requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                print(f"✅ Sin cambios en el servidor. Se usa la copia de {self.directory}.")
+                return self._feed(url, meta)
+            response.raise_for_status()
+            if response.status_code == 206:
+                print(f"♻️ Reanudando la descarga desde {format_size(offset)}.")
+                digest = file_sha256(part_path)
+            else:
+                offset = 0
+                digest = hashlib.sha256()
+            validators = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+            # Se guardan antes del cuerpo para poder reanudar si la descarga se corta
+            meta['partial'] = validators
+            self._save(url, meta)
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                size = write_response(response, f, offset, digest)
+
+        sha256 = digest.hexdigest()
+        previous = meta.get('sha256')
+        os.replace(part_path, self._blob_path(url, sha256))
+        if previous and previous != sha256 and os.path.exists(self._blob_path(url, previous)):
+            os.remove(self._blob_path(url, previous))
+        meta.pop('partial')
+        meta.update(validators, url=url, sha256=sha256, size=size, fetched=datetime.now().isoformat(timespec='seconds'))
+        self._save(url, meta)
+        print(f"✅ {format_size(size)} descargados (sha256 {sha256[:12]}).")
+        return self._feed(url, meta)
+
+    def mark_processed(self, feed):
+        """Registra que la ETL cargó feed entero: si no cambia, la próxima ejecución no hará nada."""
+        meta = self._load(feed.url)
+        meta['processed_sha256'] = feed.sha256
+        self._save(feed.url, meta)
+
+@contextmanager
+def open_zip_member(zip_path, suffix='.xml'):
+    """Abre el primer fichero del ZIP que termina en suffix, descomprimiéndolo en streaming."""
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        member = next((name for name in zip_ref.namelist() if name.endswith(suffix)), None)
+        if member is None:
+            raise FileNotFoundError(f"No se encontró ningún archivo {suffix} en {zip_path}.")
+        with zip_ref.open(member) as f:
+            yield f
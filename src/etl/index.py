@@ -1,6 +1,24 @@
 from src.config.db_config import connect_db_cve
 import mysql.connector
 
+# Índices secundarios de cada BBDD: (tabla, nombre del índice, columnas)
+INDEX_CATALOGUE = {
+    "cve": [
+        ("Container", "idx_container_cve", "cve_id, container_id"),
+        ("Exploits", "idx_exploits_container", "container_id"),
+        ("CVE_References", "idx_ref_container", "container_id, id"),
+        ("Affected_Product", "idx_prod_container", "container_id, product_id"),
+    ],
+    # Los mismos que crea BBDD/CWE_BBDD.sql
+    "cwe": [
+        ("Weaknesses", "idx_weaknesses_id", "id"),
+        ("Weaknesses", "idx_weaknesses_name", "name"),
+        ("Related_Attack_Patterns", "idx_weakness_id", "weakness_id"),
+        ("Related_Attack_Patterns", "idx_capec_id", "capec_id"),
+    ],
+    "capec": [],
+}
+
 # Consultas SQL separadas
 procedimiento_sql = """
 CREATE PROCEDURE create_index_if_needed(
@@ -25,58 +43,77 @@ BEGIN
 END
 """
 
-llamadas_sql = [
-    """
-    CALL create_index_if_needed(
-        'Container', 'idx_container_cve',
-        'ALTER TABLE Container ADD INDEX idx_container_cve (cve_id, container_id)'
-    )
-    """,
-    """
-    CALL create_index_if_needed(
-        'Exploits', 'idx_exploits_container',
-        'ALTER TABLE Exploits ADD INDEX idx_exploits_container (container_id)'
-    )
-    """,
-    """
-    CALL create_index_if_needed(
-        'CVE_References', 'idx_ref_container',
-        'ALTER TABLE CVE_References ADD INDEX idx_ref_container (container_id, id)'
+eliminar_proc = "DROP PROCEDURE create_index_if_needed"
+
+def index_clause(index, columns):
+    return f"ADD INDEX {index} ({columns})"
+
+def index_clauses(table, catalogue="cve"):
+    """Cláusulas ADD INDEX del catálogo para una tabla."""
+    return [index_clause(index, columns) for name, index, columns in INDEX_CATALOGUE[catalogue] if name == table]
+
+def existing_indexes(cursor, catalogue):
+    """Índices del catálogo que existen en la BBDD de la conexión."""
+    cursor.execute(
+        "SELECT DISTINCT LOWER(table_name), LOWER(index_name) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE()"
     )
-    """,
+    present = set(cursor.fetchall())
+    return [entry for entry in INDEX_CATALOGUE[catalogue] if (entry[0].lower(), entry[1].lower()) in present]
+
+def drop_indexes(cursor, catalogue):
     """
-    CALL create_index_if_needed(
-        'Affected_Product', 'idx_prod_container',
-        'ALTER TABLE Affected_Product ADD INDEX idx_prod_container (container_id, product_id)'
-    )
+    Elimina los índices del catálogo antes de una carga masiva y devuelve los que se han quitado.
+    InnoDB no deja eliminar un índice que sostiene una FK: esos se mantienen.
     """
-]
+    dropped = []
+    for table, index, columns in existing_indexes(cursor, catalogue):
+        try:
+            cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}")
+            dropped.append((table, index, columns))
+        except mysql.connector.Error as err:
+            print(f"⚠️ Se mantiene {index} en {table}: {err}")
+    return dropped
 
-eliminar_proc = "DROP PROCEDURE create_index_if_needed"
+def rebuild_indexes(cursor, indexes):
+    """Vuelve a crear los índices dados con un único ALTER TABLE por tabla."""
+    by_table = {}
+    for table, index, columns in indexes:
+        by_table.setdefault(table, []).append(index_clause(index, columns))
+    for table, clauses in by_table.items():
+        print(f"🗂️ Reconstruyendo {len(clauses)} índices de {table}...")
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
 
-# Ejecución del script
-try:
-    conn = connect_db_cve()
+def create_indexes(conn, catalogue="cve"):
+    """Crea en la BBDD los índices del catálogo que todavía no existan."""
     cursor = conn.cursor()
+    try:
+        print("Creando procedimiento...")
+        cursor.execute(procedimiento_sql)
 
-    print("Creando procedimiento...")
-    cursor.execute(procedimiento_sql)
+        for table, index, columns in INDEX_CATALOGUE[catalogue]:
+            consulta = f"CALL create_index_if_needed('{table}', '{index}', 'ALTER TABLE {table} {index_clause(index, columns)}')"
+            print(f"Ejecutando: {consulta[:50]}...")
+            cursor.execute(consulta)
 
-    for consulta in llamadas_sql:
-        print(f"Ejecutando: {consulta.strip()[:50]}...")
-        cursor.execute(consulta)
+        print("Eliminando procedimiento...")
+        cursor.execute(eliminar_proc)
 
-    print("Eliminando procedimiento...")
-    cursor.execute(eliminar_proc)
+        conn.commit()
+        print("Índices creados correctamente.")
+    finally:
+        cursor.close()
 
-    conn.commit()
-    print("Índices creados correctamente.")
+# Ejecución del script
+if __name__ == "__main__":
+    conn = None
+    try:
+        conn = connect_db_cve()
+        create_indexes(conn)
 
-except mysql.connector.Error as err:
-    print(f"Error: {err}")
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
 
-finally:
-    if cursor:
-        cursor.close()
-    if conn:
-        conn.close()
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,89 @@
+"""
+Mantenimiento diferido de índices y claves foráneas durante las cargas masivas de las ETL.
+
+Durante la carga se quitan los índices secundarios del catálogo de index.py y las conexiones
+de carga trabajan con foreign_key_checks = 0 y unique_checks = 0. Al terminar se reconstruyen
+los índices (un ALTER TABLE por tabla) y se validan todas las FK del script BBDD/*.sql con una
+única consulta; las filas huérfanas, que antes habría rechazado el INSERT, se eliminan.
+"""
+from contextlib import contextmanager
+from src.etl.index import drop_indexes, rebuild_indexes
+from src.etl.parallel_loader import ancestors
+from src.etl.schema import load_schema_dependencies, load_schema_foreign_keys
+
+def set_session_checks(conn, enabled):
+    """Activa o desactiva foreign_key_checks y unique_checks en la sesión de conn."""
+    cursor = conn.cursor()
+    try:
+        value = 1 if enabled else 0
+        cursor.execute(f"SET SESSION foreign_key_checks = {value}, unique_checks = {value}")
+    finally:
+        cursor.close()
+
+def _orphan_join(foreign_key):
+    table, columns, parent, parent_columns = foreign_key
+    condition = " AND ".join(f"p.{pc} = c.{cc}" for cc, pc in zip(columns, parent_columns))
+    not_null = " AND ".join(f"c.{cc} IS NOT NULL" for cc in columns)
+    return f"{table} c LEFT JOIN {parent} p ON {condition} WHERE {not_null} AND p.{parent_columns[0]} IS NULL"
+
+def orphan_check_sql(foreign_keys):
+    """Una sola consulta que devuelve (posición de la FK, filas huérfanas) para cada FK."""
+    return " UNION ALL ".join(
+        f"SELECT {position}, COUNT(*) FROM {_orphan_join(foreign_key)}"
+        for position, foreign_key in enumerate(foreign_keys)
+    )
+
+def find_orphans(cursor, foreign_keys):
+    """Devuelve {posición de la FK: filas huérfanas} de las FK que no se cumplen."""
+    if not foreign_keys:
+        return {}
+    cursor.execute(orphan_check_sql(foreign_keys))
+    return {position: count for position, count in cursor.fetchall() if count}
+
+def delete_orphans(cursor, foreign_keys, orphans, parents):
+    """Elimina las filas huérfanas, de padres a hijos para que un solo recorrido baste."""
+    depth = {table: len(ancestors(table, parents)) for table in parents}
+    for position in sorted(orphans, key=lambda p: depth.get(foreign_keys[p][0].lower(), 0)):
+        foreign_key = foreign_keys[position]
+        cursor.execute(f"DELETE c FROM {_orphan_join(foreign_key)}")
+        print(f"🧹 {cursor.rowcount} filas de {foreign_key[0]} sin {foreign_key[2]} eliminadas.")
+
+def validate_foreign_keys(conn, schema_path):
+    """Comprueba todas las FK del script con una consulta y borra las filas huérfanas."""
+    foreign_keys = load_schema_foreign_keys(schema_path)
+    cursor = conn.cursor()
+    try:
+        orphans = find_orphans(cursor, foreign_keys)
+        if not orphans:
+            print(f"✅ {len(foreign_keys)} claves foráneas validadas sin huérfanos.")
+            return
+        for position, count in orphans.items():
+            table, _, parent, _ = foreign_keys[position]
+            print(f"⚠️ {count} filas de {table} apuntan a filas inexistentes de {parent}.")
+        delete_orphans(cursor, foreign_keys, orphans, load_schema_dependencies(schema_path))
+        conn.commit()
+    finally:
+        cursor.close()
+
+@contextmanager
+def deferred_checks(connect, catalogue, schema_path, enabled=True):
+    """
+    Envuelve una carga masiva: quita los índices del catálogo antes de cargar, los reconstruye
+    al terminar (también si la carga falla) y, si ha ido bien, valida las FK del script.
+    Las conexiones de carga deben desactivar sus comprobaciones con set_session_checks.
+    """
+    if not enabled:
+        yield
+        return
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        dropped = drop_indexes(cursor, catalogue)
+        try:
+            yield
+        finally:
+            rebuild_indexes(cursor, dropped)
+        validate_foreign_keys(conn, schema_path)
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,64 @@
+"""
+Carga de tablas en paralelo respetando el orden de las claves foráneas: cada tabla se lanza
+en cuanto sus padres están confirmados, y las tablas hermanas se cargan a la vez usando un
+pool de conexiones.
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+
+def ancestors(table, parents):
+    """Devuelve todos los ancestros de table en el grafo {tabla: set(padres)}."""
+    found = set()
+    stack = list(parents.get(table, ()))
+    while stack:
+        parent = stack.pop()
+        if parent not in found:
+            found.add(parent)
+            stack.extend(parents.get(parent, ()))
+    return found
+
+def connection_pool(connections):
+    """Crea un pool (cola) con las conexiones dadas."""
+    pool = queue.Queue()
+    for connection in connections:
+        pool.put(connection)
+    return pool
+
+@contextmanager
+def borrow(pool):
+    """Toma una conexión del pool y la devuelve al terminar."""
+    connection = pool.get()
+    try:
+        yield connection
+    finally:
+        pool.put(connection)
+
+def run_in_dependency_order(tables, parents, load_table, workers=1):
+    """
+    Ejecuta load_table(tabla) para cada una de tables. Una tabla se lanza cuando han terminado
+    todos sus padres que estén en tables; las que quedan listas a la vez se ejecutan en paralelo
+    con hasta workers hilos. Si una carga falla no se lanzan más tablas y se propaga el error.
+    """
+    pending = {table: {p for p in parents.get(table, ()) if p in tables} for table in tables}
+    done = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        def launch_ready():
+            for table in list(pending):
+                if pending[table] <= done:
+                    del pending[table]
+                    running[executor.submit(load_table, table)] = table
+
+        launch_ready()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                future.result()
+                done.add(table)
+            launch_ready()
+
+    if pending:
+        raise ValueError(f"Dependencias circulares entre las tablas: {sorted(pending)}")
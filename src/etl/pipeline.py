@@ -0,0 +1,43 @@
+"""
+Presupuesto de recursos y etapas de las ETL cuando las lanza run_all_etls.
+
+run_all_etls ejecuta las ETL a la vez y reparte entre ellas los núcleos y las conexiones a
+MySQL: cada ETL recibe su parte en ETL_CPU_WORKERS y ETL_DB_CONNECTIONS y dimensiona con ella
+sus Pool y pools de conexiones. Ejecutada por separado, cada ETL usa sus valores por defecto.
+Las etapas (stage) imprimen su duración en una línea que run_all_etls recoge para el resumen.
+"""
+import os
+import re
+import time
+from contextlib import contextmanager
+from multiprocessing import cpu_count
+
+CPU_WORKERS_ENV = 'ETL_CPU_WORKERS'
+DB_CONNECTIONS_ENV = 'ETL_DB_CONNECTIONS'
+STAGE_RE = re.compile(r"^⏱️ Etapa (.+): (\d+(?:\.\d+)?)s$")
+
+def _env_workers(name, default):
+    value = os.environ.get(name)
+    return max(1, int(value)) if value else default
+
+def cpu_workers():
+    """Procesos de CPU que puede usar la ETL (por defecto, todos los núcleos)."""
+    return _env_workers(CPU_WORKERS_ENV, cpu_count())
+
+def db_connections(default):
+    """Conexiones simultáneas a MySQL que puede abrir la ETL (default si se ejecuta sola)."""
+    return _env_workers(DB_CONNECTIONS_ENV, default)
+
+@contextmanager
+def stage(name):
+    """Mide una etapa de la ETL e imprime su duración (también si falla)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(f"⏱️ Etapa {name}: {time.perf_counter() - start:.2f}s", flush=True)
+
+def parse_stage(line):
+    """(etapa, segundos) si line es la que imprime stage, o None."""
+    match = STAGE_RE.match(line.strip())
+    return (match.group(1), float(match.group(2))) if match else None
@@ -1,41 +1,149 @@
-import subprocess
+import argparse
 import logging
+import os
+import subprocess
+import sys
+import threading
+import time
 from datetime import datetime
+from multiprocessing import cpu_count
+from src.etl.pipeline import CPU_WORKERS_ENV, DB_CONNECTIONS_ENV, parse_stage
 
-# Configurar logging
-log_filename = f"etl_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-logging.basicConfig(
-    filename=f"src/logs/{log_filename}",
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s'
-)
-
-scripts = [
-    "src.etl.cve_ETL",
-    "src.etl.cwe_ETL",
-    "src.etl.capec_ETL",
-    "src.etl.cpe_ETL"
+LOG_DIR = "src/logs"
+# Conexiones simultáneas a MySQL entre todas las ETL
+DB_CONNECTIONS = 16
+
+# ETL que se ejecutan a la vez; weight es su parte de los núcleos y conexiones del presupuesto
+ETLS = [
+    {"name": "cve", "module": "src.etl.cve_ETL", "weight": 4},
+    {"name": "cpe", "module": "src.etl.cpe_ETL", "weight": 2},
+    {"name": "cwe", "module": "src.etl.cwe_ETL", "weight": 1},
+    {"name": "capec", "module": "src.etl.capec_ETL", "weight": 1},
 ]
 
-def run_script(script):
-    logging.info(f"---- Ejecutando {script} ----")
+def select_etls(only=None, skip=None):
+    names = [spec["name"] for spec in ETLS]
+    unknown = [name for name in (only or []) + (skip or []) if name not in names]
+    if unknown:
+        raise ValueError(f"ETL desconocidas: {', '.join(unknown)}. Disponibles: {', '.join(names)}")
+    return [spec for spec in ETLS if (not only or spec["name"] in only) and spec["name"] not in (skip or [])]
+
+def setup_logging():
+    """Fichero de la ejecución en LOG_DIR y consola, con las líneas de cada ETL según llegan."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_filename = f"etl_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=[logging.FileHandler(os.path.join(LOG_DIR, log_filename)), logging.StreamHandler()]
+    )
+
+def split_budget(total, etls):
+    """
+    Reparte total (núcleos o conexiones) entre las ETL: 1 para cada una y el resto según su peso,
+    por el método del mayor resto. La suma es exactamente total, así que hace falta total >= len(etls).
+    """
+    if total < len(etls):
+        raise ValueError(f"No se puede repartir {total} entre {len(etls)} ETL: hace falta al menos 1 por ETL")
+    spare = total - len(etls)
+    weights = sum(spec["weight"] for spec in etls)
+    shares = {spec["name"]: divmod(spare * spec["weight"], weights) for spec in etls}
+    budget = {name: 1 + quotient for name, (quotient, _) in shares.items()}
+    # Lo que queda tras las partes enteras, a los mayores restos (a igualdad, en el orden de ETLS)
+    by_remainder = sorted(shares, key=lambda name: shares[name][1], reverse=True)
+    for name in by_remainder[:total - sum(budget.values())]:
+        budget[name] += 1
+    return budget
+
+def plan_waves(etls, cpus, db_connections):
+    """
+    Tandas de ETL que se ejecutan a la vez: todas juntas si hay al menos un núcleo y una conexión
+    para cada una; si no, en tandas de tantas como quepan, una tras otra.
+    """
+    if not etls:
+        raise ValueError("No hay ninguna ETL seleccionada")
+    slots = min(len(etls), cpus, db_connections)
+    if slots < 1:
+        raise ValueError("Hacen falta al menos 1 núcleo y 1 conexión")
+    return [etls[i:i + slots] for i in range(0, len(etls), slots)]
+
+def run_script(spec, cpus, connections, results):
+    """Ejecuta una ETL en un proceso aparte, volcando su salida al log línea a línea."""
+    name = spec["name"]
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    env[CPU_WORKERS_ENV] = str(cpus)
+    env[DB_CONNECTIONS_ENV] = str(connections)
+    stages = []
+    logging.info(f"---- Ejecutando {spec['module']} ({cpus} núcleos, {connections} conexiones) ----")
+    start = time.perf_counter()
     try:
-        result = subprocess.run(["python", "-m", script], capture_output=True, text=True)
-        logging.info(f"STDOUT de {script}:\n{result.stdout}")
-        if result.stderr:
-            logging.warning(f"STDERR de {script}:\n{result.stderr}")
-        if result.returncode != 0:
-            logging.error(f"{script} finalizó con errores. Código de salida: {result.returncode}")
-        else:
-            logging.info(f"{script} finalizó correctamente.")
+        process = subprocess.Popen([sys.executable, "-m", spec["module"]], stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True, env=env, bufsize=1)
+        for line in process.stdout:
+            line = line.rstrip()
+            logging.info(f"[{name}] {line}")
+            parsed = parse_stage(line)
+            if parsed:
+                stages.append(parsed)
+        returncode = process.wait()
     except Exception as e:
-        logging.exception(f"Error al ejecutar {script}: {e}")
+        logging.exception(f"Error al ejecutar {spec['module']}: {e}")
+        returncode = None
+    elapsed = time.perf_counter() - start
+
+    if returncode != 0:
+        logging.error(f"{spec['module']} finalizó con errores. Código de salida: {returncode}")
+    else:
+        logging.info(f"{spec['module']} finalizó correctamente en {elapsed:.2f}s.")
+    results[name] = {"returncode": returncode, "elapsed": elapsed, "stages": stages}
+
+def log_summary(etls, results):
+    logging.info("=== RESUMEN ===")
+    for spec in etls:
+        result = results[spec["name"]]
+        status = "OK" if result["returncode"] == 0 else f"ERROR ({result['returncode']})"
+        stages = ", ".join(f"{stage} {secs:.2f}s" for stage, secs in result["stages"]) or "sin etapas"
+        logging.info(f"{spec['name']:<6} {status:<10} {result['elapsed']:>9.2f}s  {stages}")
+
+def run_all_etls(only=None, skip=None, cpus=None, db_connections=DB_CONNECTIONS):
+    """Ejecuta las ETL seleccionadas a la vez, repartiendo entre ellas núcleos y conexiones. True si todas terminan bien."""
+    etls = select_etls(only, skip)
+    cpus = cpus or cpu_count()
+    waves = plan_waves(etls, cpus, db_connections)
 
-def run_all_etls():
     logging.info("=== INICIO DE EJECUCIÓN ETL ===")
-    for script in scripts:
-        run_script(script)
-    logging.info("=== FIN DE EJECUCIÓN ETL ===")
+    if len(waves) > 1:
+        logging.info(f"Presupuesto menor que el número de ETL: se ejecutan en {len(waves)} tandas.")
+    start = time.perf_counter()
+    results = {}
+    for wave in waves:
+        cpu_budget = split_budget(cpus, wave)
+        db_budget = split_budget(db_connections, wave)
+        threads = [threading.Thread(target=run_script, args=(spec, cpu_budget[spec["name"]], db_budget[spec["name"]], results),
+                                    name=spec["name"]) for spec in wave]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    log_summary(etls, results)
+    logging.info(f"=== FIN DE EJECUCIÓN ETL ({time.perf_counter() - start:.2f}s) ===")
+    return all(result["returncode"] == 0 for result in results.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta las ETL de vulnq a la vez")
+    parser.add_argument("--only", nargs="+", metavar="ETL", help="Ejecutar solo estas ETL (cve, cpe, cwe, capec)")
+    parser.add_argument("--skip", nargs="+", metavar="ETL", help="No ejecutar estas ETL")
+    parser.add_argument("--cpus", type=int, help="Núcleos entre todas las ETL (por defecto, todos)")
+    parser.add_argument("--db-connections", type=int, default=DB_CONNECTIONS, help="Conexiones a MySQL entre todas las ETL")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        ok = run_all_etls(args.only, args.skip, args.cpus, args.db_connections)
+    except ValueError as e:
+        parser.error(str(e))
+    sys.exit(0 if ok else 1)
 
 if __name__ == "__main__":
-    run_all_etls()
+    main()
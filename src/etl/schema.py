@@ -0,0 +1,53 @@
+"""
+Lectura de los scripts BBDD/*.sql: grafo de dependencias por claves foráneas entre tablas.
+"""
+import re
+
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?", re.IGNORECASE)
+_REFERENCES_RE = re.compile(r"REFERENCES\s+`?(\w+)`?", re.IGNORECASE)
+_FOREIGN_KEY_RE = re.compile(
+    r"FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+`?(\w+)`?\s*\(([^)]*)\)", re.IGNORECASE
+)
+
+def _columns(text):
+    return [column.strip().strip("`") for column in text.split(",")]
+
+def load_schema_dependencies(path):
+    """
+    Devuelve {tabla: set(tablas padre)} a partir de los CREATE TABLE del script.
+    Los nombres se normalizan a minúsculas y se ignoran las autorreferencias.
+    """
+    with open(path, 'r') as sql_file:
+        sql_script = sql_file.read()
+
+    parents = {}
+    for statement in sql_script.split(';'):
+        match = _CREATE_TABLE_RE.search(statement)
+        if not match:
+            continue
+        table = match.group(1).lower()
+        parents[table] = {
+            parent.lower() for parent in _REFERENCES_RE.findall(statement)
+            if parent.lower() != table
+        }
+    return parents
+
+def load_schema_statements(path):
+    """Devuelve {tabla: sentencia CREATE TABLE} en el orden del script, con el nombre tal cual aparece."""
+    with open(path, 'r') as sql_file:
+        sql_script = sql_file.read()
+
+    statements = {}
+    for statement in sql_script.split(';'):
+        match = _CREATE_TABLE_RE.search(statement)
+        if match:
+            statements[match.group(1)] = statement[match.start():].strip()
+    return statements
+
+def load_schema_foreign_keys(path):
+    """Devuelve las FK del script como (tabla, columnas, tabla padre, columnas padre), en orden."""
+    foreign_keys = []
+    for table, statement in load_schema_statements(path).items():
+        for columns, parent, parent_columns in _FOREIGN_KEY_RE.findall(statement):
+            foreign_keys.append((table, _columns(columns), parent, _columns(parent_columns)))
+    return foreign_keys
@@ -0,0 +1,124 @@
+"""
+Reconstrucción completa de una BBDD en tablas sombra (Tabla__new): se crean a partir del script
+BBDD/*.sql solo con la clave primaria, se cargan, se les añaden después los índices secundarios
+y las claves foráneas, y se intercambian con las tablas en uso en un único RENAME TABLE atómico.
+"""
+import re
+from src.etl.bulk_load import parse_upsert
+
+SHADOW_SUFFIX = "__new"
+OLD_SUFFIX = "__old"
+
+_INDEX_CLAUSE_RE = re.compile(r"(UNIQUE|INDEX|KEY|FULLTEXT|SPATIAL)\b", re.IGNORECASE)
+_FOREIGN_KEY_RE = re.compile(r"(CONSTRAINT\s+`?\w+`?\s+)?FOREIGN\s+KEY\b", re.IGNORECASE)
+_REFERENCES_RE = re.compile(r"(REFERENCES\s+)`?(\w+)`?", re.IGNORECASE)
+
+def split_definitions(body):
+    """Separa el cuerpo de un CREATE TABLE en definiciones (comas de primer nivel fuera de comillas)."""
+    parts, current, depth, quote = [], [], 0, None
+    for char in body:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+def shadow_table_ddl(table, statement, shadowed):
+    """
+    Devuelve (CREATE TABLE de table__new con columnas y clave primaria, cláusulas ADD diferidas).
+    Los índices secundarios y las claves foráneas se añaden tras la carga; las FK apuntan a las
+    tablas sombra de shadowed.
+    """
+    statement = "\n".join(line.split("--", 1)[0] for line in statement.splitlines())
+    body = statement[statement.index("(") + 1:statement.rindex(")")]
+
+    columns, indexes, foreign_keys = [], [], []
+    for definition in split_definitions(body):
+        if _FOREIGN_KEY_RE.match(definition):
+            foreign_keys.append("ADD " + _REFERENCES_RE.sub(
+                lambda m: m.group(1) + (m.group(2) + SHADOW_SUFFIX if m.group(2) in shadowed else m.group(2)),
+                definition,
+            ))
+        elif _INDEX_CLAUSE_RE.match(definition):
+            indexes.append("ADD " + definition)
+        else:
+            columns.append(definition)
+
+    create = f"CREATE TABLE {table}{SHADOW_SUFFIX} (\n    " + ",\n    ".join(columns) + "\n)"
+    return create, indexes, foreign_keys
+
+def shadow_upsert(sql):
+    """Reescribe un INSERT ... de CVE_TABLES para que escriba en la tabla sombra."""
+    table = parse_upsert(sql)[1]
+    return re.sub(rf"(INTO\s+)`?{table}`?", rf"\g<1>{table}{SHADOW_SUFFIX}", sql, count=1, flags=re.IGNORECASE)
+
+def create_shadow_tables(cursor, statements, tables):
+    """
+    Crea (vacías) las tablas sombra de tables. Las que no están en el script se clonan de la tabla
+    en uso con CREATE TABLE ... LIKE. Devuelve {tabla: (índices diferidos, FK diferidas)}.
+    """
+    deferred = {}
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in tables:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}{SHADOW_SUFFIX}")
+        if table in statements:
+            create, indexes, foreign_keys = shadow_table_ddl(table, statements[table], tables)
+            cursor.execute(create)
+            deferred[table] = (indexes, foreign_keys)
+        else:
+            cursor.execute(f"CREATE TABLE {table}{SHADOW_SUFFIX} LIKE {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    return deferred
+
+def build_shadow_indexes(cursor, deferred, extra_indexes=None):
+    """
+    Añade a las tablas sombra los índices secundarios (una sola reconstrucción por tabla) y
+    después las FK. Las FK se crean con FOREIGN_KEY_CHECKS = 0 para no revalidar los datos.
+    """
+    extra_indexes = extra_indexes or {}
+    for table, (indexes, _) in deferred.items():
+        clauses = indexes + extra_indexes.get(table, [])
+        if clauses:
+            print(f"🗂️ Índices de {table}{SHADOW_SUFFIX}...")
+            cursor.execute(f"ALTER TABLE {table}{SHADOW_SUFFIX} " + ", ".join(clauses))
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        for table, (_, foreign_keys) in deferred.items():
+            if foreign_keys:
+                cursor.execute(f"ALTER TABLE {table}{SHADOW_SUFFIX} " + ", ".join(foreign_keys))
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+def swap_shadow_tables(cursor, tables):
+    """
+    Sustituye las tablas en uso por sus tablas sombra con un único RENAME TABLE (atómico: los
+    lectores ven los datos anteriores o los nuevos, nunca una mezcla) y borra las anteriores.
+    Las FK de InnoDB siguen a la tabla renombrada, así que las nuevas quedan apuntando entre sí.
+    """
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"{table}{OLD_SUFFIX}" for table in tables))
+        cursor.execute("RENAME TABLE " + ", ".join(
+            f"{table} TO {table}{OLD_SUFFIX}, {table}{SHADOW_SUFFIX} TO {table}" for table in tables
+        ))
+        cursor.execute("DROP TABLE " + ", ".join(f"{table}{OLD_SUFFIX}" for table in tables))
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+def drop_shadow_tables(cursor, tables):
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"{table}{SHADOW_SUFFIX}" for table in tables))
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
@@ -0,0 +1,100 @@
+"""
+Servidor HTTP local para las pruebas de las descargas (src/etl/download.py).
+
+Sirve feeds en memoria con ETag y Last-Modified, responde 304 a las peticiones condicionales,
+atiende Range con If-Range (206, o 200 completo si el validador ya no coincide) y puede cortar
+una respuesta tras unos bytes para simular una descarga interrumpida.
+"""
+import hashlib
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+class Resource:
+    def __init__(self, body, etag=True, last_modified=None, content_length=True):
+        self.body = body
+        self.etag = f'"{hashlib.md5(body).hexdigest()}"' if etag else None
+        self.last_modified = last_modified
+        self.content_length = content_length
+        # Bytes que se envían antes de cerrar la conexión (None = respuesta completa)
+        self.cut_after = None
+
+class FeedServer:
+    def __init__(self):
+        self.resources = {}
+        # (ruta, cabeceras) de cada petición recibida, en orden
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def serve(self, path, body, **kwargs):
+        """Publica (o sustituye) el contenido de path y devuelve su Resource."""
+        self.resources[path] = Resource(body, **kwargs)
+        return self.resources[path]
+
+    def headers(self, index=-1):
+        return self.requests[index][1]
+
+    def not_modified(self, resource, headers):
+        if resource.etag and headers.get("If-None-Match"):
+            return headers["If-None-Match"] == resource.etag
+        since = headers.get("If-Modified-Since")
+        return bool(since and resource.last_modified and
+                    parsedate_to_datetime(since).timestamp() >= resource.last_modified)
+
+    def handle(self, request):
+        headers = dict(request.headers.items())
+        self.requests.append((request.path, headers))
+        resource = self.resources.get(request.path)
+        if resource is None:
+            request.send_error(404)
+            return
+        if self.not_modified(resource, headers):
+            request.send_response(304)
+            request.end_headers()
+            return
+
+        body, status = resource.body, 200
+        ranged = headers.get("Range", "").startswith("bytes=")
+        validator = headers.get("If-Range")
+        if ranged and validator in (None, resource.etag):
+            offset = int(headers["Range"][len("bytes="):].rstrip("-"))
+            body, status = resource.body[offset:], 206
+        request.send_response(status)
+        if status == 206:
+            request.send_header("Content-Range", f"bytes {len(resource.body) - len(body)}-{len(resource.body) - 1}/{len(resource.body)}")
+        if resource.etag:
+            request.send_header("ETag", resource.etag)
+        if resource.last_modified:
+            request.send_header("Last-Modified", formatdate(resource.last_modified, usegmt=True))
+        if resource.content_length:
+            request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        if resource.cut_after is not None:
+            body = body[:resource.cut_after]
+            resource.cut_after = None
+        request.wfile.write(body)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def feed_server():
+    server = FeedServer()
+    yield server
+    server.close()
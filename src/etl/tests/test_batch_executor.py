@@ -0,0 +1,76 @@
+"""
+Reintentos de batch_executor: la configuración de sesión se repite al reconectar.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import pytest
+from src.etl import batch_executor
+from src.etl.batch_executor import Quarantine, execute_batch, register_session_init
+
+class ServerError(Exception):
+    def __init__(self, errno, sqlstate=None):
+        super().__init__(f"{errno} ({sqlstate})")
+        self.errno = errno
+        self.sqlstate = sqlstate
+
+class FakeConnection:
+    """Conexión cuya sesión se reinicia (foreign_key_checks = 1) en cada reconexión."""
+
+    def __init__(self):
+        self.foreign_key_checks = 1
+        self.reconnects = 0
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.reconnects += 1
+        self.foreign_key_checks = 1
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+def disable_checks(conn):
+    conn.foreign_key_checks = 0
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(batch_executor, "RETRY_BASE_SECONDS", 0)
+
+def test_session_init_runs_again_after_reconnect(tmp_path):
+    conn = FakeConnection()
+    register_session_init(conn, disable_checks)
+    assert conn.foreign_key_checks == 0
+    attempts = []
+
+    def load_rows(rows):
+        attempts.append(conn.foreign_key_checks)
+        if len(attempts) == 1:
+            raise ServerError(2013, "HY000")  # Lost connection during query
+        if conn.foreign_key_checks:
+            raise ServerError(1452, "23000")  # El padre lo está cargando otra conexión
+
+    quarantine = Quarantine(str(tmp_path / "quarantine.jsonl"))
+    assert execute_batch(conn, [(1,), (2,)], load_rows, "child", quarantine) == 2
+    assert conn.reconnects == 1
+    assert attempts == [0, 0]
+    assert quarantine.count == 0
+
+def test_reconnect_without_session_init_only_pings():
+    conn = FakeConnection()
+    conn.foreign_key_checks = 0
+    batch_executor.reconnect(conn)
+    assert conn.reconnects == 1
+    assert conn.foreign_key_checks == 1
+
+def test_rejected_since_reads_only_new_lines(tmp_path):
+    path = str(tmp_path / "quarantine.jsonl")
+    quarantine = Quarantine(path)
+    assert quarantine.offset() == 0 and quarantine.rejected_since(0) == []
+    quarantine.add("child", (1, "old"), ServerError(1452, "23000"))
+    offset = quarantine.offset()
+
+    # Otro proceso añade al mismo fichero con su propia Quarantine
+    Quarantine(path).add("child", (2, "new"), ServerError(1406, "22001"))
+
+    assert quarantine.rejected_since(offset) == [("child", [2, "new"])]
@@ -0,0 +1,48 @@
+"""
+AdaptiveBatcher: los lotes recortados por packet_limit también ajustan el tamaño por latencia.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+from src.etl import batching
+from src.etl.batching import AdaptiveBatcher, estimate_row_size
+
+# Filas anchas: con un paquete de 1 MB solo caben unas decenas por lote
+WIDE_ROWS = [(i, "x" * 8000) for i in range(2000)]
+PACKET_LIMIT = 1 << 20
+
+def slow_clock(monkeypatch, seconds):
+    """time.perf_counter de batching que avanza seconds en cada lote."""
+    now = [0.0]
+
+    def perf_counter():
+        now[0] += seconds / 2
+        return now[0]
+
+    monkeypatch.setattr(batching.time, "perf_counter", perf_counter)
+
+def test_slow_capped_batches_shrink(monkeypatch):
+    batcher = AdaptiveBatcher(packet_limit=PACKET_LIMIT, initial_size=1000, target_seconds=1.0)
+    capped = int(PACKET_LIMIT * batching.PACKET_FILL) // estimate_row_size(WIDE_ROWS)
+    assert batcher.next_size(WIDE_ROWS, 0) == capped < batcher.size
+    slow_clock(monkeypatch, 4.0)
+    sizes = []
+
+    assert batcher.run(WIDE_ROWS, lambda batch: sizes.append(len(batch))) == len(WIDE_ROWS)
+
+    # Cada lote tarda 4 veces el objetivo: se reduce a la mitad desde el tamaño recortado
+    assert sizes[:3] == [capped, capped // 2, capped // 4]
+
+def test_fast_capped_batches_do_not_shrink(monkeypatch):
+    batcher = AdaptiveBatcher(packet_limit=PACKET_LIMIT, initial_size=1000, target_seconds=1.0)
+    slow_clock(monkeypatch, 0.1)
+
+    batcher.run(WIDE_ROWS, lambda batch: None)
+
+    assert batcher.size == batching.MAX_BATCH_SIZE
+
+def test_short_last_batch_is_ignored():
+    batcher = AdaptiveBatcher(initial_size=100)
+    batcher.record(40, 10.0, planned=100)
+    assert batcher.size == 100
+    batcher.record(100, 10.0, planned=100)
+    assert batcher.size == 50
@@ -0,0 +1,85 @@
+"""
+bulk_upsert con un cursor falso que lee el TSV de LOAD DATA y devuelve los avisos que daría MySQL.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import json
+import pytest
+from src.etl.batch_executor import Quarantine, execute_batch, is_data_error
+from src.etl.bulk_load import BulkDataError, bulk_upsert
+
+UPSERT = "INSERT INTO products (id, name) VALUES (%s, %s) ON DUPLICATE KEY UPDATE name = VALUES(name)"
+INSERT_IGNORE = "INSERT IGNORE INTO descriptions (id, lang) VALUES (%s, %s)"
+
+class FakeCursor:
+    """Simula LOAD DATA LOCAL: un valor 'BAD' da el aviso 1265 y una clave repetida el 1062 (con IGNORE)."""
+
+    def __init__(self):
+        self.statements = []
+        self.loaded = []
+        self.warnings = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        if sql.startswith("LOAD DATA"):
+            with open(params[0], encoding="utf-8") as f:
+                rows = [line.rstrip("\n").split("\t") for line in f]
+            self.loaded.append(rows)
+            self.warnings = [("Warning", 1265, f"Data truncated for column 'name' at row {i + 1}")
+                             for i, row in enumerate(rows) if "BAD" in row]
+            seen = set()
+            for i, row in enumerate(rows):
+                if row[0] in seen and " IGNORE " in sql:
+                    self.warnings.append(("Warning", 1062, f"Duplicate entry '{row[0]}' for key 'PRIMARY'"))
+                seen.add(row[0])
+        elif sql == "SHOW WARNINGS":
+            self.result = self.warnings
+        else:
+            self.warnings = []
+
+    def fetchall(self):
+        return self.result
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+def test_warning_raises_data_error_before_upsert():
+    conn, cursor = FakeConnection(), FakeCursor()
+    with pytest.raises(BulkDataError) as error:
+        bulk_upsert(conn, cursor, UPSERT, [(1, "ok"), (2, "BAD")])
+    assert is_data_error(error.value)
+    assert error.value.errno == 1265
+    assert not any(sql.startswith("INSERT") for sql in cursor.statements)
+    assert conn.commits == 0
+
+def test_staging_load_keeps_executemany_duplicate_semantics():
+    conn, cursor = FakeConnection(), FakeCursor()
+    # INSERT IGNORE: la primera fila gana y el aviso 1062 no es un error de datos
+    assert bulk_upsert(conn, cursor, INSERT_IGNORE, [(1, "en"), (1, "es")]) == 2
+    assert any(" IGNORE INTO TABLE `descriptions__stg`" in sql for sql in cursor.statements)
+    assert any(sql.startswith("INSERT IGNORE INTO `descriptions`") for sql in cursor.statements)
+    # ON DUPLICATE KEY UPDATE: la última fila gana
+    bulk_upsert(conn, cursor, UPSERT, [(1, "a"), (1, "b")])
+    assert any(" REPLACE INTO TABLE `products__stg`" in sql for sql in cursor.statements)
+    assert conn.commits == 2
+
+def test_bad_rows_are_bisected_into_quarantine(tmp_path):
+    conn, cursor = FakeConnection(), FakeCursor()
+    quarantine = Quarantine(str(tmp_path / "quarantine.jsonl"))
+    rows = [(i, "BAD" if i in (3, 6) else f"name {i}") for i in range(8)]
+
+    loaded = execute_batch(conn, rows, lambda batch: bulk_upsert(conn, cursor, UPSERT, batch), "products", quarantine)
+
+    assert loaded == 6
+    with open(quarantine.path, encoding="utf-8") as f:
+        rejected = [json.loads(line) for line in f]
+    assert [entry["row"] for entry in rejected] == [[3, "BAD"], [6, "BAD"]]
+    assert all(entry["errno"] == 1265 for entry in rejected)
@@ -0,0 +1,156 @@
+"""
+Cargas incrementales de CWE y CAPEC con filas en cuarentena: la versión y los hashes de las
+entradas limpias se registran y solo se reaplican las entradas con filas rechazadas.
+
+cwe_ETL y capec_ETL importan src/config/db_config.py, que no se versiona (credenciales de MySQL):
+sin él se omiten estas pruebas. Ninguna abre conexiones a la BBDD.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import contextlib
+import xml.etree.ElementTree as ET
+import pytest
+
+pytest.importorskip("src.config.db_config", reason="falta src/config/db_config.py")
+
+from src.etl import capec_ETL, cwe_ETL
+from src.etl.batch_executor import Quarantine
+from src.etl.benchmarks.synthetic import write_cwe_catalog
+from src.etl.catalog_state import RETRY_HASH, CatalogState, is_same_catalog
+
+class FakeConnection:
+    def close(self):
+        pass
+
+class FakeLoad:
+    """Carga sin BBDD: anota las filas recibidas y envía a cuarentena las que cumplen reject(label, fila)."""
+
+    def __init__(self, specs, label_key, quarantine):
+        self.specs = specs
+        self.label_key = label_key
+        self.quarantine = quarantine
+        self.reject = lambda label, row: False
+        self.loaded = {}
+
+    def __call__(self, tables):
+        self.loaded = {}
+        for spec, rows in zip(self.specs, tables):
+            label = spec[self.label_key]
+            for row in rows:
+                if self.reject(label, row):
+                    self.quarantine.add(label, row, Exception("1406 (22001): Data too long"))
+                else:
+                    self.loaded.setdefault(label, []).append(row)
+
+@pytest.fixture
+def cwe_run(tmp_path, monkeypatch):
+    catalog = tmp_path / "cwec.xml"
+    write_cwe_catalog(str(catalog), 40)
+    quarantine = Quarantine(str(tmp_path / "cwe.jsonl"))
+    load = FakeLoad(cwe_ETL.CWE_TABLES, "label", quarantine)
+    deleted = []
+    monkeypatch.setattr(cwe_ETL, "connect_db_cwe", FakeConnection)
+    monkeypatch.setattr(cwe_ETL, "deferred_checks", lambda *args, **kwargs: contextlib.nullcontext())
+    monkeypatch.setattr(cwe_ETL, "delete_entries", lambda conn, statements, ids: deleted.extend(ids))
+    monkeypatch.setattr(cwe_ETL, "load_data", lambda *tables, **kwargs: load(tables))
+
+    def run(known):
+        del deleted[:]
+        return cwe_ETL.apply_weakness_changes(ET.parse(catalog).getroot(), known, quarantine)
+
+    return run, load, deleted
+
+def test_cwe_quarantined_weakness_is_the_only_one_retried(cwe_run):
+    run, load, deleted = cwe_run
+    load.reject = lambda label, row: label == "Mitigations" and str(row[1]) == "3"
+
+    applied, removed, rejected = run({})
+
+    assert rejected == {"3"}
+    assert applied["3"] == RETRY_HASH
+    assert len(applied) == 40 and all(applied[entry_id] != RETRY_HASH for entry_id in applied if entry_id != "3")
+    # Se registra la carga con la entrada pendiente: la siguiente ejecución no se salta aunque el feed sea el mismo
+    assert not is_same_catalog(CatalogState("4.15", "2024-07-16", "sha", pending=1), "sha", "4.15", "2024-07-16")
+
+    # Segunda ejecución sin errores: solo se reaplica el Weakness 3, el resto no se toca
+    load.reject = lambda label, row: False
+    known = applied
+    applied, removed, rejected = run(known)
+
+    assert list(applied) == ["3"] and applied["3"] != RETRY_HASH
+    assert removed == [] and rejected == set()
+    assert deleted == ["3"]
+    assert {str(row[0]) for row in load.loaded["cwe_items"]} == {"3"}
+    assert {str(row[1]) for row in load.loaded["Mitigations"]} == {"3"}
+
+def test_cwe_rejected_reference_marks_the_weaknesses_citing_it(cwe_run, tmp_path):
+    run, load, deleted = cwe_run
+    tables = dict(zip((spec["label"] for spec in cwe_ETL.CWE_TABLES),
+                      cwe_ETL.transform_cwe_data(ET.parse(tmp_path / "cwec.xml").getroot())))
+    catalog_references = {row[0] for row in tables["external_references"]}
+    citations = [row for row in tables["References_External_Table"] if row[1] in catalog_references]
+    reference = citations[0][1]
+    load.reject = lambda label, row: label == "external_references" and row[0] == reference
+
+    applied, removed, rejected = run({})
+
+    citing = {str(row[0]) for row in citations if row[1] == reference}
+    assert rejected == citing
+    assert all(applied[entry_id] == RETRY_HASH for entry_id in citing)
+    assert sum(content_hash == RETRY_HASH for content_hash in applied.values()) == len(citing)
+
+CAPEC_CATALOG = """<?xml version="1.0" encoding="UTF-8"?>
+<Attack_Pattern_Catalog xmlns="http://capec.mitre.org/capec-3" Name="CAPEC" Version="3.9" Date="2023-01-24">
+<Attack_Patterns>
+<Attack_Pattern ID="1" Name="One" Abstraction="Standard" Status="Draft">
+<Description>First</Description>
+<Execution_Flow><Attack_Step><Step>1</Step><Phase>Explore</Phase><Description>Survey</Description>
+<Technique>Use a spider</Technique></Attack_Step></Execution_Flow>
+</Attack_Pattern>
+<Attack_Pattern ID="2" Name="Two" Abstraction="Standard" Status="Draft">
+<Description>Second</Description>
+<References><Reference External_Reference_ID="REF-1"/></References>
+</Attack_Pattern>
+<Attack_Pattern ID="3" Name="Three" Abstraction="Detailed" Status="Draft">
+<Description>Third</Description>
+</Attack_Pattern>
+</Attack_Patterns>
+<External_References>
+<External_Reference Reference_ID="REF-1"><Title>Reference</Title></External_Reference>
+</External_References>
+</Attack_Pattern_Catalog>
+"""
+
+@pytest.fixture
+def capec_run(tmp_path, monkeypatch):
+    catalog = tmp_path / "capec.xml"
+    catalog.write_text(CAPEC_CATALOG, encoding="utf-8")
+    # En la ETL la cuarentena la escriben los procesos del Pool; aquí, la carga simulada
+    quarantine = Quarantine(str(tmp_path / "capec.jsonl"))
+    load = FakeLoad(capec_ETL.CAPEC_TABLES, "name", quarantine)
+    monkeypatch.setattr(capec_ETL, "_quarantine", quarantine)
+    monkeypatch.setattr(capec_ETL, "connect_db_capec", FakeConnection)
+    monkeypatch.setattr(capec_ETL, "deferred_checks", lambda *args, **kwargs: contextlib.nullcontext())
+    monkeypatch.setattr(capec_ETL, "delete_entries", lambda conn, statements, ids: None)
+    monkeypatch.setattr(capec_ETL, "load_capec_data",
+                        lambda data, **kwargs: load([data[spec["key"]] for spec in capec_ETL.CAPEC_TABLES]))
+
+    def run(known):
+        return capec_ETL.apply_attack_pattern_changes(ET.parse(catalog).getroot(), known)
+
+    return run, load
+
+def test_capec_rejected_technique_and_reference_are_traced_to_their_patterns(capec_run):
+    run, load = capec_run
+    load.reject = lambda label, row: label in ("Attack_Techniques", "External_References")
+
+    applied, removed, rejected = run({})
+
+    assert rejected == {"1", "2"}
+    assert applied["1"] == applied["2"] == RETRY_HASH and applied["3"] != RETRY_HASH
+
+    load.reject = lambda label, row: False
+    applied, removed, rejected = run(applied)
+
+    assert sorted(applied) == ["1", "2"] and RETRY_HASH not in applied.values()
+    assert sorted(row[0] for row in load.loaded["AttackPattern"]) == [1, 2]
@@ -0,0 +1,147 @@
+"""
+Modo delta de cve_ETL con los manifiestos de fixtures/delta: deltaLog.json (cuatro deltas, del
+más reciente al más antiguo, como en cvelistV5), delta.json (el último) y records/, una copia
+mínima de cvelistV5 con los JSON de los CVE.
+
+cve_ETL importa src/config/db_config.py, que no se versiona (credenciales de MySQL): sin él se
+omiten estas pruebas. Ninguna abre conexiones a la BBDD.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import json
+import os
+import shutil
+import pytest
+
+pytest.importorskip("src.config.db_config", reason="falta src/config/db_config.py")
+
+from src.etl import cve_ETL
+from src.etl.cve_ETL import (collect_delta_changes, cve_record_path, load_cve_delta, read_delta_manifest,
+                             read_delta_record)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "delta")
+DELTA_LOG = os.path.join(FIXTURES, "deltaLog.json")
+DELTA = os.path.join(FIXTURES, "delta.json")
+RECORDS = os.path.join(FIXTURES, "records")
+
+T0 = "2024-04-30T23:00:00.000Z"
+T2 = "2024-05-01T11:00:00.000Z"
+T3 = "2024-05-01T12:00:00.000Z"
+
+def deltas():
+    return read_delta_manifest(DELTA_LOG, feeds=None)
+
+def test_manifests_are_read_as_lists():
+    assert [d["fetchTime"] for d in deltas()] == [T3, T2, "2024-05-01T10:00:00.000Z", T0]
+    single = read_delta_manifest(DELTA, feeds=None)
+    assert len(single) == 1 and single[0]["fetchTime"] == T3
+
+def test_since_filter_skips_applied_deltas():
+    changed, deleted, latest = collect_delta_changes(deltas())
+    assert "CVE-2024-9999" in changed and latest == T3
+
+    changed, deleted, latest = collect_delta_changes(deltas(), since=T0)
+    assert sorted(changed) == ["CVE-2024-0001", "CVE-2024-0002", "CVE-2024-0003", "CVE-2024-0005",
+                               "CVE-2024-1234", "CVE-2024-12345"]
+    assert deleted == {"CVE-2024-0004"}
+    assert latest == T3
+
+    # Nada posterior al último aplicado: se conserva since
+    assert collect_delta_changes(deltas(), since=T3) == ({}, set(), T3)
+
+def test_new_deleted_new_keeps_latest_state():
+    # Hasta T2: CVE-2024-0002 se publica y se borra
+    changed, deleted, _ = collect_delta_changes([d for d in deltas() if d["fetchTime"] <= T2])
+    assert "CVE-2024-0002" not in changed and "CVE-2024-0002" in deleted
+
+    # En T3 vuelve a publicarse: se carga con la entrada de T3 y no se borra
+    changed, deleted, _ = collect_delta_changes(deltas())
+    assert changed["CVE-2024-0002"]["dateUpdated"] == "2024-05-01T11:58:00.000Z"
+    assert "CVE-2024-0002" not in deleted
+
+def test_cve_record_path_buckets_by_thousands():
+    assert cve_record_path("CVE-2024-0001") == os.path.join("cves", "2024", "0xxx", "CVE-2024-0001.json")
+    assert cve_record_path("CVE-2024-1234") == os.path.join("cves", "2024", "1xxx", "CVE-2024-1234.json")
+    assert cve_record_path("CVE-2024-12345") == os.path.join("cves", "2024", "12xxx", "CVE-2024-12345.json")
+
+def test_read_delta_record_from_records_dir():
+    changed, _, _ = collect_delta_changes(deltas())
+    data = read_delta_record(changed["CVE-2024-12345"], records_dir=RECORDS)
+    assert data["cveMetadata"]["cveId"] == "CVE-2024-12345"
+    # En el delta pero sin fichero en la copia local
+    assert read_delta_record(changed["CVE-2024-0005"], records_dir=RECORDS) is None
+
+def test_read_delta_record_from_github_link(feed_server):
+    with open(os.path.join(RECORDS, cve_record_path("CVE-2024-1234")), "rb") as f:
+        feed_server.serve("/CVE-2024-1234.json", f.read())
+
+    data = read_delta_record({"cveId": "CVE-2024-1234", "githubLink": feed_server.url("/CVE-2024-1234.json")})
+    assert data["cveMetadata"]["cveId"] == "CVE-2024-1234"
+    assert read_delta_record({"cveId": "CVE-2024-0005", "githubLink": feed_server.url("/CVE-2024-0005.json")}) is None
+
+class FakeConnection:
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def delta_run(tmp_path, monkeypatch):
+    """load_cve_delta sin BBDD: anota los CVEs borrados y los registros cargados."""
+    calls = {"deleted": [], "loaded": []}
+    monkeypatch.setattr(cve_ETL, "INCREMENTAL_SYNC", False)
+    monkeypatch.setattr(cve_ETL, "connect_db_cve", FakeConnection)
+    monkeypatch.setattr(cve_ETL, "delete_cves", lambda conn, cursor, cve_ids: calls["deleted"].extend(cve_ids))
+
+    def load_cve_data(records, **kwargs):
+        calls["loaded"].extend(records)
+
+    monkeypatch.setattr(cve_ETL, "load_cve_data", load_cve_data)
+    state_path = str(tmp_path / "cve_delta_state.json")
+    cve_ETL.save_delta_state(T0, state_path)
+    return calls, state_path
+
+def loaded_cve_ids(records):
+    # Índice 0 de CVE_TABLES: la fila de la tabla CVE
+    return sorted(record[0][0][0] for record in records)
+
+def test_rejected_and_missing_records_become_deletions(delta_run):
+    calls, state_path = delta_run
+
+    load_cve_delta(DELTA_LOG, records_dir=RECORDS, state_path=state_path)
+
+    assert calls["deleted"] == ["CVE-2024-0003", "CVE-2024-0004", "CVE-2024-0005"]
+    assert loaded_cve_ids(calls["loaded"]) == ["CVE-2024-0001", "CVE-2024-0002", "CVE-2024-1234", "CVE-2024-12345"]
+    assert cve_ETL.load_delta_state(state_path) == T3
+
+def test_state_is_saved_only_after_successful_load(delta_run, monkeypatch):
+    calls, state_path = delta_run
+
+    def failing_load(records, **kwargs):
+        raise RuntimeError("Lost connection to MySQL server during query")
+
+    monkeypatch.setattr(cve_ETL, "load_cve_data", failing_load)
+    with pytest.raises(RuntimeError):
+        load_cve_delta(DELTA_LOG, records_dir=RECORDS, state_path=state_path)
+    assert cve_ETL.load_delta_state(state_path) == T0
+
+    # La siguiente ejecución vuelve a aplicar los mismos deltas
+    monkeypatch.setattr(cve_ETL, "load_cve_data", lambda records, **kwargs: calls["loaded"].extend(records))
+    load_cve_delta(DELTA_LOG, records_dir=RECORDS, state_path=state_path)
+    assert len(calls["loaded"]) == 4
+    assert cve_ETL.load_delta_state(state_path) == T3
+
+def test_records_dir_copy_is_not_required_to_be_complete(delta_run, tmp_path):
+    calls, state_path = delta_run
+    records_dir = tmp_path / "records"
+    shutil.copytree(RECORDS, records_dir)
+    os.remove(records_dir / cve_record_path("CVE-2024-12345"))
+
+    load_cve_delta(DELTA, records_dir=str(records_dir), state_path=state_path)
+
+    # Solo el delta de T3: 12345 y 0005 ya no están en la copia y se tratan como borrados
+    assert calls["deleted"] == ["CVE-2024-0005", "CVE-2024-12345"]
+    assert loaded_cve_ids(calls["loaded"]) == ["CVE-2024-0002", "CVE-2024-1234"]
+    with open(state_path) as f:
+        assert json.load(f) == {"fetch_time": T3}
@@ -0,0 +1,173 @@
+"""
+Sincronización incremental de cve_ETL: contenedores ADP retirados en cvelistV5, recarga tras
+un corte brusco y CVEs con filas en cuarentena. Usa el registro de fixtures/delta/records con un
+ADP añadido.
+
+cve_ETL importa src/config/db_config.py, que no se versiona (credenciales de MySQL): sin él se
+omiten estas pruebas. Ninguna abre conexiones a la BBDD.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import copy
+import json
+import os
+import re
+import pytest
+
+pytest.importorskip("src.config.db_config", reason="falta src/config/db_config.py")
+
+from src.etl import cve_ETL
+from src.etl.batch_executor import Quarantine
+from src.etl.batching import AdaptiveBatcher
+from src.etl.bulk_load import parse_upsert
+from src.etl.cve_ETL import (CVE_TABLES, STALE_CONTAINERS, cve_record_path, finish_cve_load, generate_content_hash,
+                             load_cve_data, rejected_cves, transform_cve_record)
+
+RECORDS = os.path.join(os.path.dirname(__file__), "fixtures", "delta", "records")
+CVE_ID = "CVE-2024-0001"
+CONTAINERS = next(idx for idx, spec in enumerate(CVE_TABLES) if spec["name"] == "containers")
+
+@pytest.fixture
+def record():
+    with open(os.path.join(RECORDS, cve_record_path(CVE_ID))) as f:
+        data = json.load(f)
+    adp = copy.deepcopy(data["containers"]["cna"])
+    adp["title"] = "CISA ADP Vulnrichment"
+    data["containers"]["adp"] = [adp]
+    return data
+
+def stored_hashes(data, adp_count):
+    """Hashes guardados en la BBDD: el registro tal cual más adp_count ADP (los que pasen de 1, retirados)."""
+    known = {f"{CVE_ID}_cna": generate_content_hash(data["containers"]["cna"])}
+    for position in range(1, adp_count + 1):
+        known[f"{CVE_ID}_adp_{position}"] = generate_content_hash(data["containers"]["adp"][0])
+    return known
+
+def container_ids(parsed):
+    return sorted(row[0] for row in parsed.get(CONTAINERS, []))
+
+def test_retired_adp_containers_are_marked_stale(record):
+    parsed = transform_cve_record(record, {}, stored_hashes(record, adp_count=3))
+
+    assert parsed[STALE_CONTAINERS] == [f"{CVE_ID}_adp_2", f"{CVE_ID}_adp_3"]
+    # CNA y el ADP que sigue no han cambiado
+    assert container_ids(parsed) == []
+
+def test_no_stale_key_without_retired_containers(record):
+    assert STALE_CONTAINERS not in transform_cve_record(record, {}, stored_hashes(record, adp_count=1))
+    assert STALE_CONTAINERS not in transform_cve_record(record)
+
+def test_recovery_reloads_every_container_and_still_finds_retired_ones(record):
+    # Tras un corte brusco main pasa los ID de la BBDD sin sus hashes
+    known = dict.fromkeys(stored_hashes(record, adp_count=2))
+
+    parsed = transform_cve_record(record, {}, known)
+
+    assert container_ids(parsed) == [f"{CVE_ID}_adp_1", f"{CVE_ID}_cna"]
+    assert parsed[STALE_CONTAINERS] == [f"{CVE_ID}_adp_2"]
+
+def test_load_deletes_retired_containers_before_loading_the_cve(record, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cve_ETL, "open_cve_connection", lambda bulk, checks: (object(), object(), None))
+    monkeypatch.setattr(cve_ETL, "close_cve_connection", lambda connection: None)
+    monkeypatch.setattr(cve_ETL, "cve_batchers", lambda conn, specs, bulk: {spec["name"]: AdaptiveBatcher() for spec in specs})
+    monkeypatch.setattr(cve_ETL, "cve_table_parents", lambda: {idx: set() for idx in range(len(CVE_TABLES))})
+    monkeypatch.setattr(cve_ETL, "delete_containers", lambda conn, cursor, ids: calls.append(("delete", ids)))
+
+    def load_table_rows(conn, cursor, bulk_cursor, spec, rows, batcher, known_containers=None, quarantine=None):
+        calls.append(("load", spec["name"]))
+        return len(rows)
+
+    monkeypatch.setattr(cve_ETL, "load_table_rows", load_table_rows)
+    record["cveMetadata"]["dateUpdated"] = "2024-06-01T00:00:00.000Z"
+    known = stored_hashes(record, adp_count=2)
+
+    load_cve_data([transform_cve_record(record, {}, known)], known_containers=known, workers=1)
+
+    assert calls[0] == ("delete", [f"{CVE_ID}_adp_2"])
+    assert ("load", "cves") in calls[1:]
+
+class FakeDatabase:
+    """Cursor sobre tablas en memoria: solo los SELECT * ... WHERE col = %s LIMIT 1 y UPDATE de rejected_cves."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.updates = []
+        self.description = None
+        self._row = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        if sql.startswith("UPDATE"):
+            self.updates.append((sql.split()[1], list(params)))
+            return
+        table, where = re.match(r"SELECT \* FROM (\w+) WHERE (.+) LIMIT 1", sql).groups()
+        columns = re.findall(r"(\w+) = %s", where)
+        rows = [row for row in self.tables.get(table, []) if [row[column] for column in columns] == list(params)]
+        self._row = rows[0] if rows else None
+        self.description = [(column,) for column in (self._row or {})]
+
+    def fetchone(self):
+        return tuple(self._row.values()) if self._row else None
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+def quarantined(table, **values):
+    """(label, fila) como los lee Quarantine.rejected_since para una fila de table."""
+    spec = next(spec for spec in CVE_TABLES if parse_upsert(spec["sql"])[1] == table)
+    return spec["name"], [values.get(column) for column in parse_upsert(spec["sql"])[2]]
+
+def test_rejected_rows_are_traced_to_their_cves():
+    database = FakeDatabase({
+        "Container": [{"container_id": "CVE-2024-0001_cna", "cve_id": "CVE-2024-0001"},
+                      {"container_id": "CVE-2024-0002_cna", "cve_id": "CVE-2024-0002"}],
+        "Affected_Product": [{"product_id": "p1", "container_id": "CVE-2024-0001_cna"}],
+    })
+    rejected = [
+        # Nieto de un producto ya insertado: producto y contenedor se leen de la BBDD
+        quarantined("Affected_Version", product_id="p1"),
+        # Su descripción también se rechazó: el padre sale de las filas en cuarentena
+        quarantined("Descriptions_Supporting_Media", id="m1", description_id="d1"),
+        quarantined("Descriptions", id="d1", container_id="CVE-2024-0002_cna"),
+        quarantined("CVE", cve_id="CVE-2024-0003"),
+        # Sin padre en ningún sitio
+        quarantined("Affected_Version", product_id="missing"),
+    ]
+
+    cve_ids, unresolved = rejected_cves(database, rejected)
+
+    assert cve_ids == {"CVE-2024-0001", "CVE-2024-0002", "CVE-2024-0003"}
+    assert unresolved == 1
+
+class FakeFeeds:
+    def __init__(self):
+        self.processed = []
+
+    def mark_processed(self, feed):
+        self.processed.append(feed)
+
+def test_quarantined_cves_are_invalidated_and_the_feed_stays_pending(tmp_path, monkeypatch):
+    database = FakeDatabase({})
+    monkeypatch.setattr(cve_ETL, "connect_db_cve", lambda: database)
+    quarantine = Quarantine(str(tmp_path / "cve.jsonl"))
+    quarantine.add(*quarantined("CVE", cve_id="CVE-2024-0009"), Exception("1406 (22001): Data too long"))
+    offset = quarantine.offset()
+    feeds = FakeFeeds()
+
+    # Las filas de ejecuciones anteriores no cuentan
+    finish_cve_load(feeds, "feed", quarantine, offset)
+    assert feeds.processed == ["feed"] and database.updates == []
+
+    quarantine.add(*quarantined("Container", container_id="CVE-2024-0001_cna", cve_id="CVE-2024-0001"),
+                   Exception("1406 (22001): Data too long"))
+    finish_cve_load(feeds, "feed", quarantine, offset)
+
+    # Los CVEs limpios quedan registrados en la BBDD; el ZIP sigue pendiente para reintentar el invalidado
+    assert feeds.processed == ["feed"]
+    assert database.updates == [("CVE", ["CVE-2024-0001"]), ("Container", ["CVE-2024-0001"])]
@@ -0,0 +1,93 @@
+"""
+Descarga en streaming y lectura del XML directamente del ZIP, contra el servidor local de conftest.py.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+import pytest
+import requests
+from src.etl import download
+from src.etl.download import FeedCache, open_zip_member, write_response
+
+def catalog_xml(items):
+    entries = "".join(f'<cpe-item name="cpe:/a:vendor:product_{i}"><title>Product {i}</title></cpe-item>' for i in range(items))
+    return f'<?xml version="1.0" encoding="UTF-8"?><cpe-list>{entries}</cpe-list>'.encode()
+
+@pytest.fixture
+def fixture_zip():
+    """ZIP con un README y el XML del catálogo, como los feeds de CPE y CWE (sin comprimir: ~40 KB)."""
+    xml = catalog_xml(500)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zip_file:
+        zip_file.writestr("README.txt", "fixture")
+        zip_file.writestr("official-cpe-dictionary_v2.3.xml", xml)
+    return buffer.getvalue(), xml
+
+class RecordingFile(io.BytesIO):
+    """Fichero en memoria que anota el tamaño de cada escritura."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(len(data))
+        return super().write(data)
+
+@pytest.fixture
+def small_steps(monkeypatch):
+    monkeypatch.setattr(download, "PROGRESS_STEP", 4096)
+
+def test_write_response_streams_in_chunks(feed_server, fixture_zip, small_steps, capsys):
+    body, _ = fixture_zip
+    feed_server.serve("/feed.zip", body)
+    f = RecordingFile()
+    with requests.get(feed_server.url("/feed.zip"), stream=True) as response:
+        size = write_response(response, f, chunk_size=1024)
+
+    assert size == len(body)
+    assert f.getvalue() == body
+    # Nunca se escribe la respuesta entera de una vez
+    assert len(f.writes) > 1 and max(f.writes) <= 1024
+    progress = [line for line in capsys.readouterr().out.splitlines() if line.startswith("📥")]
+    assert len(progress) == len(body) // 4096
+    total = download.format_size(len(body))
+    assert all(f" de {total} (" in line for line in progress)
+    percents = [int(line.rsplit("(", 1)[1].rstrip("%)")) for line in progress]
+    assert percents == sorted(percents) and percents[-1] <= 100
+
+def test_write_response_without_content_length(feed_server, small_steps, capsys):
+    body = bytes(range(256)) * 64
+    feed_server.serve("/feed.bin", body, content_length=False)
+    f = io.BytesIO()
+    with requests.get(feed_server.url("/feed.bin"), stream=True) as response:
+        assert write_response(response, f, chunk_size=1024) == len(body)
+
+    assert f.getvalue() == body
+    progress = [line for line in capsys.readouterr().out.splitlines() if line.startswith("📥")]
+    assert progress and all(line.endswith("descargados") for line in progress)
+
+def test_xml_parsed_straight_from_zip_member(feed_server, fixture_zip, tmp_path):
+    body, xml = fixture_zip
+    feed_server.serve("/feed.zip", body)
+    feed = FeedCache(str(tmp_path / "cache")).fetch(feed_server.url("/feed.zip"))
+
+    with open(feed.path, "rb") as f:
+        assert f.read() == body
+    with open_zip_member(feed.path) as xml_file:
+        root = ET.parse(xml_file).getroot()
+    assert root.tag == "cpe-list"
+    assert len(root.findall("cpe-item")) == 500
+    # Solo el ZIP descargado queda en disco: el XML no se extrae
+    assert sorted(p.suffix for p in (tmp_path / "cache").iterdir()) == [".json", ".zip"]
+
+def test_missing_member_raises(tmp_path):
+    zip_path = tmp_path / "feed.zip"
+    with zipfile.ZipFile(zip_path, "w") as zip_file:
+        zip_file.writestr("README.txt", "fixture")
+
+    with pytest.raises(FileNotFoundError):
+        with open_zip_member(str(zip_path)):
+            pass
@@ -0,0 +1,110 @@
+"""
+FeedCache contra el servidor local de conftest.py: peticiones condicionales, reanudación con
+Range/If-Range, limpieza de la copia anterior y el indicador changed.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import hashlib
+import os
+import pytest
+import requests
+from src.etl.download import DOWNLOAD_CHUNK_SIZE, FeedCache, PART_SUFFIX
+
+# Varios trozos de descarga: un corte dentro de un trozo pierde ese trozo, no los ya escritos
+FIRST = b"<catalog version='1'>" + b"x" * (3 * DOWNLOAD_CHUNK_SIZE) + b"</catalog>"
+SECOND = b"<catalog version='2'>" + b"y" * (2 * DOWNLOAD_CHUNK_SIZE) + b"</catalog>"
+CUT = DOWNLOAD_CHUNK_SIZE * 3 // 2
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeedCache(str(tmp_path / "cache"))
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_not_modified_reuses_cached_blob(feed_server, cache):
+    resource = feed_server.serve("/feed.xml", FIRST)
+    url = feed_server.url("/feed.xml")
+    first = cache.fetch(url)
+
+    second = cache.fetch(url)
+
+    assert feed_server.headers()["If-None-Match"] == resource.etag
+    assert second.path == first.path and second.sha256 == first.sha256
+    assert read(second.path) == FIRST
+
+def test_not_modified_by_last_modified(feed_server, cache):
+    feed_server.serve("/feed.xml", FIRST, etag=False, last_modified=1700000000)
+    url = feed_server.url("/feed.xml")
+    first = cache.fetch(url)
+
+    second = cache.fetch(url)
+
+    assert "If-None-Match" not in feed_server.headers()
+    assert feed_server.headers()["If-Modified-Since"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+    assert second.path == first.path
+
+def test_interrupted_download_resumes_with_if_range(feed_server, cache, capsys):
+    resource = feed_server.serve("/feed.xml", FIRST)
+    resource.cut_after = CUT
+    url = feed_server.url("/feed.xml")
+    with pytest.raises(requests.exceptions.RequestException):
+        cache.fetch(url)
+    part_path = cache._path(url, PART_SUFFIX)
+    offset = os.path.getsize(part_path)
+    assert 0 < offset <= CUT
+
+    feed = cache.fetch(url)
+
+    headers = feed_server.headers()
+    assert headers["Range"] == f"bytes={offset}-"
+    assert headers["If-Range"] == resource.etag
+    assert "♻️ Reanudando" in capsys.readouterr().out
+    assert read(feed.path) == FIRST
+    assert feed.sha256 == hashlib.sha256(FIRST).hexdigest()
+    assert not os.path.exists(part_path)
+
+def test_resume_restarts_when_validator_changed(feed_server, cache, capsys):
+    feed_server.serve("/feed.xml", FIRST).cut_after = CUT
+    url = feed_server.url("/feed.xml")
+    with pytest.raises(requests.exceptions.RequestException):
+        cache.fetch(url)
+    offset = os.path.getsize(cache._path(url, PART_SUFFIX))
+    # El feed cambia en el servidor: el If-Range ya no coincide y se responde 200 completo
+    feed_server.serve("/feed.xml", SECOND)
+
+    feed = cache.fetch(url)
+
+    assert feed_server.headers()["Range"] == f"bytes={offset}-"
+    assert "♻️ Reanudando" not in capsys.readouterr().out
+    assert read(feed.path) == SECOND
+    assert feed.sha256 == hashlib.sha256(SECOND).hexdigest()
+
+def test_new_content_removes_previous_blob(feed_server, cache):
+    feed_server.serve("/feed.xml", FIRST)
+    url = feed_server.url("/feed.xml")
+    first = cache.fetch(url)
+    feed_server.serve("/feed.xml", SECOND)
+
+    second = cache.fetch(url)
+
+    assert second.path != first.path
+    assert not os.path.exists(first.path)
+    assert read(second.path) == SECOND
+    assert sorted(os.listdir(cache.directory)) == sorted([os.path.basename(second.path), os.path.basename(cache._path(url, ".json"))])
+
+def test_changed_flips_only_after_mark_processed(feed_server, cache):
+    feed_server.serve("/feed.xml", FIRST)
+    url = feed_server.url("/feed.xml")
+
+    assert cache.fetch(url).changed
+    # Descargado pero sin cargar: la siguiente ejecución tiene que cargarlo aunque el servidor responda 304
+    feed = cache.fetch(url)
+    assert feed.changed
+
+    cache.mark_processed(feed)
+    assert not cache.fetch(url).changed
+
+    feed_server.serve("/feed.xml", SECOND)
+    assert cache.fetch(url).changed
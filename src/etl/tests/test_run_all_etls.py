@@ -0,0 +1,39 @@
+"""
+Reparto del presupuesto de núcleos y conexiones de run_all_etls.
+
+Ejecutar desde la raíz del repositorio: python -m pytest src/etl/tests
+"""
+import pytest
+from src.etl.run_all_etls import ETLS, plan_waves, select_etls, split_budget
+
+def names(wave):
+    return [spec["name"] for spec in wave]
+
+@pytest.mark.parametrize("total", range(len(ETLS), 40))
+def test_budget_adds_up_to_total(total):
+    budget = split_budget(total, ETLS)
+    assert sum(budget.values()) == total
+    assert min(budget.values()) >= 1
+
+def test_budget_follows_weights():
+    # Pesos 4, 2, 1, 1: 1 para cada una y los 4 restantes según el peso
+    assert split_budget(8, ETLS) == {"cve": 3, "cpe": 2, "cwe": 2, "capec": 1}
+    assert split_budget(16, ETLS) == {"cve": 7, "cpe": 4, "cwe": 3, "capec": 2}
+    assert split_budget(4, ETLS) == {"cve": 1, "cpe": 1, "cwe": 1, "capec": 1}
+
+def test_budget_below_one_per_etl_is_rejected():
+    with pytest.raises(ValueError):
+        split_budget(3, ETLS)
+
+def test_small_budget_runs_in_waves():
+    assert [names(wave) for wave in plan_waves(ETLS, cpus=1, db_connections=16)] == [["cve"], ["cpe"], ["cwe"], ["capec"]]
+    assert [names(wave) for wave in plan_waves(ETLS, cpus=8, db_connections=3)] == [["cve", "cpe", "cwe"], ["capec"]]
+    assert len(plan_waves(ETLS, cpus=4, db_connections=4)) == 1
+
+def test_invalid_selection_or_budget():
+    with pytest.raises(ValueError):
+        select_etls(only=["nvd"])
+    with pytest.raises(ValueError):
+        plan_waves(select_etls(only=["cve"], skip=["cve"]), cpus=4, db_connections=4)
+    with pytest.raises(ValueError):
+        plan_waves(ETLS, cpus=0, db_connections=4)
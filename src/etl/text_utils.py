@@ -0,0 +1,106 @@
+"""
+Utilidades de texto compartidas por las ETL (CVE, CWE y CAPEC).
+
+Las sustituciones y borrados carácter a carácter se hacen con una única tabla de
+str.translate y los patrones están precompilados. La salida es idéntica a la de las
+versiones anteriores basadas en re.sub y str.replace encadenados.
+"""
+import html
+import re
+import unicodedata
+from functools import lru_cache
+
+_HTML_TAG_RE = re.compile(r'<.*?>')
+
+# Caracteres de control (0x00-0x1F y 0x7F)
+_CONTROL_CHARS = dict.fromkeys([*range(0x20), 0x7F])
+
+@lru_cache(maxsize=None)
+def _sanitiser(quitar_html, reemplazar_comillas, escapar_barra, eliminar_control, eliminar_puntoycoma, eliminar_comodines):
+    """
+    Tabla de translate y patrón de "texto que hay que tocar" para una combinación de opciones
+    de clean_for_sql.
+    """
+    table = {}
+    if eliminar_control:
+        table.update(_CONTROL_CHARS)
+    if reemplazar_comillas:
+        table[ord("'")] = "`"
+        table[ord('"')] = "``"
+    if escapar_barra:
+        table[ord("\\")] = "\\\\"
+    if eliminar_puntoycoma:
+        table[ord(";")] = None
+    if eliminar_comodines:
+        table.update(dict.fromkeys(map(ord, "%_[]")))
+
+    special = {chr(c) for c in table if c >= 0x20}
+    special |= {"<"} if quitar_html else {"<", ">", "&", '"', "'"}
+    # Un texto ASCII que no case con este patrón sale de clean_for_sql sin cambios
+    dirty = re.compile(
+        "[" + re.escape("".join(sorted(special))) + r"\x00-\x1F\x7F]"
+        r"|\s\s|^\s|\s$|[^\S ]"
+    )
+    return table, dirty
+
+def clean_for_sql(
+    value,
+    quitar_html=True,
+    reemplazar_comillas=True,
+    escapar_barra=True,
+    normalizar_unicode=True,
+    eliminar_control=True,
+    eliminar_puntoycoma=True,
+    eliminar_comodines=True
+):
+    """
+    Limpia y prepara un texto para inserción segura en SQL.
+    - Elimina o escapa caracteres problemáticos.
+    - Opcionalmente elimina etiquetas HTML o las escapa.
+    - Opcionalmente reemplaza comillas por tipográficas.
+    - Elimina caracteres de control y punto y coma.
+    - Normaliza a Unicode NFC.
+    - Elimina comodines si se desea.
+    """
+    if not value:
+        return ""
+    if not isinstance(value, str):
+        value = str(value)
+    table, dirty = _sanitiser(quitar_html, reemplazar_comillas, escapar_barra, eliminar_control, eliminar_puntoycoma, eliminar_comodines)
+    if value.isascii():
+        # Camino rápido: texto ASCII ya limpio (el ASCII siempre está en NFC)
+        if not dirty.search(value):
+            return value
+    elif normalizar_unicode:
+        value = unicodedata.normalize("NFC", value)
+    value = value.translate(table)
+    # Limpieza de HTML
+    if quitar_html:
+        if "<" in value:
+            value = _HTML_TAG_RE.sub("", value)
+    else:
+        value = html.escape(value)
+    # Elimina dobles espacios y espacios al inicio/final
+    return " ".join(value.split())
+
+# Comillas tipográficas y borrado de caracteres de control (escape_characters)
+_ESCAPE_TABLE = {**_CONTROL_CHARS, ord("'"): "’", ord('"'): "”"}
+
+def escape_characters(value):
+    if not value or str(value).strip() == "":
+        return None
+    if isinstance(value, str):
+        return value.translate(_ESCAPE_TABLE).strip()
+    return str(value)
+
+def extract_all_text_from_element(elem):
+    if elem is not None:
+        if isinstance(elem, list):
+            text = ';'.join(e.text for e in elem if e.text is not None)
+        elif hasattr(elem, 'itertext'):
+            text = ';'.join(elem.itertext())
+        else:
+            text = elem
+    else:
+        text = ""
+    return text.strip()